@@ -0,0 +1,307 @@
+##############################################################################
+# Benchmarks for circuit construction and execution
+##############################################################################
+# This script times how circuit() and run_circuit() in quantum/grover.py, and
+# circuit() in quantum/deutsch_jozsa.py, scale with the number of qubits.
+# It sweeps three things:
+#
+# (1) the qubit count (--min-qubits to --max-qubits);
+# (2) the method: the backend, plus uf1()/uf2() and dif1()/dif2() where the
+#     backend offers a choice;
+# (3) the input pattern: where the needle is (Grover), or whether the string
+#     is constant or balanced (Deutsch-Jozsa).
+#
+# Random inputs come from a fixed seed (--seed), so two runs of the same
+# sweep see exactly the same strings.  For every stage (needle_init,
+# circuit, run_circuit) we record the best wall time over --repeats runs,
+# and the peak memory allocated during a separate run under tracemalloc
+# (timing and tracing are kept apart, since tracemalloc slows everything
+# down).  The operator cache is cleared before each case, so construction
+# is always measured from scratch.
+#
+# The results are written as JSON.  Pass --baseline with an earlier results
+# file to compare against it: any stage that is slower or uses more memory
+# than the baseline allows (see --time-tolerance, --memory-tolerance) is
+# reported as a regression, and the script exits with status 1.
+#
+# Run it from the top of the repository:
+#
+# python -m benchmarks.bench_circuits --output bench.json
+# python -m benchmarks.bench_circuits --output new.json --baseline bench.json
+##############################################################################
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from quantum import grover, deutsch_jozsa
+from quantum.operator_cache import cache_clear
+
+# The methods to sweep for each script, with the largest qubit count each one
+# is run at by default.  Dense operators grow as 4^n, so the dense methods
+# stop well before the others.
+GROVER_METHODS = {
+    'dense:uf1:dif1':     10,
+    'dense:uf2:dif1':     10,
+    'dense:uf1:dif2':     10,
+    'dense:uf2:dif2':     10,
+    'sparse:uf1:dif1':    14,
+    'sparse:uf2:dif1':    14,
+    'matrix-free':        20,
+    'analytic':           20,
+}
+DEUTSCH_JOZSA_METHODS = {
+    'dense':  10,
+    'sparse': 14,
+    'wht':    20,
+}
+GROVER_PATTERNS        = ('first', 'last', 'random')
+DEUTSCH_JOZSA_PATTERNS = ('constant', 'alternating', 'random')
+
+#-----------------------------------------------------------------------------
+# Function: grover_string(qubits, pattern, seed)
+#-----------------------------------------------------------------------------
+# The Grover input string for a qubit count and needle pattern: the needle
+# goes first, last, or at a random position drawn from the seed.
+#-----------------------------------------------------------------------------
+def grover_string(qubits, pattern, seed):
+    length = 2 ** qubits
+    if pattern == 'first':
+        position = 0
+    elif pattern == 'last':
+        position = length - 1
+    else:
+        position = numpy.random.RandomState(seed + qubits).randint(length)
+    return '0' * position + '1' + '0' * (length - position - 1)
+
+#-----------------------------------------------------------------------------
+# Function: deutsch_jozsa_string(qubits, pattern, seed)
+#-----------------------------------------------------------------------------
+# The Deutsch-Jozsa input string for a qubit count and pattern: all 0s, 0s
+# and 1s alternating, or a balanced string shuffled with the seed.
+#-----------------------------------------------------------------------------
+def deutsch_jozsa_string(qubits, pattern, seed):
+    length = 2 ** qubits
+    if pattern == 'constant':
+        return '0' * length
+    elif pattern == 'alternating':
+        return '01' * (length // 2)
+    bits = numpy.array(['0', '1'] * (length // 2))
+    numpy.random.RandomState(seed + qubits).shuffle(bits)
+    return ''.join(bits)
+
+#-----------------------------------------------------------------------------
+# Function: grover_stages(method, input_string)
+#-----------------------------------------------------------------------------
+# The stages of a Grover run, in order, as (name, function) pairs.  Each
+# function takes the result of the stage before it.
+#-----------------------------------------------------------------------------
+def grover_stages(method, input_string):
+    backend, _, methods = method.partition(':')
+    uf, dif = methods.split(':') if methods else ('uf1', 'dif1')
+
+    def build(initialised):
+        input, needle = initialised
+        return (input, grover.circuit(input, needle, backend, uf=uf, dif=dif))
+
+    def run(built):
+        input, gates = built
+        return grover.run_circuit(gates, grover.repeat(input['required_qubits']))
+
+    return [('needle_init', lambda _: grover.needle_init(input_string)),
+            ('circuit', build),
+            ('run_circuit', run)]
+
+#-----------------------------------------------------------------------------
+# Function: deutsch_jozsa_stages(method, input_string)
+#-----------------------------------------------------------------------------
+# The stages of a Deutsch-Jozsa run.  circuit() builds and runs the circuit
+# in one go, so there is only one stage.
+#-----------------------------------------------------------------------------
+def deutsch_jozsa_stages(method, input_string):
+    return [('circuit',
+             lambda _: deutsch_jozsa.circuit(input_string, method))]
+
+#-----------------------------------------------------------------------------
+# Function: measure(stages, repeats)
+#-----------------------------------------------------------------------------
+# Run the stages repeats times to get the best wall time of each, then once
+# more under tracemalloc to get the peak memory of each.
+#-----------------------------------------------------------------------------
+def measure(stages, repeats):
+    seconds = {name: float('inf') for name, _ in stages}
+    for _ in range(repeats):
+        cache_clear()
+        value = None
+        for name, stage in stages:
+            start = time.perf_counter()
+            value = stage(value)
+            seconds[name] = min(seconds[name], time.perf_counter() - start)
+
+    # Tracing restarts for each stage, so each peak counts only what that
+    # stage allocated.
+    peak_bytes = {}
+    cache_clear()
+    value = None
+    for name, stage in stages:
+        tracemalloc.start()
+        try:
+            value = stage(value)
+            peak_bytes[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    cache_clear()
+
+    return [{'stage': name,
+             'seconds': seconds[name],
+             'peak_bytes': peak_bytes[name]} for name, _ in stages]
+
+#-----------------------------------------------------------------------------
+# Function: run_benchmarks(min_qubits, max_qubits, repeats, seed, scripts)
+#-----------------------------------------------------------------------------
+# Sweep every script, method, qubit count and input pattern, and return a
+# list of result records (one per stage).
+#-----------------------------------------------------------------------------
+def run_benchmarks(min_qubits=1, max_qubits=10, repeats=3, seed=0,
+                   scripts=('grover', 'deutsch_jozsa'), verbose=True):
+    sweeps = {'grover': (GROVER_METHODS, GROVER_PATTERNS,
+                         grover_string, grover_stages),
+              'deutsch_jozsa': (DEUTSCH_JOZSA_METHODS, DEUTSCH_JOZSA_PATTERNS,
+                                deutsch_jozsa_string, deutsch_jozsa_stages)}
+    records = []
+    for script in scripts:
+        methods, patterns, make_string, make_stages = sweeps[script]
+        for method, method_max_qubits in methods.items():
+            for qubits in range(min_qubits, min(max_qubits, method_max_qubits) + 1):
+                for pattern in patterns:
+                    input_string = make_string(qubits, pattern, seed)
+                    stages = make_stages(method, input_string)
+                    for record in measure(stages, repeats):
+                        record = dict(script=script, method=method,
+                                      qubits=qubits, pattern=pattern, **record)
+                        records.append(record)
+                        if verbose:
+                            print(format_record(record))
+    return records
+
+#-----------------------------------------------------------------------------
+# Function: record_key(record)
+#-----------------------------------------------------------------------------
+# The fields that identify a measurement, for matching against a baseline.
+#-----------------------------------------------------------------------------
+def record_key(record):
+    return (record['script'], record['method'], record['qubits'],
+            record['pattern'], record['stage'])
+
+#-----------------------------------------------------------------------------
+# Function: format_record(record)
+#-----------------------------------------------------------------------------
+def format_record(record):
+    return '{:<14} {:<16} {:>3} {:<12} {:<12} {:>12.6f} s {:>14,} B'.format(
+        record['script'], record['method'], record['qubits'],
+        record['pattern'], record['stage'], record['seconds'],
+        record['peak_bytes'])
+
+#-----------------------------------------------------------------------------
+# Function: compare(records, baseline, time_tolerance, memory_tolerance,
+#                   min_seconds, min_bytes)
+#-----------------------------------------------------------------------------
+# Compare records against baseline records, and return a list of
+# regressions, each a (record, baseline record, reason) triple.  A stage is
+# slower if it takes more than (1 + time_tolerance) times its baseline time;
+# stages that take less than min_seconds in both runs are too noisy to judge
+# and are skipped.  Likewise for memory, with memory_tolerance and
+# min_bytes (small stages allocate a few hundred bytes more or less from run
+# to run, depending on what Python has already cached).
+#-----------------------------------------------------------------------------
+def compare(records, baseline, time_tolerance=0.25, memory_tolerance=0.10,
+            min_seconds=0.01, min_bytes=65536):
+    baseline = {record_key(record): record for record in baseline}
+    regressions = []
+    for record in records:
+        old = baseline.get(record_key(record))
+        if old is None:
+            continue
+        if (max(record['seconds'], old['seconds']) >= min_seconds and
+                record['seconds'] > old['seconds'] * (1 + time_tolerance)):
+            regressions.append((record, old, 'time'))
+        if (max(record['peak_bytes'], old['peak_bytes']) >= min_bytes and
+                record['peak_bytes'] > old['peak_bytes'] * (1 + memory_tolerance)):
+            regressions.append((record, old, 'memory'))
+    return regressions
+
+#-----------------------------------------------------------------------------
+# Function: environment()
+#-----------------------------------------------------------------------------
+# A description of where the benchmarks ran, stored alongside the results:
+# timings from different machines should not be compared.
+#-----------------------------------------------------------------------------
+def environment():
+    return {'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+#-----------------------------------------------------------------------------
+# Function: main(arguments)
+#-----------------------------------------------------------------------------
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark circuit construction and execution.')
+    parser.add_argument('--min-qubits', type=int, default=1)
+    parser.add_argument('--max-qubits', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='timing runs per case; the best is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--script', choices=['grover', 'deutsch_jozsa'],
+                        action='append',
+                        help='only benchmark this script (may be repeated)')
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--baseline',
+                        help='earlier results file to compare against')
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.10)
+    parser.add_argument('--min-seconds', type=float, default=0.01)
+    parser.add_argument('--min-bytes', type=int, default=65536)
+    options = parser.parse_args(arguments)
+
+    records = run_benchmarks(options.min_qubits, options.max_qubits,
+                             options.repeats, options.seed,
+                             options.script or ('grover', 'deutsch_jozsa'))
+    with open(options.output, 'w') as output:
+        json.dump({'environment': environment(),
+                   'seed': options.seed,
+                   'repeats': options.repeats,
+                   'results': records}, output, indent=1)
+    print('Results written to', options.output)
+
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            baseline = json.load(baseline)
+        regressions = compare(records, baseline['results'],
+                              options.time_tolerance,
+                              options.memory_tolerance, options.min_seconds,
+                              options.min_bytes)
+        for record, old, reason in regressions:
+            if reason == 'time':
+                change = '{:.6f} s -> {:.6f} s'.format(old['seconds'],
+                                                      record['seconds'])
+            else:
+                change = '{:,} B -> {:,} B'.format(old['peak_bytes'],
+                                                   record['peak_bytes'])
+            print('Regression ({}): {} {} {} {} {}: {}'.format(
+                reason, *record_key(record), change))
+        if regressions:
+            print(len(regressions), 'regression(s) against', options.baseline)
+            return 1
+        print('No regressions against', options.baseline)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
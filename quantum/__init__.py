@@ -0,0 +1,11 @@
+#############################################################################
+# Simulations of quantum circuits on a classical computer.
+#
+# quantum.deutsch       - Deutsch's Algorithm
+# quantum.deutsch_jozsa - The Deutsch-Jozsa Algorithm
+# quantum.grover        - Grover's Algorithm
+#
+# The top-level scripts (Deutsch.py, Deutsch-Jozsa.py and Grover.py) run
+# these from the command line.  Importing the package does not run anything,
+# and does not import QuTiP or SciPy until a circuit that needs them is built.
+##############################################################################
@@ -0,0 +1,217 @@
+#############################################################################
+# This script implements Deutsch's Algorithm.  Deutsch's Algorithm is a
+# deterministic quantum algorithm devised by David Deutsch in 1985 that
+# functions as a proof of concept, in that the quantum circuit runs in fewer
+# steps than does the classical algorithm.
+#
+# The problem is as follows: given function f, with possible inputs 0 and 1,
+# and possible outputs 0 and 1, determine whether f is constant or balanced,
+# as follows:
+#
+# f(0)=0, f(1)=0 ==> f is constant
+# f(0)=1, f(1)=1 ==> f is constant
+# f(0)=0, f(1)=0 ==> f is balanced
+# f(0)=1, f(1)=1 ==> f is balanced
+#
+# A classical computer needs to query f twice (once with input 0, once with
+# input 1) to determine whether f is constant or balanced.  A quantum
+# computer need query f only once. 
+#
+# Version information:
+#
+# Python: 3.8.2
+# Qutip : 4.5.1  (http://qutip.org)
+# Scipy : 1.4.1  (https://www.scipy.org)
+# Numpy : 1.18.4 (https://numpy.org)
+#
+# For more information on Grover's Algorithm, I suggest:
+#   Nielsen, Michael A. and Isaac L. Chung.  2010.
+#     _Quantum Computation and Quantum Information_.
+#     10th Anniversary Edition.
+#     Cambridge: Cambridge University Press.
+#     Section 1.4.3, pp. 32–34.
+#
+# Here is an overview of the quantum circuit that makes up Deutsch's Algorithm
+# for a top and bottom qubit.
+#
+#         +----+
+# |0> H --| Uf |-- H ------- M
+# |1> H --|    |--------------
+#         +----+
+#
+# The qubits start in state |0> and |1> respectively.  H is the Hadamard
+# gate.  Uf is the oracle (which encodes function f).  At M, we measure only
+# the top qubit.  If we measure the top qubit in state |0>, we know f is
+# constant;  if we measure the top qubit in state |1>, we know f is balanced.
+#
+# Run it from the command line with 'python Deutsch.py' or 'python -m
+# quantum.deutsch', or import the functions from quantum.deutsch.
+##############################################################################
+
+from functools import lru_cache
+from numpy import *
+from .gates import basis_state, uniform_layer, all_but_last
+
+##############################################################################
+# Set up and run circuit
+##############################################################################
+
+# There are only four possible functions f, so rather than building the
+# gates and running the circuit every time, we build all four oracles and
+# run the circuit for each of them once.  This is done the first time one is
+# needed rather than at import, so that importing this module does not
+# import QuTiP (see the README).  circuit() then just looks up the result.
+
+@lru_cache(maxsize=None)
+def build_circuits():
+    from qutip.qip.operations import cnot
+
+    ##############################################################################
+    # Set up all the elements necessary to execute the quantum circuit of
+    # Deutsch's Algorithm, and run the algorithm.
+    ##############################################################################
+
+    # Top (q0) and bottom (q1) qubits, in a combined state: the top qubit is
+    # in state |0> and the bottom qubit is in state |1>, so this is |01>
+    Q = basis_state(1, 2)
+
+    # Gates used in the algorithm, as combined operations on both qubits (see
+    # gates.py): 'I' is the identity gate (quantum wire), 'H' is the Hadamard
+    # gate, and 'X' is the NOT gate
+    II = uniform_layer('I', 2)
+    IX = all_but_last('I', 'X', 2)
+    HH = uniform_layer('H', 2)
+    HI = all_but_last('H', 'I', 2)
+    CNOT = cnot() # CNOT gate
+
+    ##############################################################################
+    # Construct Uf gate based on input_string according to the following schema:
+    # '00' ==> identity (quantum wire) on top and bottom qubits
+    # '11' ==> identity on top qubit, NOT (X) on bottom qubit
+    # '01' ==> CNOT (control on top qubit)
+    # '10' ==> CNOT (control on top qubit), followed by identity on the top qubit,
+    #          and NOT on the bottom qubit
+    ##############################################################################
+
+    oracles = {'00': II,
+               '11': IX,
+               '01': CNOT,
+               '10': CNOT * IX}
+
+    # Run the quantum circuit for each oracle
+    return {input_string: HI * Uf * HH * Q
+            for input_string, Uf in oracles.items()}
+
+def circuit(input_string='11'):
+
+    ##############################################################################
+    # First, set the input string, depending on f.  It must be one of the
+    # following options.  input_string is just a fancy way of describing f.
+    # '00' means an output of 0 (first digit) for f(0), followed by an output of 0
+    # (second digit) for f(1); similarly for the others.
+    ##############################################################################
+    # input_string = '00' # Constant - f(x) = 0
+    # input_string = '11' # Constant - f(x) = 1
+    # input_string = '01' # Balanced = f(x) = x
+    # input_string = '10' # Balanced = f(x) = not-x
+    ##############################################################################
+
+    circuits = build_circuits()
+    if input_string not in circuits:
+        raise ValueError("Input string error: must be '00', '01', '10' or "
+                         "'11', not {!r}".format(input_string))
+
+    result = circuits[input_string]
+    return ({'input_string': input_string,
+        'result': result})
+
+##############################################################################
+# Classify many functions at once
+##############################################################################
+
+# Encode each function as a two-bit number, reading input_string in binary:
+# '00' is 0, '01' is 1, '10' is 2 and '11' is 3.  The classification of each
+# encoding comes from the probability of measuring the top qubit in state |1>
+# in the precomputed results: 0 (constant) or 1 (balanced).  classify() then
+# classifies a whole array of encodings with a single lookup.
+
+CONSTANT = 0
+BALANCED = 1
+
+@lru_cache(maxsize=None)
+def build_classifications():
+    classifications = zeros(4, dtype=uint8)
+    for input_string, result in build_circuits().items():
+        state = result.full()
+        probability_10_11 = abs(state[2,0]) ** 2 + abs(state[3,0]) ** 2
+        if probability_10_11 > 0.5:
+            classifications[int(input_string, 2)] = BALANCED
+        else:
+            classifications[int(input_string, 2)] = CONSTANT
+    return classifications
+
+def classify(encodings):
+    # An empty list arrives as float64, so only non-empty input is checked
+    # for an integer type before the encodings become array indices.
+    values = asarray(encodings)
+    if values.size and values.dtype.kind not in 'iu':
+        raise ValueError("Encodings must be integers, not {}".format(
+            values.dtype))
+    encodings = asarray(values, dtype=intp)
+    if encodings.size and (encodings.min() < 0 or encodings.max() > 3):
+        raise ValueError("Encodings must be between 0 and 3")
+    return build_classifications()[encodings]
+
+##############################################################################
+# Interpret and print results.
+##############################################################################
+
+def results(input_string, result):
+
+    print('-' * 60)
+    print("|00>", result[0][0])
+    print("|01>", result[1][0])
+    print("|10>", result[2][0])
+    print("|11>", result[3][0])
+    print('-' * 60)
+
+    probability_00_01 = round(result[0][0][0]**2 + result[1][0][0]**2). real
+    probability_10_11 = round(result[2][0][0]**2 + result[3][0][0]**2). real
+
+    # Measuring |00> or |01> means the top qubit is in state |0>
+    print('Probability of measuring |00> or |01>: ', probability_00_01)
+    # Measuring |10> or |11> means the top qubit is in state |1>
+    print('Probability of measuring |10> or |11>: ', probability_10_11)
+
+    if probability_00_01 == 1.0:
+        print("Interpretation: Constant (top qubit measured in state |0>)")
+        if (input_string == '00' or input_string == '11'):
+            print("Function      : Constant (confirmed)")
+        else:
+            print("Error (interpretation does not match function)")
+    elif probability_10_11 == 1.0:
+        print("Interpretation: Balanced (top qubit measured in state |1>)")
+        if (input_string == '10' or input_string == '01'):
+            print("Function      : Balanced (confirmed)")
+        else:
+            print("Error (interpretation does not match function)")
+    else:
+        print("Error (unable to interpret)")
+
+    print('-' * 60)
+
+##############################################################################
+# Main
+##############################################################################
+
+# Get output of the circuit, based on an input string (default is '11');
+# valid inputs are '00', '11' (constant) or '01', '10' (balanced).  See
+# comments above for more detail.
+def main():
+    output = circuit('11')
+
+    # Interpret and print results of running the circuit
+    results(output['input_string'],output['result'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,637 @@
+#############################################################################
+# This script implements the Deutsch-Jozsa Algorithm, which is a general
+# version of Deutsch's Algorithm.  The Deutsch-Jozsa Algorithm is a
+# deterministic quantum algorithm devised by David Deutsch and Richard Jozsa
+# in 1992.
+#
+# The problem is as follows: given a string, each of whose digits is either
+# 0 or 1, with the following pattern: either all 0s, all 1s (constant), or
+# an equal number of 0s and 1s (balanced).
+#
+# Version information:
+#
+# Python: 3.8.2
+# Qutip : 4.5.1  (http://qutip.org)
+# Scipy : 1.4.1  (https://www.scipy.org)
+# Numpy : 1.18.4 (https://numpy.org)
+#
+# For more information on the Deutsch-Jozsa Algorithm, I suggest:
+#   Nielsen, Michael A. and Isaac L. Chung.  2010.
+#     _Quantum Computation and Quantum Information_.
+#     10th Anniversary Edition.
+#     Cambridge: Cambridge University Press.
+#     Section 1.4.4, pp. 34–38.
+#
+# Here is an overview of the quantum circuit that makes up the Deutsch-Jozsa
+# Algorithm for two qubits plus a control qubit.
+#
+# |0> H --+----+-- H ------- M
+# |0> H --| Uf |-- H ------- M
+# |1> H --+----+--------------
+#
+# Run it from the command line with 'python Deutsch-Jozsa.py' or 'python -m
+# quantum.deutsch_jozsa', or import the functions from quantum.deutsch_jozsa.
+# QuTiP and SciPy are only imported by the dense and sparse backends, when
+# they are used.
+##############################################################################
+
+from numpy import *
+import argparse
+import builtins
+import math
+import multiprocessing
+import os
+import time
+from . import disk_cache, gate_level
+from .planner import parse_size
+from .operator_cache import cached_operator
+from .gates import (basis_state, uniform_layer, all_but_last, sparse_layer,
+                    sparse_permutation, sparse_astype, GATE_H)
+from .precision import DTYPES, check_dtype, error_bound, measured_error
+from .reporting import summary, print_summary, write_summary, dump_state
+from .sampling import histogram
+from .packed_input import (source_length, source_signs, source_swaps,
+                           iter_bits, count_ones, describe, source_digest)
+
+##############################################################################
+# Set up and run circuit
+##############################################################################
+
+# Set input_string to be the function input.  The number of characters in the
+# string must be a power of 2.  The Deutsch-Jozsa Algorithm requires that this
+# string either be all 0s, all 1s (both constant) or an equal number of 0s and
+# 1s (balanced, but order does not matter).
+#
+# Set backend to 'dense' to build the circuit from QuTiP matrices (below), to
+# 'sparse' to build it from SciPy sparse matrices (see circuit_sparse()), or
+# to 'wht' to evaluate it without matrices (see circuit_wht()), or to 'gates'
+# to run it one gate at a time (see circuit_gates()).  Set oracle to 'phase'
+# to drop the control qubit (see circuit_phase()).
+#
+# For very long strings, input_string may be a bit-packed file opened with
+# open_packed() from packed_input.py instead of a string.  The 'wht' backend
+# reads it a chunk at a time and never builds the string.
+#
+# Set dtype to one of precision.DTYPES (for example 'float32') to run the
+# sparse and wht backends in that dtype; every amplitude is real, so float32
+# needs a quarter of the memory of complex128.  The dense backend uses QuTiP,
+# which only runs in complex128.
+
+def circuit(input_string='01010101', backend='dense', oracle='control',
+            dtype=None):
+
+    if backend == 'wht':
+        return circuit_wht(input_string, oracle, dtype)
+    elif backend == 'gates':
+        return circuit_gates(input_string, oracle, dtype)
+    elif oracle == 'phase':
+        return circuit_phase(input_string, backend, dtype)
+    elif oracle != 'control':
+        raise ValueError("Unknown oracle: {}".format(oracle))
+
+    if backend == 'sparse':
+        return circuit_sparse(input_string, dtype)
+    elif backend != 'dense':
+        raise ValueError("Unknown backend: {}".format(backend))
+    check_dtype(dtype, backend, qutip=True)
+
+    input_string_length = source_length(input_string)
+    required_qubits = int(math.log(input_string_length,2))
+
+    # An input string of length n requires log2(n) qubits beginning in state
+    # |0>, plus a control qubit that begins in state |1>.  Put into a combined
+    # state, this is 00...01 in binary, the basis state with index 1.
+    Q = basis_state(1, required_qubits+1)
+
+    # Hadamards as a combined operation, and Hadamards + Identity (for control
+    # qubit) as a combined operation.  These come from the shared gate library
+    # (gates.py), which keeps them in the operator cache (see
+    # operator_cache.py) so that they are shared between calls.
+    H = uniform_layer('H', required_qubits+1)
+    HI = all_but_last('H', 'I', required_qubits+1)
+
+    # Uf is generated by creating a zero matrix of suitable size, then plotting
+    # 1s as necessary
+    # (the input is read a chunk at a time; see packed_input.py)
+    Uf = zeros([input_string_length*2,input_string_length*2])
+    for start, bits in iter_bits(input_string):
+        for i, bit in enumerate(bits, start):
+            if not bit:
+                Uf[i*2,i*2] = '1'
+                Uf[i*2+1,i*2+1] = '1'
+            else:
+                Uf[i*2+1,i*2] = '1'
+                Uf[i*2,i*2+1] = '1'
+
+    # Run the quantum circuit
+    result = HI*Uf*H*Q
+    return ({'input_string': input_string,
+        'result': result})
+
+##############################################################################
+# Sparse version of the circuit
+##############################################################################
+
+# Uf has exactly one nonzero per row (it is a permutation), but circuit()
+# builds it as a full zeros() matrix, so memory grows as 4^n.  The following
+# builds the same circuit from SciPy CSR matrices, which store only nonzeros.
+
+# The layers of Hadamards are lists of operators with H on one qubit and I
+# on the rest (see sparse_layer() in gates.py).  Multiplied out, a layer of
+# Hadamards is dense, but each of these factors has two nonzeros per row.
+
+# Uf as a permutation matrix: wherever the input string has a 1, the two
+# basis states for that position (control |0> and control |1>) are swapped.
+def sparse_uf(input_string):
+    return sparse_permutation(source_swaps(input_string))
+
+def circuit_sparse(input_string='01010101', dtype=None):
+
+    input_string_length = source_length(input_string)
+    required_qubits = int(math.log(input_string_length,2))
+
+    # The state is complex128 and the operators float64, unless a dtype is
+    # given for both
+    state_type = check_dtype(dtype, 'sparse', default=complex128)
+    gate_type = check_dtype(dtype, 'sparse', default=float64)
+
+    # All qubits in state |0>, except control in state |1>
+    Q = zeros(input_string_length*2, dtype=state_type)
+    Q[1] = 1
+
+    H = cached_operator(required_qubits, 'sparse/H', gate_type.name,
+            lambda: sparse_astype(sparse_layer(GATE_H, required_qubits+1),
+                                  gate_type))
+    HI = cached_operator(required_qubits, 'sparse/HI', gate_type.name,
+            lambda: sparse_astype(sparse_layer(GATE_H, required_qubits+1,
+                                               skip_last=True), gate_type))
+    Uf = sparse_uf(input_string).astype(gate_type)
+
+    # Run the quantum circuit (H first, then Uf, then HI)
+    result = Q
+    for operator in H + [Uf] + HI:
+        result = operator @ result
+    return ({'input_string': input_string,
+        'result': result.reshape(-1,1)})
+
+##############################################################################
+# Phase oracle version of the circuit
+##############################################################################
+
+# The control qubit is only there for phase kickback: it sits in state |->,
+# so Uf flips the sign of every position where the string has a 1.  We can
+# get the same effect with a diagonal Uf that has -1 wherever the string has
+# a 1, acting on the other qubits alone:
+#
+# |0> H --+----+-- H ------- M
+# |0> H --| Uf |-- H ------- M
+#         +----+
+#
+# This halves the size of the state and quarters the size of the operators.
+
+def circuit_phase(input_string='01010101', backend='dense', dtype=None):
+    from scipy import sparse
+
+    input_string_length = source_length(input_string)
+    required_qubits = int(math.log(input_string_length,2))
+    check_dtype(dtype, backend, qutip=(backend != 'sparse'))
+    state_type = check_dtype(dtype, backend, default=complex128)
+    gate_type = check_dtype(dtype, backend, default=float64)
+
+    # Uf: -1 wherever the string has a 1, 1 elsewhere
+    Uf = sparse.diags(source_signs(input_string, gate_type), format='csr')
+
+    if backend == 'sparse':
+        H = cached_operator(required_qubits, 'phase/sparse/H', gate_type.name,
+                lambda: sparse_astype(sparse_layer(GATE_H, required_qubits),
+                                      gate_type))
+
+        # All qubits in state |0>
+        result = zeros(input_string_length, dtype=state_type)
+        result[0] = 1
+        for operator in H + [Uf] + H:
+            result = operator @ result
+        result = result.reshape(-1,1)
+    elif backend == 'dense':
+        from qutip import Qobj
+        Q = basis_state(0, required_qubits)
+        H = uniform_layer('H', required_qubits)
+        result = (H * Qobj(Uf, dims=H.dims) * H * Q).full()
+    else:
+        raise ValueError("Unknown backend: {}".format(backend))
+
+    return ({'input_string': input_string,
+        'result': result})
+
+##############################################################################
+# Walsh-Hadamard version of the circuit
+##############################################################################
+
+# A layer of Hadamards on n qubits is the Walsh-Hadamard transform, which can
+# be applied to a vector of 2^n amplitudes in place, in O(n * 2^n) steps, by
+# combining pairs of amplitudes (a, b) into (a + b, a - b): first pairs that
+# are 1 apart, then 2 apart, then 4 apart, and so on.  So we can run the
+# whole circuit without building a single matrix:
+#
+# (1) H on |00...0> gives every amplitude 1/sqrt(2^n)
+# (2) Uf flips the sign of every amplitude where the string has a 1
+# (3) H is the Walsh-Hadamard transform
+#
+# The control qubit stays in state |-> the whole way through (see
+# circuit_phase()), so we only need to add it back at the end.
+
+def walsh_hadamard(vector):
+    gap = 1
+    while gap < vector.size:
+        pairs = vector.reshape(-1, 2, gap)
+        first = pairs[:,0,:].copy()
+        pairs[:,0,:] += pairs[:,1,:]
+        pairs[:,1,:] = first - pairs[:,1,:]
+        gap *= 2
+    vector /= sqrt(vector.size)
+    return vector
+
+def circuit_wht(input_string='01010101', oracle='control', dtype=None):
+
+    input_string_length = source_length(input_string)
+
+    # The amplitudes are real, so they are worked out in the real dtype of
+    # the same precision (float64 unless a dtype is given)
+    state_type = check_dtype(dtype, 'wht', default=complex128)
+
+    # Steps (1) and (2)
+    amplitudes = source_signs(input_string, finfo(state_type).dtype)
+    amplitudes /= sqrt(input_string_length)
+
+    # Step (3)
+    walsh_hadamard(amplitudes)
+
+    if oracle == 'phase':
+        result = amplitudes.astype(state_type).reshape(-1,1)
+    elif oracle == 'control':
+        # Control qubit in state |-> = (|0> - |1>) / sqrt(2)
+        result = zeros([input_string_length*2, 1], dtype=state_type)
+        result[0::2,0] = amplitudes / sqrt(2)
+        result[1::2,0] = -amplitudes / sqrt(2)
+    else:
+        raise ValueError("Unknown oracle: {}".format(oracle))
+
+    return ({'input_string': input_string,
+        'result': result})
+
+##############################################################################
+# Gate-level version of the circuit
+##############################################################################
+
+# The same circuit as a list of gates, run one gate at a time on the state
+# held as an array of shape (2, 2, ..., 2) (see gate_level.py), so that no
+# layer is ever a matrix: H on every qubit, the oracle (which flips control
+# wherever the string has a 1, as Uf does), then H on every qubit except
+# control.  Each gate costs O(2^n).
+
+def circuit_gates(input_string='01010101', oracle='control', dtype=None):
+
+    input_string_length = source_length(input_string)
+    required_qubits = int(math.log(input_string_length,2))
+    state_type = check_dtype(dtype, 'gates', default=complex128)
+    data = range(required_qubits)
+
+    if oracle == 'control':
+        qubit_count, start = required_qubits + 1, 1
+        control = required_qubits
+    elif oracle == 'phase':
+        qubit_count, start = required_qubits, 0
+        control = None
+    else:
+        raise ValueError("Unknown oracle: {}".format(oracle))
+
+    gates = (gate_level.layer('H', range(qubit_count)) +
+             [gate_level.oracle(input_string, control)] +
+             gate_level.layer('H', data))
+    result = gate_level.run(gates, qubit_count, start, state_type)
+    return ({'input_string': input_string,
+        'result': result})
+
+##############################################################################
+# Interpret and print results.
+##############################################################################
+
+# Only the most likely states are printed (top of them, with the control
+# qubit added up; see reporting.py), since the whole state has 2^(n+1)
+# amplitudes.  Set full_state to print every amplitude.  Set summary_path to
+# save a summary of the state as JSON (or as NumPy arrays, for '.npz').
+
+def results(input_string, result, top=4, full_state=False, summary_path=None):
+
+    array_length = len(result)
+    elements = int(math.log(array_length,2))
+
+    # With a phase oracle (see circuit_phase()) there is no control qubit, so
+    # there is one element per input character rather than two, and only
+    # |00...0> tells us whether the function is constant.
+    phase_oracle = (array_length == source_length(input_string))
+    control_qubits = 0 if phase_oracle else 1
+
+    print('-' * 60)
+    state_summary = None
+    if full_state:
+        dump_state(result.real, elements, ket=True)
+    else:
+        state_summary = summary(result, elements, top, control_qubits)
+        print_summary(state_summary)
+    if summary_path:
+        state_summary = state_summary or summary(result, elements, top,
+                                                 control_qubits)
+        write_summary(state_summary, summary_path)
+    print('-' * 60)
+
+    if phase_oracle:
+        winning_elements = "0" * elements
+        probability_winning_elements = abs(result[0]) ** 2
+        print("Probability of |" + winning_elements + ">: " +
+                str(round(probability_winning_elements[0])))
+    else:
+        winning_elements = "0" * (elements-1)
+        probability_winning_elements = result[0] ** 2 + result[1] ** 2
+        print("Probability of |" + winning_elements + "0> or |" +
+                winning_elements + "1>: " +
+                str(round(probability_winning_elements[0]. real)))
+
+    print("Input         :", describe(input_string))
+
+    # The input is constant if it is all 0s or all 1s
+    ones = count_ones(input_string)
+    input_constant = (ones == 0 or ones == source_length(input_string))
+
+    # Interpret the results: if the first or second qubit is > 0.5 (it will be
+    # the inverse of root-2, or 0.70710678), then the function is constant.
+    # Otherwise, the function is balanced.  With a phase oracle, the first
+    # qubit will be 1 or -1 if the function is constant.
+    if phase_oracle:
+        constant = abs(result[0]) > 0.5
+    else:
+        constant = (result[0] > 0.5 or result[1] > 0.5)
+
+    if constant:
+        print('Interpretation: constant', end='')
+        if input_constant:
+            print(" (confirmed)")
+        else:
+            print(" (error)")
+    else:
+        print('Interpretation: balanced', end='')
+        if not input_constant:
+            print(" (confirmed)")
+        else:
+            print(" (error)")
+    print('-' * 60)
+
+##############################################################################
+# Bulk classification
+##############################################################################
+
+# To classify many input strings, we do not need the whole result vector:
+# the function is constant exactly when we measure |00...0> (or |00...01>,
+# with the control qubit).  After the Walsh-Hadamard transform (see
+# circuit_wht()), the amplitude of |00...0> is the mean of the signs of Uf,
+# so with N characters of which k are 1s, the probability of measuring it is
+#
+#   ((N - 2k) / N)^2
+#
+# which is 1 for a constant string and 0 for a balanced one.  That takes
+# one pass over each string, and no memory beyond the string itself.  Bulk
+# mode evaluates this formula; it does not simulate the circuit.
+#
+# Input files hold either one string per line (text), or fixed-length
+# bit-packed records (see packed_input.py), each padded to a whole number of
+# bytes.  Results are written as a .npy file of one byte per string: 0 for
+# constant, 1 for balanced, and 2 for a string the algorithm does not apply
+# to: one with characters other than 0 and 1, a length that is not a power
+# of 2 (2 or more), or neither constant nor balanced (the probability is
+# then strictly between 0 and 1).
+
+CONSTANT = 0
+BALANCED = 1
+INVALID = 2
+
+# Classify, given the number of 1s and the number of characters in each
+# string.  (N - 2k) / N is exactly 1, -1 or 0 for a constant or balanced
+# string, so the probability can be compared exactly.
+def classify_counts(ones, lengths):
+    lengths = asarray(lengths, dtype=int64)
+    probability_winning_elements = ((lengths - 2 * asarray(ones, float64)) /
+                                    lengths) ** 2
+    codes = full(lengths.shape, INVALID, dtype=uint8)
+    codes[probability_winning_elements == 1] = CONSTANT
+    codes[probability_winning_elements == 0] = BALANCED
+    codes[(lengths < 2) | (lengths & (lengths - 1) != 0)] = INVALID
+    return codes
+
+# Worker: classify a list of input strings.  Stripping 0s and 1s from both
+# ends leaves nothing only if there is no other character.
+def classify_strings(input_strings):
+    ones = [count_ones(input_string) for input_string in input_strings]
+    lengths = [source_length(input_string) for input_string in input_strings]
+    codes = classify_counts(ones, lengths)
+    codes[[bool(input_string.strip('01'))
+           for input_string in input_strings]] = INVALID
+    return codes
+
+# Worker: classify packed records start, start+1, ... stop-1 of a file.  Each
+# worker opens (memory-maps) the file itself, so records are not pickled.
+def classify_packed_records(task):
+    path, length, start, stop = task
+    record_bytes = (length + 7) // 8
+    records = memmap(path, dtype=uint8, mode='r')
+    block = records[start*record_bytes:stop*record_bytes].reshape(
+        -1, record_bytes)
+    ones = unpackbits(block, axis=1, count=length).sum(axis=1)
+    return classify_counts(ones, full(ones.size, length))
+
+# Split an input file into tasks of <chunk_size> strings each
+def bulk_tasks(path, length=None, chunk_size=1024):
+    if length is None:
+        with open(path) as lines:
+            chunk = []
+            for line in lines:
+                line = line.strip()
+                if line:
+                    chunk.append(line)
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+    else:
+        record_count = packed_record_count(path, length)
+        for start in range(0, record_count, chunk_size):
+            yield (path, length, start,
+                   builtins.min(start + chunk_size, record_count))
+
+# The number of <length>-bit records in a packed file.  Raises ValueError if
+# the length is not a power of 2, or the file ends part way through a record.
+def packed_record_count(path, length):
+    if length < 2 or length & (length - 1):
+        raise ValueError("Packed records must be a power of 2 bits long, not "
+                         "{}".format(length))
+    record_bytes = (length + 7) // 8
+    record_count, extra = divmod(os.path.getsize(path), record_bytes)
+    if extra:
+        raise ValueError("{} ends with a partial record ({} of {} "
+                         "bytes)".format(path, extra, record_bytes))
+    return record_count
+
+# Classify every string in <path> using a pool of <workers> processes, write
+# the results to <output>, and return some statistics.  Set length to the
+# number of bits per record for packed files; leave it as None for text.
+def classify_bulk(path, output, length=None, workers=None, chunk_size=1024):
+    workers = workers or os.cpu_count()
+    if length is None:
+        worker = classify_strings
+    else:
+        # Checked here, so that a bad file is refused before any work
+        packed_record_count(path, length)
+        worker = classify_packed_records
+
+    start_time = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        chunks = list(pool.imap(worker, bulk_tasks(path, length, chunk_size)))
+    codes = concatenate(chunks) if chunks else zeros(0, dtype=uint8)
+    seconds = time.perf_counter() - start_time
+
+    save(output, codes)
+    return {'strings': codes.size,
+            'constant': int(count_nonzero(codes == CONSTANT)),
+            'balanced': int(count_nonzero(codes == BALANCED)),
+            'invalid': int(count_nonzero(codes == INVALID)),
+            'seconds': seconds,
+            'workers': workers,
+            'strings_per_second': codes.size / seconds,
+            'strings_per_second_per_core': codes.size / seconds / workers}
+
+##############################################################################
+# Main
+##############################################################################
+
+# Get output of the circuit, based on an input string (default is '01010101');
+# valid inputs are, for example, '00000000' or '11111111' (constant) or
+# '01010101' (balanced).  See comments above for details.
+#
+# output = circuit('00000000') # (constant)
+# output = circuit('11111111') # (constant)
+#
+# Alternatively, classify every string in a file:
+#
+# python Deutsch-Jozsa.py --bulk inputs.txt --output results.npy
+# python Deutsch-Jozsa.py --bulk inputs.bin --packed-length 1024
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Deutsch-Jozsa Algorithm')
+    parser.add_argument('--bulk', metavar='FILE',
+                        help='classify every input string in FILE')
+    parser.add_argument('--packed-length', type=int, metavar='BITS',
+                        help='FILE holds bit-packed records of BITS bits each')
+    parser.add_argument('--output', default='results.npy',
+                        help='where to write bulk results (default: results.npy)')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=1024,
+                        help='strings per task sent to a worker (default: 1024)')
+    parser.add_argument('--backend', default='dense',
+                        choices=['dense', 'sparse', 'wht', 'gates'],
+                        help='how to simulate the circuit (default: dense)')
+    parser.add_argument('--dtype', choices=DTYPES,
+                        help='dtype of the state and operators (the dense '
+                             'backend only supports complex128)')
+    parser.add_argument('--top', type=int, default=4,
+                        help='number of most likely states to print '
+                             '(default: 4)')
+    parser.add_argument('--full-state', action='store_true',
+                        help='print every amplitude of the final state')
+    parser.add_argument('--summary', metavar='FILE',
+                        help='save a summary of the final state as JSON (or '
+                             'as NumPy arrays, if FILE ends in .npz)')
+    parser.add_argument('--shots', type=int,
+                        help='also measure the final state this many times')
+    parser.add_argument('--seed', type=int,
+                        help='seed for the measurements')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='keep the final state in DIR, and reuse it in '
+                             'later runs')
+    parser.add_argument('--cache-size', metavar='SIZE', default='4G',
+                        help='most disk space the cache may use (default: '
+                             '4G)')
+    arguments = parser.parse_args(arguments)
+
+    # The dense backend uses QuTiP, which only runs in complex128: say so
+    # before anything is built
+    try:
+        check_dtype(arguments.dtype, arguments.backend,
+                    qutip=arguments.backend == 'dense')
+    except ValueError as error:
+        parser.error('{}; choose --backend sparse, wht or gates for '
+                     '--dtype {}'.format(error, arguments.dtype))
+    if arguments.cache:
+        disk_cache.configure(arguments.cache, parse_size(arguments.cache_size))
+
+    if arguments.bulk:
+        try:
+            stats = classify_bulk(arguments.bulk, arguments.output,
+                                  arguments.packed_length, arguments.workers,
+                                  arguments.chunk_size)
+        except ValueError as error:
+            parser.error(str(error))
+        print('-' * 60)
+        print('Strings classified :', stats['strings'])
+        print('Constant           :', stats['constant'])
+        print('Balanced           :', stats['balanced'])
+        print('Invalid            :', stats['invalid'])
+        print('Results written to :', arguments.output)
+        print('Time (seconds)     : {:.3f}'.format(stats['seconds']))
+        print('Strings/sec        : {:.0f}'.format(stats['strings_per_second']))
+        print('Strings/sec/core   : {:.0f} ({} workers)'.format(
+            stats['strings_per_second_per_core'], stats['workers']))
+        print('-' * 60)
+    else:
+        input_string = '01010101'
+
+        # A run that has been done before is loaded from the disk cache, if
+        # it is on (see disk_cache.py)
+        result = disk_cache.cached(
+            {'script': 'deutsch-jozsa',
+             'input': source_digest(input_string),
+             'iterations': 0,
+             'method': arguments.backend,
+             'dtype': arguments.dtype or 'default'},
+            lambda: circuit(input_string, arguments.backend,
+                            dtype=arguments.dtype)['result'])
+        output = {'input_string': input_string, 'result': result}
+
+        # Interpret and print results of running the circuit
+        results(output['input_string'],output['result'],arguments.top,
+                arguments.full_state,arguments.summary)
+
+        # Measure the qubits other than control: the function is constant if
+        # every shot gives |00...0>
+        if arguments.shots:
+            counts = histogram(output['result'], arguments.shots,
+                               arguments.seed, marginalise=True)
+            print('Shots giving all 0s      : {} of {}'.format(
+                counts[0], arguments.shots))
+            print('-' * 60)
+
+        # In a reduced-precision dtype, compare with a complex128 run
+        if arguments.dtype:
+            reference = circuit(input_string, arguments.backend,
+                                dtype='complex128')
+            error = measured_error(output['result'], reference['result'])
+            print('Dtype                    :', arguments.dtype)
+            print('Error bound (a priori)   : {:.3e}'.format(
+                error_bound(arguments.dtype,
+                            int(math.log(len(input_string),2)), 0,
+                            'deutsch-jozsa')))
+            print('Error (measured)         : {:.3e}'.format(error['norm']))
+            print('-' * 60)
+
+if __name__ == '__main__':
+    main()
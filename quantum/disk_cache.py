@@ -0,0 +1,259 @@
+#############################################################################
+# This module keeps final states and expensive operators on disk, so that a
+# run that has been done before (by this process or any other) is loaded
+# rather than worked out again.
+#
+# The operator cache (operator_cache.py) only lasts as long as the process.
+# This cache is a directory of .npy files, one per array, named after a
+# SHA-256 hash of everything that determines the array: for a final state,
+# the script, the input (by digest; see source_digest() in packed_input.py),
+# the number of iterations, the method and the dtype.  Any process that
+# computes the same key finds the same file.
+#
+# (1) Loading opens the file as a read-only memory map (open_memmap()), so
+#     nothing is read until it is used, and only the pages used are read.
+# (2) Storing writes a temporary file in the same directory and renames it
+#     into place with os.replace(), so another process sees either no file
+#     or the whole file, never part of one.
+# (3) The cache holds at most <max_bytes> bytes.  Each load touches the
+#     file's modification time, and when a store takes the cache over its
+#     budget, the least recently used files are removed first.  Stores and
+#     evictions hold an exclusive lock (fcntl.flock() on '.lock' in the
+#     directory, where the platform has it), so two processes never evict at
+#     once.  A file removed while another process has it mapped stays valid
+#     for that process until it is unmapped.
+# (4) A process killed while writing leaves its temporary file behind.
+#     Evictions remove temporary files that have not been written to for
+#     STALE_SECONDS (a file still being written keeps getting newer), and
+#     cache_stats() counts them, so that they cannot fill the disk unseen.
+#
+# The cache is off until configure() is called with a directory.
+#
+# Usage:
+#
+#   from quantum import disk_cache
+#   disk_cache.configure('~/.cache/quantum', max_bytes=2**30)
+#   state = disk_cache.cached({'script': 'grover', ...}, run)
+##############################################################################
+
+from numpy import *
+from numpy.lib.format import open_memmap, write_array
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Default size budget: 4 GiB
+DEFAULT_MAX_BYTES = 4 * 2 ** 30
+
+LOCK = '.lock'
+
+# A temporary file untouched for this long was left by a writer that died
+STALE_SECONDS = 3600
+
+_settings = {'directory': None,
+             'max_bytes': DEFAULT_MAX_BYTES}
+_stats = {'hits': 0,
+          'misses': 0,
+          'stores': 0,
+          'evictions': 0}
+
+#-----------------------------------------------------------------------------
+# Function: configure(directory, max_bytes)
+#-----------------------------------------------------------------------------
+# Turn the cache on, in <directory> (created if need be), or off with
+# directory=None.  If the directory holds more than <max_bytes>, the least
+# recently used files are evicted straight away.
+#-----------------------------------------------------------------------------
+# directory: where to keep the cached arrays
+# max_bytes: most bytes of arrays to keep
+#-----------------------------------------------------------------------------
+def configure(directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    if directory is not None:
+        directory = os.path.expanduser(directory)
+        os.makedirs(directory, exist_ok=True)
+    _settings.update(directory=directory, max_bytes=max_bytes)
+    if directory is not None:
+        with _locked():
+            _evict()
+
+#-----------------------------------------------------------------------------
+# Function: enabled()
+#-----------------------------------------------------------------------------
+def enabled():
+    return _settings['directory'] is not None
+
+#-----------------------------------------------------------------------------
+# Function: cache_key(fields)
+#-----------------------------------------------------------------------------
+# The hash that names the file for a dictionary of fields (strings, numbers
+# and None).  The fields are written as JSON with sorted keys, so the order
+# they are given in does not matter.
+#-----------------------------------------------------------------------------
+def cache_key(fields):
+    text = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+#-----------------------------------------------------------------------------
+# Function: cache_path(key)
+#-----------------------------------------------------------------------------
+def cache_path(key):
+    return os.path.join(_settings['directory'], key + '.npy')
+
+#-----------------------------------------------------------------------------
+# Function: load(key)
+#-----------------------------------------------------------------------------
+# The cached array for <key>, memory-mapped read-only, or None if there is
+# none (or the cache is off).
+#-----------------------------------------------------------------------------
+def load(key):
+    if not enabled():
+        return None
+    path = cache_path(key)
+    try:
+        array = open_memmap(path, mode='r')
+        os.utime(path)
+    except FileNotFoundError:
+        # Never stored, or evicted by another process
+        _stats['misses'] += 1
+        return None
+    except ValueError:
+        # Not a readable .npy file: drop it, and work the array out again
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        _stats['misses'] += 1
+        return None
+    _stats['hits'] += 1
+    return array
+
+#-----------------------------------------------------------------------------
+# Function: store(key, array)
+#-----------------------------------------------------------------------------
+# Save <array> under <key>, then evict old files if the cache is over its
+# budget.  Arrays bigger than the whole budget are not stored.  Returns True
+# if the array was stored.
+#-----------------------------------------------------------------------------
+def store(key, array):
+    if not enabled():
+        return False
+    array = asarray(array)
+    if array.nbytes > _settings['max_bytes']:
+        return False
+
+    # Write the whole file under a temporary name first
+    directory = _settings['directory']
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            write_array(output, array, allow_pickle=False)
+            output.flush()
+            os.fsync(output.fileno())
+        with _locked():
+            os.replace(temporary, cache_path(key))
+            _evict()
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary)
+        raise
+    _stats['stores'] += 1
+    return True
+
+#-----------------------------------------------------------------------------
+# Function: cached(fields, compute)
+#-----------------------------------------------------------------------------
+# The array for <fields>: loaded from the cache if it is there, and otherwise
+# worked out with compute() and stored.  With the cache off, this is just
+# compute().
+#-----------------------------------------------------------------------------
+# fields: dictionary of everything the array depends on (see cache_key())
+# compute: function of no arguments that returns the array
+#-----------------------------------------------------------------------------
+def cached(fields, compute):
+    if not enabled():
+        return compute()
+    key = cache_key(fields)
+    array = load(key)
+    if array is None:
+        array = compute()
+        store(key, array)
+    return array
+
+#-----------------------------------------------------------------------------
+# Function: _locked()
+#-----------------------------------------------------------------------------
+# A context manager holding the cache's exclusive lock (or nothing, where
+# fcntl is not available).
+#-----------------------------------------------------------------------------
+@contextlib.contextmanager
+def _locked():
+    if fcntl is None:
+        yield
+        return
+    handle = os.open(os.path.join(_settings['directory'], LOCK),
+                     os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(handle)
+
+#-----------------------------------------------------------------------------
+# Function: _scan(suffix)
+#-----------------------------------------------------------------------------
+# (modification time, size, path) of each file in the cache whose name ends
+# with <suffix>.  Files removed by another process while scanning are left
+# out.
+#-----------------------------------------------------------------------------
+def _scan(suffix):
+    entries = []
+    for entry in os.scandir(_settings['directory']):
+        if entry.name.endswith(suffix):
+            with contextlib.suppress(FileNotFoundError):
+                status = entry.stat()
+                entries.append((status.st_mtime, status.st_size, entry.path))
+    return entries
+
+#-----------------------------------------------------------------------------
+# Function: _evict()
+#-----------------------------------------------------------------------------
+# Remove stale temporary files, and then the least recently used files until
+# the cache is within budget.  Called with the lock held.
+#-----------------------------------------------------------------------------
+def _evict():
+    stale = time.time() - STALE_SECONDS
+    for modified, _, path in _scan('.tmp'):
+        if modified < stale:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+    entries = _scan('.npy')
+    total = sum([size for _, size, _ in entries])
+    for _, size, path in sorted(entries):
+        if total <= _settings['max_bytes']:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+            _stats['evictions'] += 1
+        total -= size
+
+#-----------------------------------------------------------------------------
+# Function: cache_stats()
+#-----------------------------------------------------------------------------
+# Counters for monitoring: hits, misses, stores and evictions by this
+# process, the files and bytes in the cache now, and the temporary files
+# (being written, or left by writers that died) and their bytes.
+#-----------------------------------------------------------------------------
+def cache_stats():
+    entries = _scan('.npy') if enabled() else []
+    temporary = _scan('.tmp') if enabled() else []
+    return dict(_stats, files=len(entries),
+                bytes=sum([size for _, size, _ in entries]),
+                temporary_files=len(temporary),
+                temporary_bytes=sum([size for _, size, _ in temporary]),
+                max_bytes=_settings['max_bytes'])
@@ -0,0 +1,198 @@
+#############################################################################
+# This module runs a circuit one gate at a time, without building the
+# (2^n x 2^n) matrix of any layer.
+#
+# circuit() in Grover.py and Deutsch-Jozsa.py multiplies whole layers
+# together: HxI is a Kronecker product of n Hadamards, and so on.  But a
+# circuit is really a list of small gates, each acting on one qubit (perhaps
+# with some control qubits).  Here the state of n qubits is kept as an
+# n-dimensional array of shape (2, 2, ..., 2), so that axis k is qubit k (the
+# first qubit is the most significant bit, as everywhere else).  A gate on
+# qubit k then only pairs up the two halves of the array along axis k:
+#
+#   zero = state[..., 0, ...]      (qubit k is 0)
+#   one  = state[..., 1, ...]      (qubit k is 1)
+#
+#   X:  swap zero and one
+#   Z:  one  -> -one
+#   H:  zero -> (zero + one) / sqrt(2),  one -> (zero - one) / sqrt(2)
+#
+# These are views into the state, so each gate is O(2^n) and works in place.
+# Control qubits fix their axes at 1 first, so a gate with k controls only
+# touches 2^(n-k) amplitudes; a multi-controlled Z or NOT costs less than a
+# plain one.
+#
+# A gate is a dictionary: {'gate': 'H', 'target': 0, 'controls': ()}.
+# gate() builds one, and layer() a layer of them.  The oracle of a circuit is
+# one more kind of gate (see oracle()): given the input string, it flips the
+# target qubit (or, without a target, the sign) wherever the string has a 1.
+# The input is read a chunk at a time as the oracle is applied (see
+# packed_input.py), so a packed input is never unpacked all at once.
+#
+# Any trailing axes after the n qubit axes are left alone, so operator() can
+# run a gate list on every basis state at once and recover its matrix: the
+# same engine builds uf1()- and dif1()-style operators from their gates.
+#
+# Usage:
+#
+#   from quantum.gate_level import gate, layer, run
+#   bell = run(layer('H', [0]) + [gate('X', 1, controls=[0])], 2)
+##############################################################################
+
+from numpy import *
+from .packed_input import iter_bits
+
+#-----------------------------------------------------------------------------
+# Function: gate(name, target, controls)
+#-----------------------------------------------------------------------------
+# A single gate: 'H', 'X', 'Z' or 'I' on qubit <target>, applied only where
+# every qubit in <controls> is 1.  For example, gate('X', 2, controls=[0, 1])
+# is a Toffoli gate, and gate('Z', n-1, controls=range(n-1)) is the
+# controlled-Z in dif1().
+#-----------------------------------------------------------------------------
+def gate(name, target, controls=()):
+    if name not in ('H', 'X', 'Z', 'I'):
+        raise ValueError("Unknown gate: {}".format(name))
+    controls = tuple(controls)
+    if target in controls:
+        raise ValueError("Qubit {} is both target and control".format(target))
+    return {'gate': name, 'target': target, 'controls': controls}
+
+#-----------------------------------------------------------------------------
+# Function: layer(name, qubits)
+#-----------------------------------------------------------------------------
+# The same gate on each of <qubits>: layer('H', range(n)) is H all the way
+# down.
+#-----------------------------------------------------------------------------
+def layer(name, qubits):
+    return [gate(name, qubit) for qubit in qubits]
+
+#-----------------------------------------------------------------------------
+# Function: oracle(source, target)
+#-----------------------------------------------------------------------------
+# The oracle Uf for an input: wherever the input (one character per basis
+# state of the other qubits) has a 1, flip <target>; with target=None, flip
+# the sign of the amplitude instead (a phase oracle, with no control qubit).
+# The target must be the last qubit.
+#-----------------------------------------------------------------------------
+# source: input string, packed source from open_packed(), or array of 0s
+#         and 1s
+# target: the control qubit, or None for a phase oracle
+#-----------------------------------------------------------------------------
+def oracle(source, target=None):
+    return {'gate': 'oracle', 'target': target, 'source': source}
+
+#-----------------------------------------------------------------------------
+# Function: apply_gate(state, operation, qubit_count)
+#-----------------------------------------------------------------------------
+# Apply one gate to a state of shape (2,)*qubit_count (plus any trailing
+# axes), in place.
+#-----------------------------------------------------------------------------
+def apply_gate(state, operation, qubit_count):
+    name = operation['gate']
+    target = operation['target']
+    if name == 'oracle':
+        return _apply_oracle(state, operation, qubit_count)
+    if name == 'I':
+        return state
+
+    # The views of the state where the target is 0 and 1 (and every control
+    # is 1).  The Ellipsis keeps them views even when every axis is fixed.
+    index = [slice(None)] * qubit_count + [Ellipsis]
+    for control in operation['controls']:
+        index[control] = 1
+    index[target] = 0
+    zero = state[tuple(index)]
+    index[target] = 1
+    one = state[tuple(index)]
+
+    if name == 'X':
+        first = zero.copy()
+        zero[...] = one
+        one[...] = first
+    elif name == 'Z':
+        negative(one, out=one)
+    elif name == 'H':
+        first = zero + one
+        subtract(zero, one, out=one)
+        one *= 1 / sqrt(2)
+        multiply(first, 1 / sqrt(2), out=zero)
+    return state
+
+#-----------------------------------------------------------------------------
+# Function: _apply_oracle(state, operation, qubit_count)
+#-----------------------------------------------------------------------------
+# Apply an oracle from oracle(): view the state as (basis states of the
+# other qubits, target), and swap the two columns of every row that has a 1.
+# The rows are taken a chunk of the input at a time.
+#-----------------------------------------------------------------------------
+def _apply_oracle(state, operation, qubit_count):
+    source = operation['source']
+    if isinstance(source, ndarray):
+        chunks = [(0, source.astype(bool_))]
+    else:
+        chunks = iter_bits(source)
+    trailing = state.shape[qubit_count:]
+    if operation['target'] is None:
+        rows = state.reshape((-1,) + trailing)
+    elif operation['target'] != qubit_count - 1:
+        raise ValueError("The oracle's target must be the last qubit")
+    else:
+        rows = state.reshape((-1, 2) + trailing)
+
+    for start, bits in chunks:
+        block = rows[start:start + bits.size]
+        if operation['target'] is None:
+            block[bits] *= -1
+        else:
+            block[bits] = block[bits][:, ::-1]
+    return state
+
+#-----------------------------------------------------------------------------
+# Function: apply_gates(state, gates, qubit_count)
+#-----------------------------------------------------------------------------
+# Apply a list of gates, in circuit order (the first gate first), in place.
+#-----------------------------------------------------------------------------
+def apply_gates(state, gates, qubit_count):
+    for operation in gates:
+        apply_gate(state, operation, qubit_count)
+    return state
+
+#-----------------------------------------------------------------------------
+# Function: basis_tensor(index, qubit_count, dtype)
+#-----------------------------------------------------------------------------
+# The basis state given by the binary digits of <index>, as an array of shape
+# (2,)*qubit_count.
+#-----------------------------------------------------------------------------
+def basis_tensor(index, qubit_count, dtype=complex128):
+    state = zeros((2,) * qubit_count, dtype=dtype)
+    state.reshape(-1)[index] = 1
+    return state
+
+#-----------------------------------------------------------------------------
+# Function: run(gates, qubit_count, index, dtype)
+#-----------------------------------------------------------------------------
+# Run a list of gates on a basis state, and return the final state as a
+# column vector (as the other backends do).
+#-----------------------------------------------------------------------------
+# gates: list of gates from gate(), layer() and oracle()
+# qubit_count: number of qubits
+# index: the basis state to start from (default: |00...0>)
+# dtype: dtype of the state
+#-----------------------------------------------------------------------------
+def run(gates, qubit_count, index=0, dtype=complex128):
+    state = apply_gates(basis_tensor(index, qubit_count, dtype), gates,
+                        qubit_count)
+    return state.reshape(-1, 1)
+
+#-----------------------------------------------------------------------------
+# Function: operator(gates, qubit_count, dtype)
+#-----------------------------------------------------------------------------
+# The matrix of a list of gates: the gates are run on every basis state at
+# once (the identity matrix, with one trailing axis for the columns).  This
+# is O(4^n), for building or checking operators, not for running circuits.
+#-----------------------------------------------------------------------------
+def operator(gates, qubit_count, dtype=complex128):
+    size = 2 ** qubit_count
+    columns = identity(size, dtype=dtype).reshape((2,) * qubit_count + (size,))
+    return apply_gates(columns, gates, qubit_count).reshape(size, size)
@@ -0,0 +1,240 @@
+#############################################################################
+# This module is a small library of n-qubit gates and states, shared by
+# Deutsch.py, Deutsch-Jozsa.py and Grover.py.
+#
+# Each script needs the same kinds of combined operations: a gate on every
+# qubit (e.g. 'H', Hadamards all the way down), or a gate on every qubit
+# except the last one, the control qubit, which gets a different gate (e.g.
+# 'HxI', Hadamards all the way down except Identity at the bottom).  Built
+# one tensor() at a time, these take n Kronecker products, each allocating a
+# bigger matrix than the one before.  Instead, the builders here write each
+# operator straight into a single matrix of its final size, and keep the
+# result in the operator cache (see operator_cache.py) so the next call for
+# the same number of qubits costs nothing.  The exception is flip_layer(),
+# which depends on the needle.
+#
+# The naming follows the scripts: a capital letter is a gate all the way
+# down, so uniform_layer('H', 3) is H, and all_but_last('H', 'I', 3) is HxI.
+#
+# Cached operators are shared, so they must not be modified in place.
+#
+# QuTiP and SciPy are only imported when an operator is first built, so that
+# importing this module (and the scripts that use it) stays fast.
+##############################################################################
+
+from numpy import *
+from .operator_cache import cached_operator
+
+# Single-qubit gates, by name
+def single_gate(name):
+    from qutip import qeye, sigmax
+    from qutip.qip.operations import hadamard_transform
+    if name == 'H':
+        return hadamard_transform(1)
+    elif name == 'X':
+        return sigmax()
+    elif name == 'I':
+        return qeye(2)
+    raise ValueError("Unknown gate: {}".format(name))
+
+# Single-qubit gates as plain arrays, for the sparse builders
+GATE_H = array([[1, 1], [1, -1]]) / sqrt(2)
+GATE_X = array([[0, 1], [1, 0]])
+GATE_I = identity(2)
+
+#-----------------------------------------------------------------------------
+# Function: operator_dims(qubit_count)
+#-----------------------------------------------------------------------------
+# QuTiP dimensions of an operator on <qubit_count> qubits, so that it can be
+# multiplied with operators built by tensor().
+#-----------------------------------------------------------------------------
+def operator_dims(qubit_count):
+    return [[2] * qubit_count, [2] * qubit_count]
+
+#-----------------------------------------------------------------------------
+# Function: basis_state(index, qubit_count)
+#-----------------------------------------------------------------------------
+# The combined state of <qubit_count> qubits given by the binary digits of
+# <index>.  For example, basis_state(1, 3) is |0>|0>|1>, the state of two
+# qubits in state |0> plus a control qubit in state |1>.
+#-----------------------------------------------------------------------------
+# index: number of the basis state (0 to 2^qubit_count - 1)
+# qubit_count: number of qubits
+#-----------------------------------------------------------------------------
+def basis_state(index, qubit_count):
+    def build():
+        from qutip import Qobj
+        from scipy import sparse
+        state = sparse.csr_matrix(([1.0], ([index], [0])),
+                                  shape=(2 ** qubit_count, 1), dtype=complex128)
+        return Qobj(state, dims=[[2] * qubit_count, [1] * qubit_count])
+    return cached_operator(qubit_count, 'gates/basis/{}'.format(index),
+                           'complex128', build)
+
+#-----------------------------------------------------------------------------
+# Function: hadamard_matrix(qubit_count)
+#-----------------------------------------------------------------------------
+# Hadamards all the way down, as a plain array.  This is built in place in a
+# single array: the Hadamard matrix for k+1 qubits is
+#
+#   | M   M |
+#   | M  -M |
+#
+# where M is the matrix for k qubits, so we copy the top-left corner into
+# the other three quarters, doubling the size each time.
+#-----------------------------------------------------------------------------
+def hadamard_matrix(qubit_count):
+    size = 2 ** qubit_count
+    H = empty([size, size])
+    H[0, 0] = 1 / sqrt(size)
+    half = 1
+    while half < size:
+        H[:half, half:2*half] = H[:half, :half]
+        H[half:2*half, :half] = H[:half, :half]
+        negative(H[:half, :half], out=H[half:2*half, half:2*half])
+        half *= 2
+    return H
+
+#-----------------------------------------------------------------------------
+# Function: flip_matrix(mask, qubit_count)
+#-----------------------------------------------------------------------------
+# X on every qubit whose bit is set in <mask>, and I on the rest, as a
+# sparse permutation matrix: basis state i goes to basis state i XOR mask.
+#-----------------------------------------------------------------------------
+def flip_matrix(mask, qubit_count):
+    size = 2 ** qubit_count
+    return sparse_permutation(arange(size) ^ mask)
+
+#-----------------------------------------------------------------------------
+# Function: uniform_layer(name, qubit_count)
+#-----------------------------------------------------------------------------
+# The same gate on every qubit: 'H', 'X' or 'I' all the way down.
+#-----------------------------------------------------------------------------
+# name: 'H', 'X' or 'I'
+# qubit_count: number of qubits
+#-----------------------------------------------------------------------------
+def uniform_layer(name, qubit_count):
+    def build():
+        from qutip import Qobj
+        from scipy import sparse
+        if name == 'H':
+            matrix = hadamard_matrix(qubit_count)
+        elif name == 'X':
+            matrix = flip_matrix(2 ** qubit_count - 1, qubit_count)
+        elif name == 'I':
+            matrix = sparse.identity(2 ** qubit_count, format='csr')
+        else:
+            raise ValueError("Unknown gate: {}".format(name))
+        return Qobj(matrix, dims=operator_dims(qubit_count))
+    return cached_operator(qubit_count, 'gates/' + name, 'complex128', build)
+
+#-----------------------------------------------------------------------------
+# Function: all_but_last(name, last, qubit_count)
+#-----------------------------------------------------------------------------
+# One gate on every qubit except the last (the control qubit), which gets
+# another gate.  all_but_last('H', 'I', n) is HxI, and all_but_last('I',
+# 'X', n) is IxX.  This takes a single Kronecker product.
+#-----------------------------------------------------------------------------
+# name: gate for all but the last qubit ('H', 'X' or 'I')
+# last: gate for the last qubit ('H', 'X' or 'I')
+# qubit_count: total number of qubits (including the last)
+#-----------------------------------------------------------------------------
+def all_but_last(name, last, qubit_count):
+    def build():
+        from qutip import tensor
+        if qubit_count == 1:
+            return single_gate(last)
+        return tensor(uniform_layer(name, qubit_count - 1), single_gate(last))
+    return cached_operator(qubit_count, 'gates/{}x{}'.format(name, last),
+                           'complex128', build)
+
+#-----------------------------------------------------------------------------
+# Function: flip_layer(mask, qubit_count)
+#-----------------------------------------------------------------------------
+# X on the qubits picked out by the bits of <mask> (the first qubit is the
+# most significant bit) and I on the rest.  For example, in Grover.py UfXI
+# is X for every 0 in the needle's binary position, and I for the control
+# qubit.
+#
+# This depends on the needle, so unlike the layers above it is not cached:
+# each needle would add an entry that no other circuit uses, pushing out the
+# operators that every circuit of that size shares.  Building it is a single
+# permutation.
+#-----------------------------------------------------------------------------
+# mask: integer whose set bits mark the qubits that get X
+# qubit_count: number of qubits
+#-----------------------------------------------------------------------------
+def flip_layer(mask, qubit_count):
+    from qutip import Qobj
+    return Qobj(flip_matrix(mask, qubit_count),
+                dims=operator_dims(qubit_count))
+
+##############################################################################
+# Sparse builders
+##############################################################################
+
+# These return SciPy CSR matrices rather than QuTiP Qobjs, for the sparse
+# backends in Grover.py and Deutsch-Jozsa.py.
+
+#-----------------------------------------------------------------------------
+# Function: sparse_tensor(gates)
+#-----------------------------------------------------------------------------
+# The sparse equivalent of tensor(): combine single-qubit gates into one
+# operator.  The result is stored in CSR form, so a layer of X or I gates
+# holds exactly one nonzero per row rather than a full matrix of zeros.
+#-----------------------------------------------------------------------------
+# gates: list of (2 x 2) matrices, from the top qubit to the bottom qubit
+#-----------------------------------------------------------------------------
+def sparse_tensor(gates):
+    from scipy import sparse
+    combined = sparse.identity(1, format='csr')
+    for gate in gates:
+        combined = sparse.kron(combined, sparse.csr_matrix(gate), format='csr')
+    return combined
+
+#-----------------------------------------------------------------------------
+# Function: sparse_layer(gate, qubit_count, skip_last)
+#-----------------------------------------------------------------------------
+# A layer of identical gates (e.g. Hadamards all the way down) as a list of
+# sparse operators, one per qubit, each with the gate on that qubit and I
+# everywhere else.  The combined layer is dense for Hadamards, but each of
+# these factors has only two nonzeros per row, so applying the list in turn
+# costs O(n * 2^n) rather than O(4^n).
+#-----------------------------------------------------------------------------
+# gate: (2 x 2) matrix
+# qubit_count: total number of qubits (including control)
+# skip_last: True to leave I on the control qubit (e.g. HxI rather than H)
+#-----------------------------------------------------------------------------
+def sparse_layer(gate, qubit_count, skip_last=False):
+    from scipy import sparse
+    layer = []
+    for i in range(qubit_count - (1 if skip_last else 0)):
+        layer.append(sparse.kron(sparse.kron(sparse.identity(2**i),
+                                             sparse.csr_matrix(gate)),
+                                 sparse.identity(2**(qubit_count-i-1)),
+                                 format='csr'))
+    return layer
+
+#-----------------------------------------------------------------------------
+# Function: sparse_astype(operators, dtype)
+#-----------------------------------------------------------------------------
+# Convert a sparse operator, or a list of them (as from sparse_layer()), to
+# another dtype.
+#-----------------------------------------------------------------------------
+def sparse_astype(operators, dtype):
+    if isinstance(operators, list):
+        return [operator.astype(dtype) for operator in operators]
+    return operators.astype(dtype)
+
+#-----------------------------------------------------------------------------
+# Function: sparse_permutation(targets)
+#-----------------------------------------------------------------------------
+# A permutation matrix in CSR form that takes basis state i to targets[i].
+# Uf and CxNOT are permutations, so they need one nonzero per row.
+#-----------------------------------------------------------------------------
+# targets: integer array, where targets[i] is the row of the 1 in column i
+#-----------------------------------------------------------------------------
+def sparse_permutation(targets):
+    from scipy import sparse
+    return sparse.csr_matrix((ones(targets.size), (targets, arange(targets.size))),
+                             shape=(targets.size, targets.size))
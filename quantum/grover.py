@@ -0,0 +1,2002 @@
+#############################################################################
+# This script implements Grover's Algorithm.  Grover's Algorithm is an
+# unstructured search algorithm.  For this script, we take an <input_string>,
+# which is a string of 0s (the "haystack"), with the exception of a single
+# 1 (the "needle").  The goal of the algorithm is to determine the position
+# of the needle.
+#
+# Version information:
+#
+# Python: 3.8.2
+# Qutip : 4.5.1  (http://qutip.org)
+# Scipy : 1.4.1  (https://www.scipy.org)
+# Numpy : 1.18.4 (https://numpy.org)
+#
+# For more information on Grover's Algorithm, I suggest:
+#   Nielsen, Michael A. and Isaac L. Chung.  2010.
+#     _Quantum Computation and Quantum Information_.
+#     10th Anniversary Edition.
+#     Cambridge: Cambridge University Press.
+#     Section 6.2, pp. 255-261.
+#
+# This script is intended for learning purposes, and is heavily commented.
+# At times, there are multiple methods to accomplish a single goal.  These
+# have been flagged, and you may swap out one method for another.
+#
+# Here is an overview of the quantum circuit that makes up Grover's Algorithm
+# for two qubits plus a control qubit.
+#
+# |0> H --+----+-- H X . X H ------- M
+# |0> H --| Uf |-- H X Z X H ------- M
+# |1> H --+----+-------------- H X ---
+#
+# The qubits all begin in state |0>, except for the control qubit that begins
+# in state |1>.  H is the Hadamard gate.  Uf is a phase inversion that flips
+# the sign of the element represented by the needle.  The sequence of gates
+# in the middle, H/X/Controlled-Z/X/H is an inversion about the mean.  Then
+# we apply H and X to the control qubit.  At M, we measure all the qubits
+# except for the control qubit.
+#
+# The structure of this script is:
+#
+# Part One:   Generate the <input_string> and call needle_init()
+# Part Two:   Set up Qubits and Gates
+# Part Three: Execute the circuit
+# Part Four:  Results and Interpretation
+#
+# Run it from the command line with 'python Grover.py' or 'python -m
+# quantum.grover', or import the functions from quantum.grover.  QuTiP and
+# SciPy are only imported by the dense and sparse backends, when they are
+# used, so the matrix-free and analytic backends need nothing but NumPy.
+##############################################################################
+
+import argparse
+import math
+from numpy import *
+from . import disk_cache, gate_level, out_of_core, planner, profiling, sharded
+from .operator_cache import cached_operator, cache_stats
+from .precision import (DTYPES, check_dtype, real_dtype, error_bound,
+                        measured_error)
+from .gates import (basis_state, uniform_layer, all_but_last, flip_layer,
+                    sparse_tensor, sparse_layer, sparse_permutation,
+                    sparse_astype, GATE_H, GATE_X, GATE_I)
+from .packed_input import (source_length, source_signs, source_swaps,
+                           iter_bits, find_one, describe, is_packed,
+                           source_digest)
+from .reporting import (most_likely, summary, print_summary, write_summary,
+                        dump_state, largest, bit_strings)
+from .sampling import sparse_histogram
+
+#############################################################################
+# Part One: Generate input_string and call needle_init()
+#############################################################################
+
+# In Part One, we generate <input_string>, which is composed entirely of 0s,
+# except for a single 1 that represents the item we are searching for in the
+# string.  The length of <input_string> should be a power-of-2, which is
+# important to note for needle_explicit(); the string can always be padded
+# with additional 0s if necessary.
+
+# Method 1.  Randomly generated.    Call needle_random()
+# Method 2.  Explicitl assignment.  Call needle_explicit()
+# Method 3.  Position in binary.    Call needle_binary()
+# Method 4.  Position in decimal.   Call needle-decimal()
+#
+# Alternatively, for very long strings, <input_string> may be a bit-packed
+# file opened with open_packed() from packed_input.py; needle_init() and
+# circuit() accept it in place of a string.
+
+#-----------------------------------------------------------------------------
+# Function: needle_random(max)
+#-----------------------------------------------------------------------------
+# Generate input_string randomly, on the basis of a random integer.
+#-----------------------------------------------------------------------------
+# max: the upper limit for the random integer, as a power of 2.
+#-----------------------------------------------------------------------------
+def needle_random(max=5):
+    random_length       = 2 ** random.randint(1,max)
+    random_input_string = '0' * random_length
+    random_needle       = random.randint(0,random_length-1)
+    random_input_string = (random_input_string[:random_needle] + '1' +
+                          random_input_string[random_needle + 1:])
+    input_string        = random_input_string
+    return input_string
+
+#-----------------------------------------------------------------------------
+# Function: needle_explicit(input_string)
+#-----------------------------------------------------------------------------
+# Generate input_string randomly, on the basis of an explicit string.
+# Remember that the string length must be a power-of-2.
+#-----------------------------------------------------------------------------
+# input_string: the string to return
+#-----------------------------------------------------------------------------
+def needle_explicit(input_string = '0010' + ('0' * 60)):
+    # Suggestions:
+    # 128: input_string = '0010' + ('0' * 124)
+    # 256: input_string = '0010' + ('0' * 252)
+    # 512: input_string = '0010' + ('0' * 508)
+    return input_string
+
+#-----------------------------------------------------------------------------
+# Function: needle_binary(binary_needle_position)
+#-----------------------------------------------------------------------------
+# Generate input_string randomly, on the basis of binary position.
+#-----------------------------------------------------------------------------
+# binary_needle_position: the position in binary
+#-----------------------------------------------------------------------------
+def needle_binary(binary_needle_position = '0100'):
+    decimal_needle_position = int(binary_needle_position, 2)
+    input_string_length     = 2**math.ceil(math.log(decimal_needle_position+1,2))
+    input_string            = '0' * decimal_needle_position
+    input_string            = input_string + '1'
+    input_string            = input_string + '0' * (input_string_length -
+                                                    decimal_needle_position - 1)
+    return input_string
+
+#-----------------------------------------------------------------------------
+# Function: needle_decimal()
+#-----------------------------------------------------------------------------
+# Generate input_string randomly, on the basis of decimal position.
+#-----------------------------------------------------------------------------
+# decimal_needle_position: the position in decimal
+#-----------------------------------------------------------------------------
+def needle_decimal(decimal_needle_position = 5):
+    input_string_length     = 2**math.ceil(math.log(decimal_needle_position+1,2))
+    input_string            = '0' * decimal_needle_position
+    input_string            = input_string + '1'
+    input_string            = input_string + '0' * (input_string_length -
+                                                   decimal_needle_position - 1)
+    return input_string
+
+#-----------------------------------------------------------------------------
+# Function: needle_init()
+#-----------------------------------------------------------------------------
+# Initialise the needle position based on input_string
+#-----------------------------------------------------------------------------
+# input_string: string of 0s and 1s, or packed source from open_packed()
+#-----------------------------------------------------------------------------
+def needle_init(input_string):
+
+    # Given <input_string>, get the length and calculate the required number
+    # of qubits to process string.
+    input_string_length = source_length(input_string)
+    required_qubits     = int(math.log(input_string_length,2))
+
+    # Get the needle position.  We will use this to generate gates and state
+    # various results.
+    needle_position      = find_one(input_string)
+    needle_binary        = binary_repr(needle_position, required_qubits)
+    needle_binary_length = needle_binary.__len__()
+
+    return ({'string': input_string,
+            'string_length': input_string_length,
+            'required_qubits': required_qubits},
+            {'position': needle_position,
+            'binary': needle_binary,
+            'binary_length': needle_binary_length})
+
+##############################################################################
+# Part Two: Set up Qubits and Gates
+##############################################################################
+
+# In Part Two, we set up all the elements necessary to execute the quantum
+# circuit of Grover's Algorithm.  Call circut() to set up the following:
+#
+# Q      - Qubits in combined state
+# H      - Hadamard gates for all qubits
+# UfXI   - Phase inversion using with I on control
+# CxNOT  - Controlled NOT on all gates
+# HxI    - Hadamard gates for all except I on control
+# XxI    - X gates for all except I on control
+# CxZI   - Controlled Z on all gates with I on control
+# IxH    - H on control
+# IxX    - X on control
+#
+# Uf     - Created using UfXI and CxNOT
+# Dif    - Created using HxI, Xx, and CxZI
+
+# As a final step in Part Two, we calculate a value for repeat, which
+# determines how many times the circuit loops in order to maxmise the
+# chance of identifying the position of the needle.
+
+#-----------------------------------------------------------------------------
+# Function: circuit()
+#-----------------------------------------------------------------------------
+# Initialise the elements of the circuit (qubits and gates)
+#
+# A note on variable naming conventions for matrices: a capital letter is a
+# collection of the same sort of thing.  So 'Q' means qubits all the way down,
+# and 'H' means Hadamards all the way down.  A small 'x' is a greedy wildcard,
+# so 'HxI' means Hadamards all the way down except Identity at the bottom.
+# 'CxNOT' means controls (C) all the way down except NOT at the bottom.
+#
+# The combined operations are built by the shared gate library (gates.py):
+# for example, uniform_layer('H', n) is Hadamards all the way down, and
+# all_but_last('H', 'I', n) is HxI.  Everything except Uf depends only on the
+# number of qubits, so Q, H, Dif, IxH and IxX are kept in the operator cache
+# (see operator_cache.py) and shared between calls for the same number of
+# qubits.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# backend: 'dense' (QuTiP matrices, below), 'sparse' (see circuit_sparse()),
+#          'matrix-free' (see circuit_matrix_free()), 'analytic' (see
+#          run_analytic()), 'out-of-core' (see circuit_out_of_core()),
+#          'sharded' (see circuit_sharded()) or 'gates' (see circuit_gates())
+# oracle: 'control' (Uf acts on a control qubit, as below) or 'phase' (Uf
+#         acts on the data qubits only; see circuit_phase())
+# uf: 'uf1' or 'uf2', the method used to build Uf (dense, sparse and gates
+#     only)
+# dif: 'dif1' or 'dif2', the method used to build Dif (dense only; the sparse
+#      and gates backends only have dif1)
+# storage: directory for the state files of the out-of-core backend
+# workers: number of processes for the sharded backend (default: all cores)
+# memory_budget: if given, refuse (with a MemoryError) to build a circuit
+#                whose estimated memory is over this many bytes, before
+#                allocating anything (see planner.py)
+# iterations: the number of Grover iterations the circuit will be run for,
+#             which the memory estimate depends on when fusing (default:
+#             repeat())
+# dtype: dtype of the state and operators, one of precision.DTYPES (default:
+#        complex128 states; see precision.py).  The dense backend uses QuTiP,
+#        so it only runs in complex128.
+# fuse: True to multiply Uf and Dif into a single Grover iterate G (dense
+#       only; see fuse_iterate())
+#-----------------------------------------------------------------------------
+def circuit(input,needle,backend='dense',oracle='control',uf='uf1',dif='dif1',
+            storage=None,dtype=None,fuse=False,workers=None,
+            memory_budget=None,iterations=None):
+    if oracle not in ('control', 'phase'):
+        raise ValueError("Unknown oracle: {}".format(oracle))
+    if uf not in ('uf1', 'uf2'):
+        raise ValueError("Unknown Uf method: {}".format(uf))
+    if dif not in ('dif1', 'dif2'):
+        raise ValueError("Unknown Dif method: {}".format(dif))
+    if memory_budget is not None:
+        if iterations is None:
+            iterations = repeat(input['required_qubits'])
+        planner.check(backend, input['required_qubits'], iterations,
+                      memory_budget, oracle, uf, dif, dtype, fuse)
+    if fuse:
+        if backend != 'dense':
+            raise ValueError("Only the dense backend can fuse the Grover "
+                             "iterate (G is dense, so there is nothing for "
+                             "the {} backend to save)".format(backend))
+        return fuse_iterate(circuit(input,needle,backend,oracle,uf,dif,
+                                    dtype=dtype),
+                            input,needle,uf,dif)
+
+    if backend == 'matrix-free':
+        return circuit_matrix_free(input,needle,oracle,dtype)
+    elif backend == 'analytic':
+        return dict(circuit_matrix_free(input,needle,oracle,dtype),
+                    backend='analytic')
+    elif backend == 'out-of-core':
+        return circuit_out_of_core(input,needle,oracle,storage,dtype)
+    elif backend == 'sharded':
+        return circuit_sharded(input,needle,oracle,workers,dtype)
+    elif backend == 'gates':
+        return circuit_gates(input,needle,oracle,uf,dif,dtype)
+    elif oracle == 'phase' and backend in ('dense', 'sparse'):
+        return circuit_phase(input,needle,backend,dtype,uf,dif)
+    elif backend == 'sparse':
+        return circuit_sparse(input,needle,uf,dif,dtype)
+    elif backend != 'dense':
+        raise ValueError("Unknown backend: {}".format(backend))
+    check_dtype(dtype, backend, qutip=True)
+
+    from qutip import Qobj, qeye, tensor
+
+    # An input string of length n requires log2(n) qubits beginning in state
+    # |0>, plus a control qubit that begins in state |1>.
+    qubit_count = input['required_qubits'] + 1
+
+    # ------
+    # Q
+    # ------
+    #
+    # All qubits put into a combined state.  In binary, this is 00...01, the
+    # basis state with index 1.
+    Q = basis_state(1, qubit_count)
+
+    # ------
+    # H
+    # ------
+    #
+    # Hadamards as a combined operation for all qubits
+    H = uniform_layer('H', qubit_count)
+
+    # ------
+    # Uf
+    # ------
+    # There are two different methods we have for generating Uf:
+    #
+    # Method 1: Buliding Uf from more primitive qunatum gates.  Call uf1().
+    # Method 2: Directly descirbing the matrix for Uf.  Call uf2().
+    #
+    # We include both methods, because each provides some insight.
+
+    #-----------------------------------------------------------------------------
+    # Function: uf1()
+    #-----------------------------------------------------------------------------
+    # Method 1 for Generating the Uf (= phase inversion) Gate
+    #-----------------------------------------------------------------------------
+    def uf1():
+
+        # Uf may be done in a number of ways.  The first is to break down Uf a
+        # follows: (i) a combined state representing the item we are looking for in
+        # binary, (ii) a controlled not where all qubits are control except for the
+        # last qubit which is the not; (iii) the same combined state as (i).
+        #
+        # |> -----.-----
+        # |> -- X . X --
+        # |> ---- + ----
+        #
+        # We do this by creating UfXI which correpsonds to (i) and (iii), and CxNOT
+        # which corresponds to (ii).  We can then combine (UfXI * CxNOT * UfXI) to get
+        # Uf.
+
+        # Calculate the binary value that corresponds to the position of the item to
+        # be found (which we call the needle).  Then, go through that binary number:
+        # each 0 will correspond to an X gate; each 1 will correspond to an I gate.
+        # So if the third (of four items) is the needle, this gives us 010, which
+        # corresponds to [X I X].  Finish off UfXI by including an identity gate for
+        # the control qubit.
+        #
+        # In other words, UfXI flips the qubits marked by the 0s of the needle's
+        # binary position, which are the 1s of (2^n - 1) XOR position, shifted
+        # one place along to make room for the control qubit.
+        #
+        # Gates required: UfXI, CxNOT
+
+        mask = ((2 ** input['required_qubits'] - 1) ^ needle['position']) << 1
+        UfXI = flip_layer(mask, qubit_count)
+
+        # CxNOT as a combined operation.  this is caluclated by a series of identity
+        # gates, with a NOT gate in the lower right corner.
+        CxNOT = zeros([input['string_length']*2,input['string_length']*2])
+        for i in range(input['string_length']-1):
+            CxNOT[i*2,i*2] = '1'
+            CxNOT[i*2+1,i*2+1] = '1'
+        CxNOT[input['string_length']*2-1,input['string_length']*2-2] = '1'
+        CxNOT[input['string_length']*2-2,input['string_length']*2-1] = '1'
+
+        # Calculate Uf
+        Uf = UfXI * CxNOT * UfXI
+        return Uf
+
+    #-----------------------------------------------------------------------------
+    # Function: uf2()
+    #-----------------------------------------------------------------------------
+    # Method 2 for Generating the Uf (= phase inversion) Gate
+    #-----------------------------------------------------------------------------
+    def uf2():
+
+        # Another way to create Uf is to do so directly, by generating a zero matrix
+        # of size n by n and plotting 1s as necessary, according to the following
+        # algorithm (the input is read a chunk at a time; see packed_input.py):
+        Uf = zeros([input['string_length']*2,input['string_length']*2])
+        for start, bits in iter_bits(input['string']):
+            for i, bit in enumerate(bits, start):
+                if not bit:
+                    Uf[i*2,i*2] = '1'
+                    Uf[i*2+1,i*2+1] = '1'
+                else:
+                    Uf[i*2+1,i*2] = '1'
+                    Uf[i*2,i*2+1] = '1'
+        return Uf
+
+    # Set Uf using uf1() or uf2() (both are equivalent)
+    Uf = {'uf1': uf1, 'uf2': uf2}[uf]()
+
+    # ------
+    # Dif
+    # ------
+    # There are two different methods we have for generating Dif; these methods
+    # are parallel to how we generated Uf.
+    #
+    # Method 1: Buliding Dif from more primitive qunatum gates.  Call dif1().
+    # Method 2: Directly descirbing the matrix for Uf.  Call dif2().
+    #
+    # Again, we include both methods, because each provides some insight.
+
+    #-----------------------------------------------------------------------------
+    # Function: dif1()
+    #-----------------------------------------------------------------------------
+    # Method 1 for the Dif (= inversion about the mean) Gate
+    #-----------------------------------------------------------------------------
+    def dif1():
+
+        # Generate the diffusion operator Dif.  This operator leaves the control qubit
+        # untouched, but follows the following pattern for the others:
+        #
+        # |> -- H X . X H --
+        # |> -- H X Z X H --
+        #
+        # In order to generate this operator, we need to combine Hadamards for each
+        # non-control and Identity for control; and Xs for each non-control and
+        # Identity for control.  Finally, we have to have a controlled-Z for non-
+        # control and Identity for control.  (This operator does not act directly on
+        # the control qubit.)
+        #
+        # Gates required: HxI, XxI, CxZI
+
+        # Hadamards + Identity (for control qubit) as a combined operation
+        HxI = all_but_last('H', 'I', qubit_count)
+
+        # Xs + Identity (for control qubit) as a combined operation
+        XxI = all_but_last('X', 'I', qubit_count)
+
+        # CxZ + Identity (for control qubit) as a combined operation
+        CxZI = zeros([input['string_length'],input['string_length']])
+        for i in range(int(input['string_length']-1)):
+            CxZI[i,i] = '1'
+        CxZI[input['string_length']-1,input['string_length']-1] = '-1'
+        CxZI = tensor(Qobj(CxZI), qeye(2))
+        CxZI.dims = HxI.dims
+
+        # Diffusion operator
+        Dif = HxI * XxI * CxZI * XxI * HxI
+        return Dif
+
+    #-----------------------------------------------------------------------------
+    # Function: dif2()
+    #-----------------------------------------------------------------------------
+    # Method 2 for the Dif (= inversion about the mean) Gate
+    #-----------------------------------------------------------------------------
+    def dif2():
+
+        # The other way to generate Dif is to calculate -I+2A, where A is the matrix
+        # that finds the average sequence (1/2n, where n is the number of qubits * 2)
+        # and I is the identity matrix.  The resulting matrix is combined with
+        # identity (since it does not act directly on the control qubit).
+
+        A = (1 / (2 ** input['required_qubits'])) * ones([2 ** input['required_qubits'], 2 ** input['required_qubits']])
+        Two_A = 2 * A
+        Minus_I = -1 * identity(2 ** input['required_qubits'])
+        Dif = tensor(Qobj(Minus_I + Two_A), qeye(2))
+        return Dif
+
+    # Set Dif using df1() or df2() (both are equivalent)
+    Dif = cached_operator(input['required_qubits'], 'Dif/' + dif, 'complex128',
+                          {'dif1': dif1, 'dif2': dif2}[dif])
+
+    # The final pair of operations are on the control qubit, and this acts on
+    # the results to make them more dramatic.  Create two combined operations
+    # that act only on control (so the rest will be I): IxH and IxX.
+    #
+    # Gates required: IxH, IxX
+
+    # ------
+    # IxH
+    # ------
+    # Ix + Hadamard (for control qubit) as a combined operation
+    IxH = all_but_last('I', 'H', qubit_count)
+
+    # ------
+    # IxX
+    # ------
+    # Ix + X (for control qubit) as a combined operation
+    IxX = all_but_last('I', 'X', qubit_count)
+
+    # Return a dictonary of qubits and gates
+    return {'backend': 'dense',
+            'Q': Q,
+            'H': H,
+            'Uf': Uf,
+            'Dif': Dif,
+            'IxH': IxH,
+            'IxX': IxX}
+
+#-----------------------------------------------------------------------------
+# Function: apply_operators(operators, state)
+#-----------------------------------------------------------------------------
+# Apply an operator, or a list of operators, to a state.  Lists are in
+# circuit order (the first operator is applied first), unlike matrix products
+# which are written right to left.
+#-----------------------------------------------------------------------------
+# operators: sparse matrix, or list of sparse matrices
+# state: state vector
+#-----------------------------------------------------------------------------
+def apply_operators(operators,state):
+    if not isinstance(operators, list):
+        operators = [operators]
+    for operator in operators:
+        state = operator @ state
+    return state
+
+#-----------------------------------------------------------------------------
+# Function: circuit_sparse()
+#-----------------------------------------------------------------------------
+# Initialise the elements of the circuit as sparse (SciPy CSR) operators.
+#
+# This follows circuit() gate for gate, but the dense zeros() matrices become
+# CSR matrices that store only their nonzeros: Uf, CxNOT, UfXI, XxI, CxZI,
+# IxH and IxX have one or two nonzeros per row.  H, HxI and Dif would be
+# dense if multiplied out, so we keep them as lists of one-qubit layers (see
+# sparse_layer()) and apply them one factor at a time.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# uf: 'uf1' or 'uf2', as in circuit()
+# dif: only 'dif1'; dif2() is a dense matrix
+# dtype: dtype of the state and operators (default: a complex128 state, and
+#        float64 operators)
+#-----------------------------------------------------------------------------
+def circuit_sparse(input,needle,uf='uf1',dif='dif1',dtype=None):
+    if dif != 'dif1':
+        raise ValueError("The sparse backend only builds Dif with dif1")
+    from scipy import sparse
+    state_type  = check_dtype(dtype, 'sparse', default=complex128)
+    gate_type   = check_dtype(dtype, 'sparse', default=float64)
+    qubit_count = input['required_qubits'] + 1
+    size        = input['string_length'] * 2
+
+    # Q: all qubits in state |0>, except control in state |1>, which is the
+    # basis state with index 1.
+    def build_Q():
+        Q = zeros(size, dtype=state_type)
+        Q[1] = 1
+        return Q
+    Q = cached_operator(input['required_qubits'], 'sparse/Q', state_type.name,
+                        build_Q)
+
+    # H: Hadamards for all qubits
+    H = cached_operator(input['required_qubits'], 'sparse/H', gate_type.name,
+            lambda: sparse_astype(sparse_layer(GATE_H,qubit_count), gate_type))
+
+    # Uf: Method 1 (UfXI * CxNOT * UfXI), as in uf1()
+    def uf1():
+        UfXI = sparse_tensor([GATE_X if bit == '0' else GATE_I
+                              for bit in needle['binary']] + [GATE_I])
+
+        # CxNOT swaps the last two basis states and leaves the rest alone
+        targets = arange(size)
+        targets[-2:] = [size-1, size-2]
+        CxNOT = sparse_permutation(targets)
+        return (UfXI @ CxNOT @ UfXI).tocsr()
+
+    # Uf: Method 2 (plotting 1s directly), as in uf2().  Wherever the string
+    # has a 1, the two basis states for that position are swapped.
+    def uf2():
+        return sparse_permutation(source_swaps(input['string']))
+
+    # Set Uf using uf1() or uf2() (both are equivalent)
+    Uf = sparse_astype({'uf1': uf1, 'uf2': uf2}[uf](), gate_type)
+
+    # Dif: as in dif1(), HxI * XxI * CxZI * XxI * HxI, with the Hadamard
+    # layers kept as lists of factors.
+    def dif1():
+        HxI  = sparse_layer(GATE_H,qubit_count,skip_last=True)
+        XxI  = sparse_tensor([GATE_X] * (qubit_count-1) + [GATE_I])
+        diagonal = ones(size)
+        diagonal[-2:] = -1
+        CxZI = sparse.diags(diagonal, format='csr')
+        return sparse_astype(HxI + [XxI, CxZI, XxI] + HxI, gate_type)
+
+    # Set Dif using dif1()
+    Dif = cached_operator(input['required_qubits'], 'sparse/Dif/dif1',
+                          gate_type.name, dif1)
+
+    # IxH and IxX act only on the control qubit
+    IxH = cached_operator(input['required_qubits'], 'sparse/IxH', gate_type.name,
+            lambda: sparse_tensor([GATE_I] * (qubit_count-1) +
+                                  [GATE_H]).astype(gate_type))
+    IxX = cached_operator(input['required_qubits'], 'sparse/IxX', gate_type.name,
+            lambda: sparse_tensor([GATE_I] * (qubit_count-1) +
+                                  [GATE_X]).astype(gate_type))
+
+    return {'backend': 'sparse',
+            'Q': Q,
+            'H': H,
+            'Uf': Uf,
+            'Dif': Dif,
+            'IxH': IxH,
+            'IxX': IxX}
+
+#-----------------------------------------------------------------------------
+# Function: circuit_matrix_free()
+#-----------------------------------------------------------------------------
+# Initialise the circuit without building any matrices.
+#
+# The dense operators above are (2^(n+1) x 2^(n+1)), so memory grows as 4^n.
+# But we never need them: the control qubit sits in state |-> for the whole
+# Grover iteration, so Uf amounts to flipping the sign of the needle's
+# amplitude, and Dif amounts to replacing each amplitude x with 2*mean - x.
+# Both can be applied directly to a state vector of 2^n amplitudes (one per
+# data basis state), which is what run_circuit_matrix_free() does.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# oracle: 'control' or 'phase' (see circuit_phase()); this only changes the
+#         shape of the final state
+# dtype: dtype of the amplitudes and the final state (default: float64
+#        amplitudes, and a complex128 final state)
+#-----------------------------------------------------------------------------
+def circuit_matrix_free(input,needle,oracle='control',dtype=None):
+    check_dtype(dtype, 'matrix-free')
+    return {'backend': 'matrix-free',
+            'oracle': oracle,
+            'dtype': dtype,
+            'required_qubits': input['required_qubits'],
+            'string_length': input['string_length'],
+            'position': needle['position']}
+
+#-----------------------------------------------------------------------------
+# Function: circuit_out_of_core()
+#-----------------------------------------------------------------------------
+# Initialise the circuit with the state kept on disk.
+#
+# This is the matrix-free circuit, but run_circuit() keeps the 2^n
+# amplitudes in memory-mapped files in <storage>, processed a chunk at a
+# time, and checkpoints after every Grover iteration; a run that is
+# interrupted picks up from the last completed iteration when it is run
+# again with the same storage directory.  See out_of_core.py.
+#
+# Without a storage directory, each circuit gets a new temporary directory
+# of its own, which is removed once the run is over, so two runs at once
+# never share (and overwrite) each other's state files.  Only a run given
+# its storage directory can be resumed.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# oracle: 'control' or 'phase'; this only changes the shape of the final
+#         state
+# storage: directory for the state files (default: a new temporary
+#          directory)
+# dtype: as in circuit_matrix_free(); the amplitudes are stored in the real
+#        dtype of the same precision
+#-----------------------------------------------------------------------------
+def circuit_out_of_core(input,needle,oracle='control',storage=None,dtype=None):
+    temporary = storage is None
+    if temporary:
+        import tempfile
+        storage = tempfile.mkdtemp(prefix='grover-{}-{}-'.format(
+            input['required_qubits'], needle['position']))
+    return dict(circuit_matrix_free(input,needle,oracle,dtype),
+                backend='out-of-core',
+                storage=storage,
+                temporary=temporary)
+
+#-----------------------------------------------------------------------------
+# Function: circuit_sharded()
+#-----------------------------------------------------------------------------
+# Initialise the circuit with the state split across worker processes.
+#
+# This is the matrix-free circuit, but run_circuit() keeps the 2^n
+# amplitudes in shared memory, and <workers> processes each run the Grover
+# iteration on their own share of them, meeting once per iteration to add up
+# the mean.  See sharded.py.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# oracle: 'control' or 'phase'; this only changes the shape of the final
+#         state
+# workers: number of processes, including this one (default: all cores)
+# dtype: as in circuit_matrix_free()
+#-----------------------------------------------------------------------------
+def circuit_sharded(input,needle,oracle='control',workers=None,dtype=None):
+    if workers is not None and workers < 1:
+        raise ValueError("The sharded backend needs at least one worker")
+    return dict(circuit_matrix_free(input,needle,oracle,dtype),
+                backend='sharded',
+                workers=workers)
+
+#-----------------------------------------------------------------------------
+# Function: circuit_gates()
+#-----------------------------------------------------------------------------
+# Initialise the circuit as a list of gates, to be run one gate at a time by
+# gate_level.py, without building any layer as a matrix.
+#
+# These are the gates that circuit() multiplies together.  With the data
+# qubits numbered 0 to n-1 (the first is the most significant bit) and the
+# control qubit n:
+#
+#   H:    H on every qubit
+#   Uf:   uf1(): X on each data qubit where the needle has a 0, NOT on
+#         control controlled by every data qubit, then the Xs again; or
+#         uf2(): an oracle gate that flips control wherever the string has a 1
+#   Dif:  dif1(): H and X on the data qubits, Z on the last data qubit
+#         controlled by the others, then X and H again
+#   IxH, IxX: H and then X on control
+#
+# With a phase oracle there is no control qubit, and the NOT in uf1() becomes
+# a Z on the last data qubit controlled by the others.  Each gate costs
+# O(2^n), so a Grover iteration costs O(n * 2^n).
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# oracle: 'control' or 'phase'
+# uf: 'uf1' or 'uf2'
+# dif: only 'dif1'; dif2() is a dense matrix
+# dtype: dtype of the state (default: complex128)
+#-----------------------------------------------------------------------------
+def circuit_gates(input,needle,oracle='control',uf='uf1',dif='dif1',
+                  dtype=None):
+    if dif != 'dif1':
+        raise ValueError("The gates backend only builds Dif with dif1")
+    from .gate_level import gate, layer
+    data = range(input['required_qubits'])
+    last = input['required_qubits'] - 1
+    control = input['required_qubits'] if oracle == 'control' else None
+
+    # Uf
+    if uf == 'uf1':
+        UfXI = [gate('X', qubit) for qubit, bit in enumerate(needle['binary'])
+                if bit == '0']
+        if control is None:
+            flip = gate('Z', last, controls=range(last))
+        else:
+            flip = gate('X', control, controls=data)
+        Uf = UfXI + [flip] + UfXI
+    else:
+        Uf = [gate_level.oracle(input['string'], control)]
+
+    # Dif
+    Dif = (layer('H', data) + layer('X', data) +
+           [gate('Z', last, controls=range(last))] +
+           layer('X', data) + layer('H', data))
+
+    qubit_count = input['required_qubits'] + (control is not None)
+    return {'backend': 'gates',
+            'oracle': oracle,
+            'qubit_count': qubit_count,
+            'start': 1 if control is not None else 0,
+            'dtype': check_dtype(dtype, 'gates', default=complex128),
+            'H': layer('H', range(qubit_count)),
+            'Uf': Uf,
+            'Dif': Dif,
+            'finish': [] if control is None else [gate('H', control),
+                                                  gate('X', control)]}
+
+#-----------------------------------------------------------------------------
+# Function: circuit_phase()
+#-----------------------------------------------------------------------------
+# Initialise the circuit with a phase oracle, and without a control qubit.
+#
+# The control qubit in circuit() is only there for phase kickback: it sits in
+# state |-> so that flipping it (with CxNOT) flips the sign of the needle.
+# We can get the same effect with a diagonal Uf that has -1 for the needle
+# and 1 everywhere else, acting on the data qubits alone:
+#
+# |0> H --+----+-- H X . X H ------- M
+# |0> H --| Uf |-- H X Z X H ------- M
+#         +----+
+#
+# This halves the size of the state, quarters the size of every operator,
+# and there is no control qubit to tidy up with IxH and IxX at the end.
+#
+# Uf can be built in the same two ways as in circuit(): uf1() flips the
+# qubits marked by the 0s of the needle's binary position, so the needle
+# becomes the last basis state, and negates that with CxZ before flipping
+# them back; uf2() writes the -1s straight onto the diagonal.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# backend: 'dense' (QuTiP matrices) or 'sparse' (SciPy sparse matrices)
+# dtype: as in circuit_sparse() (the dense backend only runs in complex128)
+# uf: 'uf1' or 'uf2', as in circuit()
+# dif: 'dif1' or 'dif2', as in circuit() (the sparse backend only has dif1)
+#-----------------------------------------------------------------------------
+def circuit_phase(input,needle,backend='dense',dtype=None,uf='uf1',
+                  dif='dif1'):
+    if backend == 'sparse' and dif != 'dif1':
+        raise ValueError("The sparse backend only builds Dif with dif1")
+    from scipy import sparse
+    check_dtype(dtype, backend, qutip=(backend != 'sparse'))
+    qubit_count = input['required_qubits']
+    size        = input['string_length']
+
+    # CxZ: -1 for the last basis state, 1 elsewhere
+    controlled_z = ones(size)
+    controlled_z[-1] = -1
+
+    if backend == 'sparse':
+        state_type = check_dtype(dtype, backend, default=complex128)
+        gate_type  = check_dtype(dtype, backend, default=float64)
+
+        def build_Q():
+            Q = zeros(size, dtype=state_type)
+            Q[0] = 1
+            return Q
+        Q = cached_operator(qubit_count, 'phase/sparse/Q', state_type.name,
+                            build_Q)
+        H = cached_operator(qubit_count, 'phase/sparse/H', gate_type.name,
+                lambda: sparse_astype(sparse_layer(GATE_H,qubit_count),
+                                      gate_type))
+        if uf == 'uf1':
+            UfXI = sparse_tensor([GATE_X if bit == '0' else GATE_I
+                                  for bit in needle['binary']])
+            CxZ = sparse.diags(controlled_z, format='csr')
+            Uf = (UfXI @ CxZ @ UfXI).tocsr()
+        else:
+            # -1 wherever the string has a 1 (the needle), 1 elsewhere
+            Uf = sparse.diags(source_signs(input['string']), format='csr')
+        Uf = sparse_astype(Uf, gate_type)
+
+        def dif1():
+            X = sparse_tensor([GATE_X] * qubit_count)
+            CxZ = sparse.diags(controlled_z, format='csr')
+            return H + sparse_astype([X, CxZ, X], gate_type) + H
+        Dif = cached_operator(qubit_count, 'phase/sparse/Dif/dif1',
+                              gate_type.name, dif1)
+    else:
+        from qutip import Qobj
+        Q = basis_state(0, qubit_count)
+        H = uniform_layer('H', qubit_count)
+
+        # QuTiP stores Qobj data sparsely, so Uf (X layers and diagonals)
+        # stays small
+        if uf == 'uf1':
+            UfXI = flip_layer((2 ** qubit_count - 1) ^ needle['position'],
+                              qubit_count)
+            Uf = UfXI * Qobj(sparse.diags(controlled_z, format='csr'),
+                             dims=H.dims) * UfXI
+        else:
+            Uf = Qobj(sparse.diags(source_signs(input['string']),
+                                   format='csr'), dims=H.dims)
+
+        def dif1():
+            X = uniform_layer('X', qubit_count)
+            CxZ = Qobj(sparse.diags(controlled_z, format='csr'), dims=H.dims)
+            return H * X * CxZ * X * H
+
+        # -I+2A, as in dif2(), with no control qubit to add identity for
+        def dif2():
+            return Qobj(2 / size * ones([size, size]) - identity(size),
+                        dims=H.dims)
+        Dif = cached_operator(qubit_count, 'phase/Dif/' + dif, 'complex128',
+                              {'dif1': dif1, 'dif2': dif2}[dif])
+
+    return {'backend': backend,
+            'oracle': 'phase',
+            'Q': Q,
+            'H': H,
+            'Uf': Uf,
+            'Dif': Dif}
+
+#-----------------------------------------------------------------------------
+# Function: fuse_iterate(circuit, input, needle, uf, dif)
+#-----------------------------------------------------------------------------
+# Multiply the Grover iteration into a single operator, G = Dif * Uf.
+#
+# run_circuit() applies Uf and then Dif <repeat> times, which is <repeat>
+# products with the state.  With G in hand, we can instead work out G^repeat
+# by repeated squaring: G^2 = G*G, G^4 = G^2*G^2, and so on, then multiply
+# the state by the powers that make up repeat in binary (G^5 = G^4 * G).
+# That is O(log repeat) products, and the squares are kept in the operator
+# cache, so a sweep over many iteration counts for the same problem builds
+# them only once.
+#
+# G is dense even when Uf and Dif are sparse (Dif's Hadamard layers mix every
+# basis state with every other), so this pays off for large iteration counts
+# and for sweeps, not for a single run at the usual repeat().  For the same
+# reason only the dense backend fuses: the sparse backend's G, and each of
+# its squares, would be a dense matrix stored less compactly.  G depends on
+# the needle, so it is cached per (qubit count, needle position).
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by circuit() or circuit_phase(), with the
+#          dense backend
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# uf, dif: the methods the circuit was built with (part of the cache key)
+#-----------------------------------------------------------------------------
+def fuse_iterate(circuit,input,needle,uf='uf1',dif='dif1'):
+    key = 'G/{}/{}/{}/{}/{}'.format(circuit['backend'],
+                                    circuit.get('oracle', 'control'), uf, dif,
+                                    needle['position'])
+
+    def build_G():
+        # Uf may be a NumPy array (see uf1() and uf2()) rather than a Qobj
+        G = circuit['Dif'] * circuit['Uf']
+        return asarray(G.full() if hasattr(G, 'full') else G,
+                       dtype=complex128)
+
+    kind = 'complex128'
+
+    # G is also kept in the disk cache, if it is on (see disk_cache.py)
+    G = cached_operator(input['required_qubits'], key, kind,
+            lambda: disk_cache.cached({'script': 'grover',
+                                       'operator': key,
+                                       'qubits': input['required_qubits'],
+                                       'dtype': kind}, build_G))
+    return dict(circuit,
+                G=G,
+                fused=key,
+                dtype_name=kind,
+                required_qubits=input['required_qubits'])
+
+#-----------------------------------------------------------------------------
+# Function: repeat(required_qubits)
+#-----------------------------------------------------------------------------
+# Phase inversion (Uf) + the Diffusion operator (Dif) are repeated pi/4 *
+# sqrt(2^n) times, where n is the number of qubits (not including control).
+# This picks out and then amplifies the result so that the answer is easy to
+# see.  Repeat it more times than this, and the numbers will become
+# "overcooked" (meaning we move away from the ideal solution).  To check
+# the count for a given n, see best_iterations().
+#-----------------------------------------------------------------------------
+# required_qubits: number of loops depend on number of qubits in the circuit
+#-----------------------------------------------------------------------------
+def repeat(required_qubits):
+    # We might think that int(around((pi/4) * sqrt(2**input['required_qubits'])))
+    # would be preferable.  But this leads to 2-qubit (+1 control) circuits being
+    # run twice instead of once, which overcooks the results.
+    return int((pi/4) * sqrt(2**(required_qubits)))
+
+##############################################################################
+# Part Three: Execute the circuit
+##############################################################################
+
+# In order to run the circuit, we apply the gates to the qubits in their
+# combined states.  This is simply matrix multiplication.  Begin by applying
+# H to every qubit; then Uf (phase inversion); then Dif (inversion about the
+# mean); then finish off by applying H and X to the control.
+
+#-----------------------------------------------------------------------------
+# Function: run_circuit(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the circuit calculations.  Repeat Uf/Dif the appropriate numebr of
+# times.
+#-----------------------------------------------------------------------------
+# The out-of-core backend is the exception: its state stays on disk, and
+# what is returned is the data amplitudes as a read-only memory map (see
+# run_out_of_core()).  results() and measurement_results() read it a chunk
+# at a time.
+#-----------------------------------------------------------------------------
+# circuit: dictionary for the circuit (expected: Q, H, Uf, Dif, IxH, IxX, or
+#          Q, H, Uf, Dif from circuit_phase(), or the dictionary returned by
+#          circuit_matrix_free())
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_circuit(circuit,repeat):
+    if 'G' in circuit:
+        return run_circuit_fused(circuit,repeat)
+    elif circuit.get('backend') == 'matrix-free':
+        return run_circuit_matrix_free(circuit,repeat)
+    elif circuit.get('backend') == 'analytic':
+        return expand_analytic(run_analytic(circuit,repeat))
+    elif circuit.get('backend') == 'sparse':
+        return run_circuit_sparse(circuit,repeat)
+    elif circuit.get('backend') == 'out-of-core':
+        return run_out_of_core(circuit,repeat)
+    elif circuit.get('backend') == 'gates':
+        return run_circuit_gates(circuit,repeat)
+    elif circuit.get('backend') == 'sharded':
+        return expand_state(sharded.run(circuit['string_length'],
+                                        circuit['position'], repeat,
+                                        circuit['workers'],
+                                        circuit.get('dtype') or float64),
+                            circuit.get('oracle','control'),
+                            circuit.get('dtype') or complex128)
+
+    from qutip import Qobj
+
+    # Begin with applying H to Q
+    current_state = circuit['H'] * circuit['Q']
+
+    # Now repeat Uf and Dif <repeat> times.  This is the Grover Iteration.
+    # (Each iteration is timed when profiling is enabled; see profiling.py.)
+    for i in range(repeat):
+        with profiling.stage('iteration', iteration=i):
+            current_state = circuit['Uf'] * current_state
+            current_state = circuit['Dif'] * current_state
+            current_state = Qobj(current_state)
+        # Uncomment the following if you want to see the state at each step
+        # (or see trace_circuit(), which records just the probability of the
+        # needle)
+        # print("Uf/Dif [", i, "]", current_state)
+
+    # Now apply IxH and IxX.  This is not really requried in order to make
+    # Grover's Algorithm work, but it amplifies the results to make them
+    # extremely obvious.  If you want to remove this line, replace it with
+    # current_state = current_state.full().  (With a phase oracle there is no
+    # control qubit, so there is nothing to do.)
+    if 'IxH' not in circuit:
+        return current_state.full()
+    current_state = circuit['IxX'] * circuit['IxH'] * current_state.full()
+    return current_state
+
+#-----------------------------------------------------------------------------
+# Function: run_circuit_sparse(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the circuit calculations using the sparse operators from
+# circuit_sparse().  The steps are the same as in run_circuit().
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by circuit_sparse()
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_circuit_sparse(circuit,repeat):
+    current_state = apply_operators(circuit['H'], circuit['Q'])
+    for i in range(repeat):
+        with profiling.stage('iteration', iteration=i):
+            current_state = apply_operators(circuit['Uf'], current_state)
+            current_state = apply_operators(circuit['Dif'], current_state)
+    if 'IxH' in circuit:
+        current_state = apply_operators([circuit['IxH'], circuit['IxX']],
+                                        current_state)
+    return current_state.reshape(-1,1)
+
+#-----------------------------------------------------------------------------
+# Function: run_circuit_gates(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the gate list from circuit_gates() one gate at a time, on the state
+# held as an array of shape (2, 2, ..., 2) (see gate_level.py).  The steps
+# are the same as in run_circuit().
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by circuit_gates()
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_circuit_gates(circuit,repeat):
+    qubit_count = circuit['qubit_count']
+    current_state = gate_level.basis_tensor(circuit['start'], qubit_count,
+                                            circuit['dtype'])
+    gate_level.apply_gates(current_state, circuit['H'], qubit_count)
+    for i in range(repeat):
+        with profiling.stage('iteration', iteration=i):
+            gate_level.apply_gates(current_state, circuit['Uf'], qubit_count)
+            gate_level.apply_gates(current_state, circuit['Dif'], qubit_count)
+    gate_level.apply_gates(current_state, circuit['finish'], qubit_count)
+    return current_state.reshape(-1,1)
+
+#-----------------------------------------------------------------------------
+# Function: iterate_power(circuit, bit)
+#-----------------------------------------------------------------------------
+# G^(2^bit), the fused Grover iterate squared <bit> times.  Each square is
+# built from the one before, and kept in the operator cache.
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by fuse_iterate()
+# bit: which power of 2
+#-----------------------------------------------------------------------------
+def iterate_power(circuit,bit):
+    if bit == 0:
+        return circuit['G']
+
+    def build_square():
+        half = iterate_power(circuit,bit-1)
+        return half @ half
+    key = '{}^{}'.format(circuit['fused'], 2 ** bit)
+    return cached_operator(circuit['required_qubits'], key,
+                           circuit['dtype_name'],
+            lambda: disk_cache.cached({'script': 'grover',
+                                       'operator': key,
+                                       'qubits': circuit['required_qubits'],
+                                       'dtype': circuit['dtype_name']},
+                                      build_square))
+
+#-----------------------------------------------------------------------------
+# Function: run_circuit_fused(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the circuit with the fused Grover iterate from fuse_iterate():
+# instead of <repeat> Uf/Dif steps, multiply the state by G^(2^bit) for each
+# bit that is set in <repeat>.  The result is the same as run_circuit(), up
+# to rounding.
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by fuse_iterate()
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_circuit_fused(circuit,repeat):
+    current_state = (circuit['H'] * circuit['Q']).full()
+
+    # Powers of G commute, so the order they are applied in does not matter
+    bit = 0
+    while repeat >> bit:
+        if (repeat >> bit) & 1:
+            with profiling.stage('iteration', power=2 ** bit):
+                current_state = iterate_power(circuit,bit) @ current_state
+        bit += 1
+
+    if 'IxH' not in circuit:
+        return current_state.reshape(-1,1)
+    return circuit['IxX'] * circuit['IxH'] * current_state
+
+#-----------------------------------------------------------------------------
+# Function: run_circuit_matrix_free(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the circuit without matrices.  Memory and time per Grover iteration
+# are O(2^n) rather than O(4^n).
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by circuit_matrix_free()
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_circuit_matrix_free(circuit,repeat):
+    # Applying H to Q puts the data qubits into an equal superposition (the
+    # control qubit goes to |->, which we keep track of implicitly).
+    amplitudes = full(circuit['string_length'],
+                      1 / sqrt(circuit['string_length']),
+                      dtype=circuit.get('dtype') or float64)
+
+    # Now repeat Uf and Dif <repeat> times, in place.
+    for i in range(repeat):
+        with profiling.stage('iteration', iteration=i):
+            # Uf: phase inversion of the needle
+            amplitudes[circuit['position']] *= -1
+            # Dif: inversion about the mean.  Inversion about the mean takes
+            # x to 2*mean - x (this is dif2()); dif1(), which circuit() uses,
+            # differs by a global phase of -1, so we take x to x - 2*mean to
+            # match it.
+            amplitudes -= 2 * amplitudes.mean()
+        # Uncomment the following if you want to see the state at each step
+        # (or see trace_circuit())
+        # print("Uf/Dif [", i, "]", amplitudes)
+
+    return expand_state(amplitudes,circuit.get('oracle','control'),
+                        circuit.get('dtype') or complex128)
+
+#-----------------------------------------------------------------------------
+# Function: run_out_of_core(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Execute the circuit with the state on disk, and return the final
+# amplitudes of the data qubits as a read-only memory map.  This never holds
+# more than a chunk of the state in memory.  (With the control oracle, the
+# combined state would have these amplitudes where the control qubit is 0,
+# and 0 elsewhere; see expand_state().)
+#-----------------------------------------------------------------------------
+# circuit: dictionary returned by circuit_out_of_core()
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_out_of_core(circuit,repeat):
+    amplitudes = out_of_core.run(circuit['storage'], circuit['string_length'],
+                                 circuit['position'], repeat,
+                                 real_dtype(circuit.get('dtype') or float64))
+    if circuit.get('temporary'):
+        # A temporary directory cannot be resumed from, so remove it now.
+        # The memory map stays valid until it is closed (where the platform
+        # does not allow removing a mapped file, the directory is left).
+        import shutil
+        shutil.rmtree(circuit['storage'], ignore_errors=True)
+    return amplitudes
+
+#-----------------------------------------------------------------------------
+# Function: expand_state(amplitudes, oracle)
+#-----------------------------------------------------------------------------
+# Turn the amplitudes of the data qubits into the combined state that
+# run_circuit() returns.  IxH and IxX take the control qubit from |-> to |0>,
+# so every odd-numbered element of the combined state is 0.  With a phase
+# oracle there is no control qubit, so the amplitudes are the state.
+#-----------------------------------------------------------------------------
+# amplitudes: array of 2^n amplitudes for the data qubits
+# oracle: 'control' or 'phase'
+# dtype: dtype of the combined state
+#-----------------------------------------------------------------------------
+def expand_state(amplitudes,oracle='control',dtype=complex128):
+    if oracle == 'phase':
+        return amplitudes.astype(dtype).reshape(-1,1)
+    current_state = zeros([amplitudes.size*2,1], dtype=dtype)
+    current_state[0::2,0] = amplitudes
+    return current_state
+
+#-----------------------------------------------------------------------------
+# Function: run_analytic(circuit, repeat)
+#-----------------------------------------------------------------------------
+# Calculate the result of the circuit without simulating it.
+#
+# With a single needle, the data qubits only ever hold two distinct
+# amplitudes: one for the needle (marked) and one shared by every other
+# position (unmarked).  Writing sin(theta) = 1/sqrt(2^n), after k Grover
+# iterations these are
+#
+#   marked   = sin((2k+1) theta)
+#   unmarked = cos((2k+1) theta) / sqrt(2^n - 1)
+#
+# up to a sign of (-1)^k, which comes from dif1() (see
+# run_circuit_matrix_free()).  So we can store the whole state in a few
+# numbers, whatever the value of n, and only build the full vector (with
+# expand_analytic()) if we want to print it with results().
+#-----------------------------------------------------------------------------
+# circuit: dictionary with required_qubits and position (for example, the
+#          dictionary returned by circuit_matrix_free(), or one written by
+#          hand such as {'required_qubits': 40, 'position': 5})
+# repeat: integer representing the number of times to run Uf/Dif
+#-----------------------------------------------------------------------------
+def run_analytic(circuit,repeat):
+    string_length = 2 ** circuit['required_qubits']
+    theta = arcsin(1 / sqrt(string_length))
+    sign  = (-1) ** repeat
+
+    marked = sign * sin((2*repeat + 1) * theta)
+    if string_length > 1:
+        unmarked = sign * cos((2*repeat + 1) * theta) / sqrt(string_length - 1)
+    else:
+        unmarked = 0.0
+
+    return {'required_qubits': circuit['required_qubits'],
+            'position': circuit['position'],
+            'oracle': circuit.get('oracle', 'control'),
+            'repeat': repeat,
+            'dtype': circuit.get('dtype'),
+            'marked': marked,
+            'unmarked': unmarked,
+            'probability': marked ** 2}
+
+#-----------------------------------------------------------------------------
+# Function: expand_analytic(analytic_state)
+#-----------------------------------------------------------------------------
+# Build the combined state (as returned by run_circuit()) from the two
+# amplitudes calculated by run_analytic().  This needs O(2^n) memory, so only
+# call it when the full vector is actually needed.
+#-----------------------------------------------------------------------------
+# analytic_state: dictionary returned by run_analytic()
+#-----------------------------------------------------------------------------
+def expand_analytic(analytic_state):
+    dtype = analytic_state.get('dtype') or complex128
+    amplitudes = full(2 ** analytic_state['required_qubits'],
+                      analytic_state['unmarked'], dtype=real_dtype(dtype))
+    amplitudes[analytic_state['position']] = analytic_state['marked']
+    return expand_state(amplitudes,analytic_state.get('oracle','control'),
+                        dtype)
+
+# Trace the Grover iteration.
+#
+# Printing the whole state at each step (see the comment in run_circuit())
+# shows how the needle is amplified, but it is 2^n numbers per iteration.
+# All we usually want to know is two numbers: the probability of measuring
+# the needle, which rises to a peak near repeat() iterations and then falls
+# again (the "overcooked" results), and the norm drift, sum |amplitude|^2 - 1,
+# which should be 0 and shows how much rounding has built up.  So
+# trace_circuit() runs the iteration once, and records just these two numbers
+# after each step, in an array allocated before the loop starts.  Only the
+# current state is kept.
+
+TRACE_DTYPE = dtype([('probability', float64), ('norm_drift', float64)])
+
+#-----------------------------------------------------------------------------
+# Function: trace_backend(backend)
+#-----------------------------------------------------------------------------
+# The backend to trace in place of <backend>: the sharded backend does the
+# matrix-free calculation, so its runs are traced with it.  That needs as
+# much memory as the sharded run itself (see planner.estimate()), so only
+# the state of an out-of-core run, which is kept on disk because it does not
+# fit in memory, has to be traced where it is (see trace_circuit()).
+#-----------------------------------------------------------------------------
+def trace_backend(backend):
+    if backend == 'sharded':
+        return 'matrix-free'
+    return backend
+
+#-----------------------------------------------------------------------------
+# Function: trace_circuit(circuit, needle, repeat, until_peak)
+#-----------------------------------------------------------------------------
+# Run <repeat> Grover iterations, and return an array of repeat+1 records
+# (probability, norm_drift): row k is the state after k iterations (row 0 is
+# the state after H).  The final IxH and IxX are left out, since they change
+# neither number.
+#
+# With until_peak=True, stop at the first iteration whose probability is
+# lower than the one before, and return only the rows up to it.
+#
+# The analytic backend works out each row from a formula rather than from
+# the row before, so its drift (from the amplitudes run_analytic() gives)
+# is the rounding of that formula alone, and never builds up.
+#
+# The out-of-core backend is traced on disk, one pass over the state files
+# per iteration (see out_of_core.trace()), in a directory of its own inside
+# the circuit's storage, so that a checkpoint kept there is left alone.
+#-----------------------------------------------------------------------------
+# circuit: dictionary from circuit() (dense, sparse, matrix-free, analytic,
+#          out-of-core or gates, fused or not)
+# needle: dictionary containing position, binary, binary length
+# repeat: the most Grover iterations to run
+# until_peak: True to stop once the probability has peaked
+#-----------------------------------------------------------------------------
+def trace_circuit(circuit,needle,repeat,until_peak=False):
+    trace = empty(repeat + 1, dtype=TRACE_DTYPE)
+    if circuit['backend'] == 'analytic':
+        # The two amplitudes of run_analytic(), for every k at once (their
+        # sign, (-1)^k, is left out, since only their squares are used).
+        # The drift is that of the norm of the 2^n amplitudes they stand
+        # for: one marked, and 2^n - 1 unmarked.
+        string_length = 2 ** needle['binary_length']
+        angles = (2*arange(repeat + 1) + 1) * arcsin(1 / sqrt(string_length))
+        marked = sin(angles)
+        if string_length > 1:
+            unmarked = cos(angles) / sqrt(string_length - 1)
+        else:
+            unmarked = zeros(repeat + 1)
+        trace['probability'] = marked ** 2
+        trace['norm_drift'] = (marked ** 2 +
+                               (string_length - 1) * unmarked ** 2 - 1)
+        stop = repeat
+        if until_peak:
+            falls = flatnonzero(diff(trace['probability']) < 0)
+            stop = int(falls[0]) + 1 if falls.size else repeat
+        return trace[:stop + 1]
+
+    if circuit['backend'] == 'out-of-core':
+        import shutil
+        import tempfile
+        with tempfile.TemporaryDirectory(dir=circuit['storage']) as directory:
+            rows = out_of_core.trace(directory, circuit['string_length'],
+                                     circuit['position'], repeat,
+                                     real_dtype(circuit.get('dtype') or
+                                                float64),
+                                     until_peak=until_peak)
+        if circuit.get('temporary'):
+            shutil.rmtree(circuit['storage'], ignore_errors=True)
+        trace[:len(rows)] = rows
+        return trace[:len(rows)]
+
+    current_state, step = _trace_steps(circuit)
+    for i in range(repeat + 1):
+        if i:
+            with profiling.stage('iteration', iteration=i-1):
+                current_state = step(current_state)
+        trace[i] = _trace_record(current_state, needle['position'],
+                                 needle['binary_length'])
+        if until_peak and i and \
+                trace['probability'][i] < trace['probability'][i-1]:
+            return trace[:i + 1]
+    return trace
+
+#-----------------------------------------------------------------------------
+# Function: _trace_steps(circuit)
+#-----------------------------------------------------------------------------
+# The state after H, and a function taking the state to the state after one
+# more Uf/Dif, for trace_circuit().  These are the same steps as run_circuit()
+# takes for each backend.
+#-----------------------------------------------------------------------------
+def _trace_steps(circuit):
+    backend = circuit['backend']
+    if 'G' in circuit:
+        G = iterate_power(circuit,0)
+        if backend == 'dense':
+            current_state = (circuit['H'] * circuit['Q']).full()
+        else:
+            current_state = apply_operators(circuit['H'], circuit['Q'])
+        return current_state, lambda state: G @ state
+
+    elif backend == 'matrix-free':
+        position = circuit['position']
+        amplitudes = full(circuit['string_length'],
+                          1 / sqrt(circuit['string_length']),
+                          dtype=circuit.get('dtype') or float64)
+        def step(amplitudes):
+            amplitudes[position] *= -1
+            amplitudes -= 2 * amplitudes.mean()
+            return amplitudes
+        return amplitudes, step
+
+    elif backend == 'sparse':
+        return (apply_operators(circuit['H'], circuit['Q']),
+                lambda state: apply_operators(circuit['Dif'],
+                                  apply_operators(circuit['Uf'], state)))
+
+    elif backend == 'gates':
+        qubit_count = circuit['qubit_count']
+        current_state = gate_level.basis_tensor(circuit['start'], qubit_count,
+                                                circuit['dtype'])
+        gate_level.apply_gates(current_state, circuit['H'], qubit_count)
+        return current_state, lambda state: gate_level.apply_gates(
+            state, circuit['Uf'] + circuit['Dif'], qubit_count)
+
+    elif backend == 'dense':
+        from qutip import Qobj
+        return (circuit['H'] * circuit['Q'],
+                lambda state: Qobj(circuit['Dif'] * (circuit['Uf'] * state)))
+
+    # The sharded backend works on the state where it is kept (see
+    # trace_backend()), and the out-of-core backend is traced on disk
+    raise ValueError("Cannot trace the {} backend".format(backend))
+
+#-----------------------------------------------------------------------------
+# Function: _trace_record(current_state, position, required_qubits)
+#-----------------------------------------------------------------------------
+# (probability, norm_drift) for one state: a Qobj, a vector or a tensor, with
+# or without the control qubit, real or complex.
+#
+# The state is viewed as real numbers (a complex number is two of them), so
+# both are sums of squares, with the same number of real numbers for every
+# position: the needle's are the ones at the needle position.  The squares
+# are added up in float64 (einsum() converts a buffer at a time, so no
+# float64 copy of the state is made), so the norm drift of a float32 run is
+# its own, not einsum's.
+#-----------------------------------------------------------------------------
+def _trace_record(current_state,position,required_qubits):
+    if hasattr(current_state, 'full'):
+        current_state = current_state.full()
+    values = ascontiguousarray(current_state).reshape(-1)
+    values = values.view(real_dtype(values.dtype))
+    width  = values.size >> required_qubits
+    marked = values[position*width:(position + 1)*width]
+    return (einsum('i,i->', marked, marked, dtype=float64),
+            einsum('i,i->', values, values, dtype=float64) - 1)
+
+#-----------------------------------------------------------------------------
+# Function: best_iterations(required_qubits, backend, oracle, dtype, limit,
+#                           position)
+#-----------------------------------------------------------------------------
+# Find the number of Grover iterations that gives the highest probability of
+# measuring the needle, by tracing the iteration (see trace_circuit()) until
+# the probability starts to fall.  repeat() rounds pi/4 * sqrt(2^n) down,
+# which is close to the best, but not always equal to it; and in a
+# reduced-precision dtype the best count is whatever the rounding makes it.
+#
+# Returns a dictionary with the best iterations and their probability,
+# repeat() and its probability (None if the trace stopped before it), the
+# largest norm drift, and the trace.
+#-----------------------------------------------------------------------------
+# required_qubits: number of data qubits (string length 2^n)
+# backend: 'matrix-free' (default), 'analytic', 'out-of-core', 'dense',
+#          'sparse' or 'gates'
+# oracle: 'control' or 'phase'
+# dtype: dtype of the state, as in circuit()
+# limit: the most iterations to try (default: 2 * repeat() + 1, past the
+#        first peak)
+# position: needle position (the probabilities do not depend on it)
+# storage: directory for the state files of the out-of-core backend
+#-----------------------------------------------------------------------------
+def best_iterations(required_qubits,backend='matrix-free',oracle='control',
+                    dtype=None,limit=None,position=0,storage=None):
+    string_length = 2 ** required_qubits
+    needle = {'position': position,
+              'binary': binary_repr(position, required_qubits),
+              'binary_length': required_qubits}
+    sizes = {'required_qubits': required_qubits,
+             'string_length': string_length}
+    if backend in ('matrix-free', 'analytic'):
+        # These need no input string, which at 2^n characters could be
+        # bigger than the state
+        gates = dict(circuit_matrix_free(sizes,needle,oracle,dtype),
+                     backend=backend)
+    elif backend == 'out-of-core':
+        gates = circuit_out_of_core(sizes,needle,oracle,storage,dtype)
+    else:
+        input,needle = needle_init('0' * position + '1' +
+                                   '0' * (string_length - position - 1))
+        gates = circuit(input,needle,backend,oracle,dtype=dtype)
+
+    usual = repeat(required_qubits)
+    if limit is None:
+        limit = 2 * usual + 1
+    trace = trace_circuit(gates,needle,limit,until_peak=True)
+    best = int(argmax(trace['probability']))
+    return {'required_qubits': required_qubits,
+            'iterations': best,
+            'probability': float(trace['probability'][best]),
+            'repeat': usual,
+            'repeat_probability': (float(trace['probability'][usual])
+                                   if usual < trace.size else None),
+            'norm_drift': float(abs(trace['norm_drift']).max()),
+            'trace': trace}
+
+#-----------------------------------------------------------------------------
+# Function: state_fields(input, repeat, backend, oracle, uf, dif, dtype, fuse)
+#-----------------------------------------------------------------------------
+# Everything the final state of run_circuit() depends on, as the fields of
+# its key in the disk cache (see disk_cache.py).  The input string is
+# represented by its digest, so that long inputs make short keys.
+#-----------------------------------------------------------------------------
+def state_fields(input,repeat,backend,oracle='control',uf='uf1',dif='dif1',
+                 dtype=None,fuse=False):
+    return {'script': 'grover',
+            'input': source_digest(input['string']),
+            'iterations': repeat,
+            'method': '{}/{}/{}/{}{}'.format(backend, oracle, uf, dif,
+                                             '/fused' if fuse else ''),
+            'dtype': dtype or 'default'}
+
+#-----------------------------------------------------------------------------
+# Function: needle_batch(needles, required_qubits)
+#-----------------------------------------------------------------------------
+# Call needle_init() for many searches at once.  Each needle may be given as
+# an input string, or as a decimal position (in which case the string is
+# built as in needle_decimal(), padded to 2^required_qubits if given).  All
+# searches in a batch must have the same string length.
+#-----------------------------------------------------------------------------
+# needles: list of input strings (or packed sources) and/or decimal needle
+#          positions
+# required_qubits: number of qubits for needles given as positions
+#-----------------------------------------------------------------------------
+def needle_batch(needles,required_qubits=None):
+    inputs  = []
+    needles_init = []
+    for needle in needles:
+        if isinstance(needle, str) or is_packed(needle):
+            input_string = needle
+        else:
+            input_string = needle_decimal(int(needle))
+            if required_qubits is not None:
+                input_string = input_string + '0' * (2**required_qubits -
+                                                     len(input_string))
+        input,needle = needle_init(input_string)
+        inputs.append(input)
+        needles_init.append(needle)
+
+    if len(set(input['string_length'] for input in inputs)) > 1:
+        raise ValueError("All input strings in a batch must have the same length")
+    return inputs,needles_init
+
+#-----------------------------------------------------------------------------
+# Function: run_batch(inputs, needles, repeat, dtype)
+#-----------------------------------------------------------------------------
+# Execute many searches of the same size together, as in
+# run_circuit_matrix_free().  The amplitudes are held in a 2-D array with one
+# column per search: Uf flips one element in each column, and Dif subtracts
+# twice each column's mean in a single vectorised step for the whole batch.
+# Each iteration is one profiling stage for the whole batch.
+#-----------------------------------------------------------------------------
+# inputs: list of input dictionaries from needle_batch()
+# needles: list of needle dictionaries from needle_batch()
+# repeat: integer representing the number of times to run Uf/Dif
+# dtype: dtype of the amplitudes, as in circuit_matrix_free()
+#-----------------------------------------------------------------------------
+def run_batch(inputs,needles,repeat,dtype=None):
+    check_dtype(dtype, 'matrix-free')
+    string_length = inputs[0]['string_length']
+    positions     = array([needle['position'] for needle in needles])
+    columns       = arange(positions.size)
+
+    amplitudes = full([string_length, positions.size], 1 / sqrt(string_length),
+                      dtype=dtype or float64)
+    for i in range(repeat):
+        with profiling.stage('iteration', iteration=i):
+            # Uf: phase inversion of each search's needle
+            amplitudes[positions, columns] *= -1
+            # Dif: inversion about each column's mean (see
+            # run_circuit_matrix_free())
+            amplitudes -= 2 * amplitudes.mean(axis=0)
+
+    return [expand_state(amplitudes[:,i],'control',dtype or complex128)
+            for i in columns]
+
+#-----------------------------------------------------------------------------
+# Function: grover_batch(needles, required_qubits, dtype)
+#-----------------------------------------------------------------------------
+# Run Parts One to Three for a batch of searches.  Returns one dictionary per
+# search with the arguments for results() (input, needle, repeat and
+# current_state), plus the calculated position of the needle.
+#-----------------------------------------------------------------------------
+# needles: list of input strings and/or decimal needle positions
+# required_qubits: number of qubits for needles given as positions
+# dtype: dtype of the amplitudes, as in run_batch()
+#-----------------------------------------------------------------------------
+def grover_batch(needles,required_qubits=None,dtype=None):
+    inputs,needles = needle_batch(needles,required_qubits)
+    iterations     = repeat(inputs[0]['required_qubits'])
+    current_states = run_batch(inputs,needles,iterations,dtype)
+
+    searches = []
+    for input,needle,current_state in zip(inputs,needles,current_states):
+        searches.append({'input': input,
+                         'needle': needle,
+                         'repeat': iterations,
+                         'current_state': current_state,
+                         'result': int(argmax(abs(current_state)) / 2)})
+    return searches
+
+##############################################################################
+# Part Four: Results and Interpretation
+##############################################################################
+
+#-----------------------------------------------------------------------------
+# Function: results(input, needle, repeat, current_state, top, full_state,
+#                   summary_path)
+#-----------------------------------------------------------------------------
+# Print results to the console.
+#
+# The combined state has 2^(n+1) amplitudes, which is far too many to print
+# at 20 qubits, so by default we print only the <top> most likely positions
+# (see reporting.py).  Set full_state to print every amplitude, as a chunk at
+# a time.
+#-----------------------------------------------------------------------------
+# input: dictionary containing string, string_length, required_qubits
+# needle: dictionary containing position, binary, binary length
+# repeat: integer representing the number of times to run Uf/Dif
+# current_state: results after running the circuit (with or without the
+#                control qubit)
+# top: how many of the most likely positions to print
+# full_state: True to print the whole combined state
+# summary_path: if given, save a summary of the state (the most likely
+#               positions and the probability of each qubit being 1) to this
+#               file, as JSON, or as NumPy arrays if it ends in '.npz'
+# control_zero: True if current_state is the data amplitudes alone, with the
+#               control qubit 0, as the out-of-core backend returns them (see
+#               run_circuit())
+#-----------------------------------------------------------------------------
+def results(input,needle,repeat,current_state,top=4,full_state=False,
+            summary_path=None,control_zero=False):
+    # With a phase oracle (see circuit_phase()) there is no control qubit, so
+    # there is one element per position rather than two.  With control_zero,
+    # there is a control qubit, but only one element per position is kept.
+    if current_state.size == input['string_length']:
+        elements_per_position = 1
+        control_qubits        = 1 if control_zero else 0
+    else:
+        elements_per_position = 2
+        control_qubits        = 1
+    qubit_count = input['required_qubits'] + control_qubits
+
+    # The result is the position that is most likely to be measured: the
+    # probabilities of the two elements for each position (control 0 and
+    # control 1) are added together.  The state is read a chunk at a time,
+    # so a state on disk is never read into memory all at once.
+    result = most_likely(current_state, elements_per_position - 1)
+
+    # Print the most likely positions (or the whole combined state), and
+    # flag the result
+    print('-' * 60)
+    if full_state:
+        if control_zero:
+            print('Data qubits (control qubit 0):')
+            dump_state(current_state, input['required_qubits'], flagged=result)
+        else:
+            print('Combined state:')
+            dump_state(current_state, qubit_count,
+                       flagged=result*elements_per_position)
+    else:
+        state_summary = summary(current_state, qubit_count, top,
+                                control_qubits, control_zero)
+        print_summary(state_summary)
+    if summary_path:
+        if full_state:
+            state_summary = summary(current_state, qubit_count, top,
+                                    control_qubits, control_zero)
+        write_summary(state_summary, summary_path,
+                      needle=needle['position'], result=result,
+                      repeat=repeat)
+
+    # Output all results
+    print('-' * 60)
+    print('Input string             :', describe(input['string']))
+    print('Actual Position (decimal):', needle['position'])
+    print('Actual Postiion (binary) :', needle['binary'])
+    print('Iterations required      :', repeat)
+    if control_qubits:
+        print('Qubits required          :', input['required_qubits'], '(+1 control)')
+    else:
+        print('Qubits required          :', input['required_qubits'], '(phase oracle)')
+
+    print('State of winning qubit   :',
+          current_state.reshape(-1)[result*elements_per_position])
+
+    # Double-check by comparing <result> with the index of the 1 in the string.
+    # Flag the confirmation or the error.
+    check = find_one(input['string'])
+    if result == check:
+        confirmed = '(confirmed)'
+    else:
+        confirmed = '(error)'
+
+    # Print results
+    print('Calculated position      : {} {}'.format(result,confirmed))
+    print('-' * 60)
+
+#-----------------------------------------------------------------------------
+# Function: measurement_results(input, needle, current_state, shots, seed,
+#                               method, top)
+#-----------------------------------------------------------------------------
+# Measure the data qubits <shots> times, as hardware would (see
+# sampling.py), and print the most common outcomes and the fraction of shots
+# that found the needle.
+#-----------------------------------------------------------------------------
+# current_state: results after running the circuit
+# shots: number of measurements
+# seed: seed for the random numbers (None for a different run each time)
+# method: 'multinomial', 'cdf' or 'alias'
+# top: how many of the most common outcomes to print
+#-----------------------------------------------------------------------------
+def measurement_results(input,needle,current_state,shots,seed=None,
+                        method='multinomial',top=4):
+    # Only the outcomes that came up are counted, so that a state too big
+    # for memory (from the out-of-core backend) needs no count per outcome
+    control_qubits = 0 if current_state.size == input['string_length'] else 1
+    outcomes, counts = sparse_histogram(current_state, shots, seed, method,
+                                        marginalise=bool(control_qubits))
+    found, _ = largest(counts, top)
+    print('Measurements ({} shots):'.format(shots))
+    for bits, count in zip(bit_strings(outcomes[found],
+                                       input['required_qubits']),
+                           counts[found]):
+        print('{} : {}'.format(bits, count))
+    rate = counts[outcomes == needle['position']].sum() / shots
+    print('Success rate             : {:.6f} (+/- {:.6f})'.format(
+        rate, sqrt(rate * (1 - rate) / shots)))
+    print('-' * 60)
+
+#-----------------------------------------------------------------------------
+# Function: precision_results(input, needle, repeat, current_state, backend,
+#                             oracle, dtype, check, fuse)
+#-----------------------------------------------------------------------------
+# Print the numerical error bound for a run in a reduced-precision dtype (see
+# precision.py), and, if <check> is True, the actual error against the same
+# run in complex128 (which needs the memory of a complex128 run).
+#-----------------------------------------------------------------------------
+# current_state: results after running the circuit in <dtype>
+# backend, oracle, dtype: as given to circuit()
+# check: True to work out the actual error as well
+# fuse: True if the run used the fused Grover iterate (the reference does
+#       not)
+#-----------------------------------------------------------------------------
+def precision_results(input,needle,repeat,current_state,backend,oracle,dtype,
+                      check=False,fuse=False):
+    # The gates backend applies the same Hadamards as the sparse one
+    method = 'sparse' if backend in ('sparse', 'gates') else 'matrix-free'
+    print('Dtype                    :', dtype)
+    if fuse:
+        # Squaring dense matrices rounds differently from the Uf/Dif steps
+        # that error_bound() counts, so there is no a priori bound
+        print('Error bound (a priori)   : none for the fused iterate')
+    else:
+        print('Error bound (a priori)   : {:.3e}'.format(
+            error_bound(dtype, input['required_qubits'], repeat, method)))
+    if check:
+        # The out-of-core and sharded references are kept in this process;
+        # they are the same calculation as the matrix-free one.  The
+        # out-of-core state is the data amplitudes, expanded to compare them.
+        if backend == 'out-of-core':
+            current_state = expand_state(current_state,oracle)
+        if backend in ('out-of-core', 'sharded'):
+            backend = 'matrix-free'
+        reference = run_circuit(circuit(input,needle,backend,oracle,
+                                        dtype='complex128'),repeat)
+        error = measured_error(current_state, reference)
+        print('Error (measured)         : {:.3e} (largest amplitude error '
+              '{:.3e})'.format(error['norm'], error['max_amplitude']))
+
+#-----------------------------------------------------------------------------
+# Function: trace_results(input, needle, repeat, backend, oracle, dtype, path,
+#                         storage)
+#-----------------------------------------------------------------------------
+# Trace the run (see trace_circuit()), print where the probability of the
+# needle peaked and the largest norm drift, and save the trace to <path>: as
+# CSV (iterations, probability, norm_drift), or as a NumPy array if <path>
+# ends in '.npy'.
+#-----------------------------------------------------------------------------
+# repeat: integer representing the number of times to run Uf/Dif
+# backend, oracle, dtype: as given to circuit() (the trace does not fuse)
+# path: file for the trace
+# storage: directory for the state files of the out-of-core backend
+#-----------------------------------------------------------------------------
+def trace_results(input,needle,repeat,backend,oracle,dtype,path,storage=None):
+    trace = trace_circuit(circuit(input,needle,trace_backend(backend),oracle,
+                                  storage=storage,dtype=dtype),needle,repeat)
+    if path.endswith('.npy'):
+        save(path, trace)
+    else:
+        savetxt(path, column_stack([arange(trace.size), trace['probability'],
+                                    trace['norm_drift']]),
+                fmt=['%d', '%.17g', '%.17g'], delimiter=',',
+                header='iterations,probability,norm_drift', comments='')
+    peak = int(argmax(trace['probability']))
+    print('Peak probability         : {:.6f} after {} iterations'.format(
+        trace['probability'][peak], peak))
+    print('Largest norm drift       : {:.3e}'.format(
+        abs(trace['norm_drift']).max()))
+    print('-' * 60)
+
+##############################################################################
+# Main
+##############################################################################
+
+#-----------------------------------------------------------------------------
+# Function: plan_run(parser, arguments, required_qubits, iterations, budget)
+#-----------------------------------------------------------------------------
+# The planner's plan (see planner.py) for the command-line arguments and
+# <iterations> Grover iterations.  A plan that cannot be run (bad options, or
+# no backend that fits in the memory budget) stops the script with the
+# planner's message, as a usage error, before anything is allocated.
+#-----------------------------------------------------------------------------
+# parser: the ArgumentParser, to report errors with
+# arguments: the parsed arguments
+# required_qubits: number of data qubits
+# iterations: number of Grover iterations
+# budget: memory budget in bytes (None for the available memory)
+#-----------------------------------------------------------------------------
+def plan_run(parser,arguments,required_qubits,iterations,budget):
+    try:
+        return planner.plan(required_qubits,iterations,budget,
+                            arguments.oracle,arguments.dtype,
+                            arguments.backend,fuse=arguments.fuse,
+                            workers=arguments.workers,
+                            storage=arguments.storage)
+    except (ValueError, MemoryError) as error:
+        parser.error(str(error))
+
+#-----------------------------------------------------------------------------
+# Function: plan_trace(parser, arguments, required_qubits, iterations, budget,
+#                      backend)
+#-----------------------------------------------------------------------------
+# The backend to trace a run on <backend> with (see trace_backend()), after
+# checking that it fits in the memory budget; if it does not, stop with a
+# usage error rather than run out of memory part way through.
+#-----------------------------------------------------------------------------
+def plan_trace(parser,arguments,required_qubits,iterations,budget,backend):
+    traced = trace_backend(backend)
+    if budget is None:
+        budget = planner.available_memory()
+    if traced != backend and budget is not None:
+        try:
+            planner.check(traced,required_qubits,iterations,budget,
+                          arguments.oracle,dtype=arguments.dtype)
+        except MemoryError as error:
+            parser.error("Cannot trace the {} run: {}".format(backend,error))
+    return traced
+
+#-----------------------------------------------------------------------------
+# Function: main(arguments)
+#-----------------------------------------------------------------------------
+# Run Parts One to Four from the command line.
+#-----------------------------------------------------------------------------
+# arguments: list of command-line arguments (default: sys.argv)
+#-----------------------------------------------------------------------------
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Grover's Algorithm")
+    parser.add_argument('--backend', default='dense',
+                        choices=['dense', 'sparse', 'matrix-free', 'analytic',
+                                 'out-of-core', 'sharded', 'gates', 'auto'],
+                        help='how to simulate the circuit; auto picks the '
+                             'fastest that fits in memory (default: dense)')
+    parser.add_argument('--memory-budget', metavar='SIZE',
+                        help='memory the run may use, such as 512M or 8G '
+                             '(default: the memory available); a backend '
+                             'that needs more is replaced by one that fits')
+    parser.add_argument('--oracle', default='control',
+                        choices=['control', 'phase'],
+                        help='oracle with or without a control qubit')
+    parser.add_argument('--dtype', choices=DTYPES,
+                        help='dtype of the state and operators (the dense '
+                             'backend only supports complex128)')
+    parser.add_argument('--check-dtype', action='store_true',
+                        help='with --dtype, measure the error against a '
+                             'complex128 run')
+    parser.add_argument('--fuse', action='store_true',
+                        help='multiply Uf and Dif into one operator and '
+                             'raise it to the power repeat by squaring '
+                             '(dense only: G is a dense matrix, so the '
+                             'sparse backend would gain nothing)')
+    parser.add_argument('--workers', type=int,
+                        help='number of processes for the sharded backend '
+                             '(default: all cores)')
+    parser.add_argument('--storage', metavar='DIR',
+                        help='where the out-of-core backend keeps the state '
+                             '(rerun with the same DIR to resume; default: a '
+                             'new temporary directory, removed after the '
+                             'run)')
+    parser.add_argument('--iterations', metavar='N',
+                        help="number of Grover iterations, or 'best' to "
+                             'search for the count that gives the highest '
+                             'probability (default: repeat())')
+    parser.add_argument('--iteration-trace', metavar='FILE',
+                        help='record the probability of the needle and the '
+                             'norm drift after each iteration, and write them '
+                             'to FILE as CSV (or .npy)')
+    parser.add_argument('--top', type=int, default=4,
+                        help='number of most likely positions to print '
+                             '(default: 4)')
+    parser.add_argument('--full-state', action='store_true',
+                        help='print every amplitude of the combined state')
+    parser.add_argument('--summary', metavar='FILE',
+                        help='save a summary of the final state as JSON (or '
+                             'as NumPy arrays, if FILE ends in .npz)')
+    parser.add_argument('--shots', type=int,
+                        help='also measure the final state this many times')
+    parser.add_argument('--seed', type=int,
+                        help='seed for the measurements')
+    parser.add_argument('--sampling', default='multinomial',
+                        choices=['multinomial', 'cdf', 'alias'],
+                        help='how to draw the measurements (default: '
+                             'multinomial; cdf is slower than alias with '
+                             'more shots than outcomes)')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='keep final states and fused operators in DIR, '
+                             'and reuse them in later runs')
+    parser.add_argument('--cache-size', metavar='SIZE', default='4G',
+                        help='most disk space the cache may use (default: '
+                             '4G)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='time each part and each Grover iteration, and '
+                             'write the trace to FILE as JSON')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record peak memory (slower)')
+    arguments = parser.parse_args(arguments)
+
+    if arguments.trace:
+        profiling.enable(memory=arguments.trace_memory)
+    if arguments.cache:
+        disk_cache.configure(arguments.cache,
+                             planner.parse_size(arguments.cache_size))
+
+    # Part One: Generate the <input_string> and call needle_init()
+    with profiling.stage('part_one'):
+        input_string = needle_random()
+        input,needle = needle_init(input_string)
+
+    # Part Two: Set up Qubits and Gates.  The planner checks that the backend
+    # fits in memory (or, for 'auto', picks one) before anything is built.
+    # The time it estimates (and so its choice, and whether fusing pays)
+    # depends on the number of iterations, so that is settled first.
+    with profiling.stage('part_two'):
+        budget     = (planner.parse_size(arguments.memory_budget)
+                      if arguments.memory_budget else None)
+
+        # The iteration count can be given, or searched for by tracing the
+        # iteration (see best_iterations()).  The search must itself fit in
+        # memory, so it traces the backend planned for repeat() iterations.
+        if arguments.iterations == 'best':
+            usual       = repeat(input['required_qubits'])
+            search_plan = plan_run(parser,arguments,input['required_qubits'],
+                                   usual,budget)
+            traced      = plan_trace(parser,arguments,input['required_qubits'],
+                                     2 * usual + 1,budget,
+                                     search_plan['backend'])
+            search = best_iterations(input['required_qubits'],traced,
+                                     arguments.oracle,arguments.dtype,
+                                     storage=arguments.storage)
+            iterations = search['iterations']
+            print('Best iterations          : {} (probability {:.6f}; '
+                  'repeat() gives {})'.format(iterations,
+                                              search['probability'],
+                                              search['repeat']))
+        elif arguments.iterations:
+            try:
+                iterations = int(arguments.iterations)
+            except ValueError:
+                parser.error("--iterations must be a number or 'best', not "
+                             "{!r}".format(arguments.iterations))
+            if iterations < 0:
+                parser.error("--iterations must not be negative")
+        else:
+            iterations = repeat(input['required_qubits'])
+
+        plan = plan_run(parser,arguments,input['required_qubits'],iterations,
+                        budget)
+        if arguments.backend == 'auto' or plan['downgraded_from']:
+            planner.print_plan(plan)
+        arguments.backend = plan['backend']
+
+        # A run that has been done before is loaded from the disk cache, if
+        # it is on, and nothing is built
+        current_state = None
+        if disk_cache.enabled():
+            state_key = disk_cache.cache_key(
+                state_fields(input,iterations,plan['backend'],
+                             arguments.oracle,plan['uf'],plan['dif'],
+                             arguments.dtype,plan['fuse']))
+            current_state = disk_cache.load(state_key)
+        if current_state is None:
+            gates = circuit(input,needle,plan['backend'],arguments.oracle,
+                            plan['uf'],plan['dif'],arguments.storage,
+                            arguments.dtype,plan['fuse'],arguments.workers)
+
+    # Part Three: Execute the circuit
+    with profiling.stage('part_three'):
+        if current_state is None:
+            current_state = run_circuit(gates,iterations)
+            if disk_cache.enabled():
+                disk_cache.store(state_key,current_state)
+
+    # Part Four: Results and Interpretation
+    with profiling.stage('part_four'):
+        results(input,needle,iterations,current_state,arguments.top,
+                arguments.full_state,arguments.summary,
+                arguments.backend == 'out-of-core' and
+                arguments.oracle == 'control')
+        if arguments.shots:
+            measurement_results(input,needle,current_state,arguments.shots,
+                                arguments.seed,arguments.sampling,
+                                arguments.top)
+        if arguments.dtype:
+            precision_results(input,needle,iterations,current_state,
+                              arguments.backend,arguments.oracle,
+                              arguments.dtype,arguments.check_dtype,
+                              plan['fuse'])
+        if arguments.iteration_trace:
+            trace_results(input,needle,iterations,
+                          plan_trace(parser,arguments,
+                                     input['required_qubits'],iterations,
+                                     budget,arguments.backend),
+                          arguments.oracle,arguments.dtype,
+                          arguments.iteration_trace,arguments.storage)
+
+    if arguments.trace:
+        profiling.disable()
+        profiling.write_trace(arguments.trace,
+                              backend=arguments.backend,
+                              oracle=arguments.oracle,
+                              required_qubits=input['required_qubits'],
+                              repeat=iterations,
+                              operator_cache=cache_stats(),
+                              disk_cache=disk_cache.cache_stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#############################################################################
+# This module implements a process-wide cache for the operators (matrices)
+# that the circuit scripts build.  Most operators depend only on the number
+# of qubits: in Grover.py, everything in circuit() apart from Uf (that is, Q,
+# H, Dif, IxH and IxX), and in Deutsch-Jozsa.py, H and HI.  Building them is
+# the expensive part of setting up a circuit, so repeated runs at the same
+# size can share them.
+#
+# Operators are keyed by (qubit count, construction method, dtype).  The
+# cache holds at most <max_bytes> bytes of operators; when it is full, the
+# least recently used operators are evicted first.
+#
+# Cached operators are shared, so they must not be modified in place.
+#
+# Usage:
+#
+#   from quantum.operator_cache import cached_operator, cache_stats
+#   H = cached_operator(required_qubits, 'H', 'complex128', build_H)
+##############################################################################
+
+from collections import OrderedDict
+
+# Default memory budget: 1 GiB
+DEFAULT_MAX_BYTES = 2 ** 30
+
+_operators = OrderedDict()
+_stats = {'hits': 0,
+          'misses': 0,
+          'evictions': 0,
+          'bytes': 0,
+          'max_bytes': DEFAULT_MAX_BYTES}
+
+#-----------------------------------------------------------------------------
+# Function: operator_bytes(operator)
+#-----------------------------------------------------------------------------
+# Estimate the memory held by an operator.  Handles NumPy arrays, SciPy
+# sparse matrices, QuTiP Qobjs (which store their data as a sparse matrix),
+# and lists of any of these.
+#-----------------------------------------------------------------------------
+# operator: the operator to measure
+#-----------------------------------------------------------------------------
+def operator_bytes(operator):
+    if isinstance(operator, (list, tuple)):
+        return sum(operator_bytes(item) for item in operator)
+    if hasattr(operator, 'dims') and hasattr(operator, 'data'):
+        # QuTiP Qobj
+        return operator_bytes(operator.data)
+    if hasattr(operator, 'indptr'):
+        # SciPy sparse matrix (CSR/CSC)
+        return (operator.data.nbytes + operator.indices.nbytes +
+                operator.indptr.nbytes)
+    if hasattr(operator, 'nbytes'):
+        return operator.nbytes
+    return 0
+
+#-----------------------------------------------------------------------------
+# Function: cached_operator(qubits, method, dtype, build)
+#-----------------------------------------------------------------------------
+# Return the operator for (qubits, method, dtype), calling build() to make it
+# if it is not already in the cache.
+#-----------------------------------------------------------------------------
+# qubits: number of qubits the operator is built for
+# method: name of the operator and how it is built (e.g. 'Dif/dif1')
+# dtype: name of the data type of the operator (e.g. 'complex128')
+# build: function of no arguments that builds the operator
+#-----------------------------------------------------------------------------
+def cached_operator(qubits, method, dtype, build):
+    key = (qubits, method, str(dtype))
+    if key in _operators:
+        _stats['hits'] += 1
+        _operators.move_to_end(key)
+        return _operators[key][0]
+
+    _stats['misses'] += 1
+    operator = build()
+    size = operator_bytes(operator)
+
+    # Operators bigger than the whole budget are returned but not kept
+    if size <= _stats['max_bytes']:
+        _operators[key] = (operator, size)
+        _stats['bytes'] += size
+        _evict()
+    return operator
+
+#-----------------------------------------------------------------------------
+# Function: _evict()
+#-----------------------------------------------------------------------------
+# Drop least recently used operators until the cache is within budget.
+#-----------------------------------------------------------------------------
+def _evict():
+    while _stats['bytes'] > _stats['max_bytes'] and _operators:
+        key, (operator, size) = _operators.popitem(last=False)
+        _stats['bytes'] -= size
+        _stats['evictions'] += 1
+
+#-----------------------------------------------------------------------------
+# Function: configure(max_bytes)
+#-----------------------------------------------------------------------------
+# Set the memory budget of the cache, evicting operators if necessary.  A
+# budget of 0 turns caching off.
+#-----------------------------------------------------------------------------
+# max_bytes: maximum number of bytes of operators to hold
+#-----------------------------------------------------------------------------
+def configure(max_bytes=DEFAULT_MAX_BYTES):
+    _stats['max_bytes'] = max_bytes
+    _evict()
+
+#-----------------------------------------------------------------------------
+# Function: cache_stats()
+#-----------------------------------------------------------------------------
+# Return a dictionary of counters for monitoring: hits, misses, evictions,
+# bytes (currently held), max_bytes (budget) and entries.
+#-----------------------------------------------------------------------------
+def cache_stats():
+    return dict(_stats, entries=len(_operators))
+
+#-----------------------------------------------------------------------------
+# Function: cache_clear()
+#-----------------------------------------------------------------------------
+# Empty the cache and reset the counters (the budget is kept).
+#-----------------------------------------------------------------------------
+def cache_clear():
+    _operators.clear()
+    _stats.update(hits=0, misses=0, evictions=0, bytes=0)
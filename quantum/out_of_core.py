@@ -0,0 +1,243 @@
+#############################################################################
+# This module keeps Grover's state vector on disk instead of in memory, so
+# that the number of qubits is limited by disk space rather than RAM, and
+# so that a long run can be resumed after the process dies.
+#
+# The state is the 2^n amplitudes of the data qubits, as in
+# run_circuit_matrix_free() in grover.py: Uf flips the sign of the needle's
+# amplitude, and Dif takes each amplitude x to x - 2*mean.  It is stored in
+# two .npy files, 'a' and 'b', opened as memory maps (numpy.memmap).  Each
+# Grover iteration reads one file and writes the other, a chunk at a time,
+# in a single sequential pass:
+#
+#   new[i] = old[i] - 2*mean       (with old[needle] negated first)
+#
+# The mean needs the sum of the flipped state, which is the sum of the old
+# state less twice the needle's old amplitude; and the sum of the old state
+# was worked out as it was written, on the pass before.  So each iteration
+# reads and writes the state once.
+#
+# After each iteration the new file is flushed to disk and a checkpoint
+# (iteration number, which file holds the state, its sum and sum of squares,
+# and the needle's amplitude) is written to
+# 'checkpoint.json', atomically (write a temporary file, then os.replace()).
+# The file the checkpoint points to is never written until the checkpoint
+# has moved on to the other file, so if the process dies at any point, the
+# last checkpoint describes a complete state, and run() resumes from it.
+#
+# The sum of squares and the needle's amplitude in each checkpoint are what
+# an iteration trace records (see trace()), so tracing takes no more passes
+# than running.
+#
+# Usage:
+#
+#   from quantum.out_of_core import run
+#   amplitudes = run('grover-state', 2**30, needle_position, repeat)
+##############################################################################
+
+from numpy import *
+from numpy.lib.format import open_memmap
+import builtins
+import json
+import os
+from . import profiling
+
+# Number of amplitudes to process at a time (32 MiB of float64)
+CHUNK_ELEMENTS = 2 ** 22
+
+CHECKPOINT = 'checkpoint.json'
+
+#-----------------------------------------------------------------------------
+# Function: buffer_path(directory, name)
+#-----------------------------------------------------------------------------
+def buffer_path(directory, name):
+    return os.path.join(directory, 'state-{}.npy'.format(name))
+
+#-----------------------------------------------------------------------------
+# Function: read_checkpoint(directory)
+#-----------------------------------------------------------------------------
+# Return the last checkpoint in directory, or None if there is none.
+#-----------------------------------------------------------------------------
+def read_checkpoint(directory):
+    try:
+        with open(os.path.join(directory, CHECKPOINT)) as checkpoint:
+            return json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+
+#-----------------------------------------------------------------------------
+# Function: write_checkpoint(directory, checkpoint)
+#-----------------------------------------------------------------------------
+# Replace the checkpoint in directory.  The new checkpoint is written to a
+# temporary file and renamed over the old one, so a reader sees either the
+# old checkpoint or the new one, never half of one.
+#-----------------------------------------------------------------------------
+def write_checkpoint(directory, checkpoint):
+    path = os.path.join(directory, CHECKPOINT)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as output:
+        json.dump(checkpoint, output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temporary, path)
+
+#-----------------------------------------------------------------------------
+# Function: open_buffer(directory, name, string_length, dtype, create)
+#-----------------------------------------------------------------------------
+# Open one of the two state files as a memory map, creating it (at its full
+# size) if asked, or if there is no such file of the right size and dtype.
+#-----------------------------------------------------------------------------
+def open_buffer(directory, name, string_length, dtype, create=False):
+    path = buffer_path(directory, name)
+    if not create and os.path.exists(path):
+        state = open_memmap(path, mode='r+')
+        if state.shape == (string_length,) and state.dtype == dtype:
+            return state
+        del state
+    return open_memmap(path, mode='w+', dtype=dtype, shape=(string_length,))
+
+#-----------------------------------------------------------------------------
+# Function: dtype_name(kind)
+#-----------------------------------------------------------------------------
+# The canonical name of a dtype ('float64' for float, 'f8', and so on), as
+# stored in the checkpoint.
+#-----------------------------------------------------------------------------
+def dtype_name(kind):
+    return dtype(kind).name
+
+#-----------------------------------------------------------------------------
+# Function: initialise(directory, string_length, position, dtype, chunk)
+#-----------------------------------------------------------------------------
+# Write the state after H (every amplitude 1/sqrt(2^n)) to file 'a', and
+# return the checkpoint for iteration 0.
+#-----------------------------------------------------------------------------
+def initialise(directory, string_length, position, dtype, chunk):
+    # Remove the old checkpoint first: it may point at file 'a', which is
+    # about to be overwritten.
+    if os.path.exists(os.path.join(directory, CHECKPOINT)):
+        os.remove(os.path.join(directory, CHECKPOINT))
+    state = open_buffer(directory, 'a', string_length, dtype, create=True)
+    total, squares = 0.0, 0.0
+    for start in range(0, string_length, chunk):
+        stop = builtins.min(start + chunk, string_length)
+        block = state[start:stop]
+        block[...] = 1 / sqrt(string_length)
+        total += float(block.sum(dtype=float64))
+        squares += float(einsum('i,i->', block, block, dtype=float64))
+    state.flush()
+    needle = float(state[position])
+    del state, block
+    checkpoint = {'string_length': string_length,
+                  'position': position,
+                  'dtype': dtype_name(dtype),
+                  'iteration': 0,
+                  'buffer': 'a',
+                  'sum': total,
+                  'squares': squares,
+                  'needle': needle}
+    write_checkpoint(directory, checkpoint)
+    return checkpoint
+
+#-----------------------------------------------------------------------------
+# Function: grover_pass(old, new, position, mean, chunk)
+#-----------------------------------------------------------------------------
+# One Grover iteration from the memory map old to the memory map new.
+# Returns the sum of the new state, and the sum of its squares.
+#-----------------------------------------------------------------------------
+# old, new: memory maps of the state before and after the iteration
+# position: the needle position
+# mean: mean of the state after Uf (the needle negated)
+# chunk: number of amplitudes to process at a time
+#-----------------------------------------------------------------------------
+def grover_pass(old, new, position, mean, chunk):
+    total, squares = 0.0, 0.0
+    for start in range(0, old.size, chunk):
+        stop = builtins.min(start + chunk, old.size)
+        block = new[start:stop]
+        subtract(old[start:stop], 2 * mean, out=block, casting='unsafe')
+        if start <= position < stop:
+            block[position - start] = -old[position] - 2 * mean
+        total += float(block.sum(dtype=float64))
+        squares += float(einsum('i,i->', block, block, dtype=float64))
+    return total, squares
+
+#-----------------------------------------------------------------------------
+# Function: run(directory, string_length, position, repeat, dtype, chunk,
+#               log)
+#-----------------------------------------------------------------------------
+# Run <repeat> Grover iterations with the state stored in directory, resuming
+# from the last checkpoint there if it is for the same problem (string
+# length, needle position and dtype) and has not gone past <repeat>.
+# Returns the final data amplitudes as a read-only memory map.
+#-----------------------------------------------------------------------------
+# directory: where to keep the state files and checkpoint (created if need
+#            be)
+# string_length: 2^n, the number of amplitudes
+# position: the needle position
+# repeat: the number of Grover iterations
+# dtype: dtype of the stored amplitudes (the amplitudes are real)
+# chunk: number of amplitudes to process at a time
+# log: if given, called as log(iteration) after each checkpoint
+#-----------------------------------------------------------------------------
+def run(directory, string_length, position, repeat, dtype='float64',
+        chunk=CHUNK_ELEMENTS, log=None):
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = read_checkpoint(directory)
+    if (checkpoint is None or
+            checkpoint['string_length'] != string_length or
+            checkpoint['position'] != position or
+            checkpoint['dtype'] != dtype_name(dtype) or
+            checkpoint['iteration'] > repeat or
+            not os.path.exists(buffer_path(directory, checkpoint['buffer']))):
+        checkpoint = initialise(directory, string_length, position, dtype,
+                                chunk)
+
+    while checkpoint['iteration'] < repeat:
+        with profiling.stage('iteration', iteration=checkpoint['iteration']):
+            old_name = checkpoint['buffer']
+            new_name = 'b' if old_name == 'a' else 'a'
+            old = open_buffer(directory, old_name, string_length, dtype)
+            new = open_buffer(directory, new_name, string_length, dtype)
+
+            # Uf negates the needle, so the sum drops by twice its amplitude
+            mean = (checkpoint['sum'] - 2 * float(old[position])) / string_length
+            total, squares = grover_pass(old, new, position, mean, chunk)
+            new.flush()
+            needle = float(new[position])
+            del old, new
+
+            checkpoint = dict(checkpoint,
+                              iteration=checkpoint['iteration'] + 1,
+                              buffer=new_name, sum=total, squares=squares,
+                              needle=needle)
+            write_checkpoint(directory, checkpoint)
+        if log is not None:
+            log(checkpoint['iteration'])
+
+    return open_memmap(buffer_path(directory, checkpoint['buffer']), mode='r')
+
+#-----------------------------------------------------------------------------
+# Function: trace(directory, string_length, position, repeat, dtype, chunk,
+#                 until_peak)
+#-----------------------------------------------------------------------------
+# The iteration trace of an out-of-core run, as trace_circuit() in grover.py
+# records it: a list of repeat+1 rows (probability, norm_drift), where row k
+# is the state after k iterations.  Each row comes from the checkpoint of
+# that iteration, so the state is never read into memory, and each
+# iteration is one pass over the files.  With until_peak=True, stop at the
+# first iteration whose probability is lower than the one before.
+#
+# The run starts again from iteration 0, so directory should not hold a run
+# that is to be resumed.
+#-----------------------------------------------------------------------------
+def trace(directory, string_length, position, repeat, dtype='float64',
+          chunk=CHUNK_ELEMENTS, until_peak=False):
+    rows = []
+    for iteration in range(repeat + 1):
+        # run() resumes from the checkpoint before, so this is one iteration
+        run(directory, string_length, position, iteration, dtype, chunk)
+        checkpoint = read_checkpoint(directory)
+        rows.append((checkpoint['needle'] ** 2, checkpoint['squares'] - 1))
+        if until_peak and iteration and rows[-1][0] < rows[-2][0]:
+            break
+    return rows
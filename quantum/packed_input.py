@@ -0,0 +1,183 @@
+#############################################################################
+# This module lets the circuit scripts read their input from a bit-packed
+# binary file instead of a Python string of '0' and '1' characters.
+#
+# An input string such as '01010101' takes one byte per character.  Packed,
+# it takes one bit per character: the first character is the most
+# significant bit of the first byte, and so on (as numpy.packbits() does).
+# A packed file is opened as a numpy.memmap, so it is never read into memory
+# all at once; instead, it is unpacked a chunk at a time as the oracle is
+# built.
+#
+# Every function here accepts either an ordinary input string or a packed
+# source (as returned by open_packed()), so the scripts can use them in
+# place of len(), find('1') and so on.
+#
+# Usage:
+#
+#   from quantum.packed_input import pack_string, open_packed
+#   pack_string('01010101', 'input.bin')
+#   input_string = open_packed('input.bin')
+##############################################################################
+
+from numpy import *
+import builtins
+
+# Number of bits to unpack at a time (must be a multiple of 8)
+CHUNK_BITS = 2 ** 23
+
+#-----------------------------------------------------------------------------
+# Function: pack_string(input_string, path)
+#-----------------------------------------------------------------------------
+# Write an input string of '0' and '1' characters to a bit-packed file.
+#-----------------------------------------------------------------------------
+# input_string: string of '0' and '1' characters
+# path: file to write
+#-----------------------------------------------------------------------------
+def pack_string(input_string, path):
+    bits = frombuffer(input_string.encode(), dtype=uint8) == ord('1')
+    packbits(bits).tofile(path)
+
+#-----------------------------------------------------------------------------
+# Function: open_packed(source, length)
+#-----------------------------------------------------------------------------
+# Open a bit-packed input.  The file is memory-mapped rather than read.
+#-----------------------------------------------------------------------------
+# source: path to a packed file, or an array (e.g. numpy.memmap) of uint8
+# length: number of bits in the input (default: 8 bits per byte)
+#-----------------------------------------------------------------------------
+def open_packed(source, length=None):
+    if isinstance(source, ndarray):
+        packed = source
+        name = 'array'
+    else:
+        packed = memmap(source, dtype=uint8, mode='r')
+        name = str(source)
+    if length is None:
+        length = packed.size * 8
+    elif length > packed.size * 8:
+        raise ValueError("Packed input holds fewer than {} bits".format(length))
+    return {'packed': packed, 'length': length, 'name': name}
+
+#-----------------------------------------------------------------------------
+# Function: is_packed(source)
+#-----------------------------------------------------------------------------
+# True if source came from open_packed(), False for an input string.
+#-----------------------------------------------------------------------------
+def is_packed(source):
+    return isinstance(source, dict) and 'packed' in source
+
+#-----------------------------------------------------------------------------
+# Function: source_length(source)
+#-----------------------------------------------------------------------------
+# Number of characters (bits) in the input.
+#-----------------------------------------------------------------------------
+def source_length(source):
+    if is_packed(source):
+        return source['length']
+    return len(source)
+
+#-----------------------------------------------------------------------------
+# Function: iter_bits(source, chunk_bits)
+#-----------------------------------------------------------------------------
+# Go through the input a chunk at a time.  Yields (start, bits), where bits
+# is a boolean array for characters start, start+1, ...
+#-----------------------------------------------------------------------------
+# source: input string, or packed source from open_packed()
+# chunk_bits: number of bits per chunk (a multiple of 8)
+#-----------------------------------------------------------------------------
+def iter_bits(source, chunk_bits=CHUNK_BITS):
+    length = source_length(source)
+    for start in range(0, length, chunk_bits):
+        stop = builtins.min(start + chunk_bits, length)
+        if is_packed(source):
+            chunk = source['packed'][start // 8:(stop + 7) // 8]
+            bits = unpackbits(chunk, count=stop - start).astype(bool_)
+        else:
+            bits = frombuffer(source[start:stop].encode(), dtype=uint8) == ord('1')
+        yield start, bits
+
+#-----------------------------------------------------------------------------
+# Function: source_signs(source, dtype)
+#-----------------------------------------------------------------------------
+# The oracle as an array of signs: -1 wherever the input has a 1, and 1
+# elsewhere.  This is built a chunk at a time, straight from the input.
+#-----------------------------------------------------------------------------
+# source: input string, or packed source from open_packed()
+# dtype: data type of the array
+#-----------------------------------------------------------------------------
+def source_signs(source, dtype=float64):
+    signs = ones(source_length(source), dtype=dtype)
+    for start, chunk in iter_bits(source):
+        signs[start:start + chunk.size][chunk] = -1
+    return signs
+
+#-----------------------------------------------------------------------------
+# Function: source_swaps(source, dtype)
+#-----------------------------------------------------------------------------
+# The oracle as a permutation of the basis states of the data qubits and a
+# control qubit (the last qubit): element i is the basis state that state i
+# goes to.  Wherever the input has a 1, the two basis states for that
+# position (control |0> and control |1>) are swapped.  This is built a chunk
+# at a time, straight from the input, like source_signs().
+#-----------------------------------------------------------------------------
+# source: input string, or packed source from open_packed()
+# dtype: integer data type of the array
+#-----------------------------------------------------------------------------
+def source_swaps(source, dtype=int64):
+    targets = arange(2 * source_length(source), dtype=dtype)
+    for start, chunk in iter_bits(source):
+        targets[2 * start:2 * (start + chunk.size)] ^= chunk.repeat(2)
+    return targets
+
+#-----------------------------------------------------------------------------
+# Function: find_one(source)
+#-----------------------------------------------------------------------------
+# Position of the first 1 in the input, or -1 if there is none (like
+# str.find('1')).
+#-----------------------------------------------------------------------------
+def find_one(source):
+    if not is_packed(source):
+        return source.find('1')
+    for start, chunk in iter_bits(source):
+        if chunk.any():
+            return start + int(argmax(chunk))
+    return -1
+
+#-----------------------------------------------------------------------------
+# Function: count_ones(source)
+#-----------------------------------------------------------------------------
+# Number of 1s in the input.
+#-----------------------------------------------------------------------------
+def count_ones(source):
+    if not is_packed(source):
+        return source.count('1')
+    total = 0
+    for start, chunk in iter_bits(source):
+        total += int(count_nonzero(chunk))
+    return total
+
+#-----------------------------------------------------------------------------
+# Function: describe(source)
+#-----------------------------------------------------------------------------
+# A printable version of the input: the string itself, or a short
+# description of a packed source.
+#-----------------------------------------------------------------------------
+def describe(source):
+    if is_packed(source):
+        return '<packed: {} bits from {}>'.format(source['length'], source['name'])
+    return source
+
+#-----------------------------------------------------------------------------
+# Function: source_digest(source)
+#-----------------------------------------------------------------------------
+# A SHA-256 digest (as hex) of the input's bits and length.  An input string
+# and the same string packed have the same digest, so either finds the other
+# in the disk cache (see disk_cache.py).
+#-----------------------------------------------------------------------------
+def source_digest(source):
+    import hashlib
+    digest = hashlib.sha256(str(source_length(source)).encode())
+    for start, chunk in iter_bits(source):
+        digest.update(packbits(chunk).tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,374 @@
+#############################################################################
+# This module estimates what a run of Grover's Algorithm will cost before
+# anything is allocated, and picks the backend and construction methods to
+# use.
+#
+# The backends differ enormously in cost.  The dense backend's operators are
+# (2^(n+1) x 2^(n+1)) matrices, so at 16 qubits a single one of them needs
+# hundreds of gigabytes, and the process is killed while it is still filling
+# it with zeros.  The sparse and gates backends need O(n * 2^n), and the
+# matrix-free and analytic backends O(2^n) (for the final state).  So the
+# planner:
+#
+# (1) estimates the peak memory and the run time of each plan (a backend,
+#     plus uf1()/uf2() and dif1()/dif2() where the backend has a choice),
+#     from the formulas in estimate();
+# (2) drops the plans whose memory is over the budget (by default, the memory
+#     available on this machine), and out-of-core plans whose files would
+#     not fit on the disk;
+# (3) picks the fastest of the rest.
+#
+# The analytic backend is never chosen unless it is asked for: it works the
+# answer out from a formula rather than simulating the circuit, so it would
+# win every time, and a run asked to simulate would quietly not.
+#
+# If a backend was asked for and it does not fit, the plan is downgraded to
+# the fastest one that does (plan() records which backend it replaced); if
+# nothing fits, it refuses with a MemoryError.
+#
+# The memory formulas count the arrays each backend allocates, with
+# constants fitted to peak memory measured with tracemalloc.  The time
+# formulas count the work per Grover iteration, with constants measured on
+# one core; they are rough, but only their order matters for choosing a plan.
+#
+# Usage:
+#
+#   from quantum.planner import plan, print_plan
+#   chosen = plan(required_qubits=20, repeat=804)
+#   print_plan(chosen)
+##############################################################################
+
+import os
+import shutil
+import tempfile
+
+# The plans considered for backend='auto', and when downgrading: (backend,
+# uf, dif).  These are the simulations; 'analytic' is left out (see above).
+PLANS = (('dense', 'uf1', 'dif1'),
+         ('dense', 'uf2', 'dif1'),
+         ('dense', 'uf1', 'dif2'),
+         ('dense', 'uf2', 'dif2'),
+         ('sparse', 'uf1', 'dif1'),
+         ('sparse', 'uf2', 'dif1'),
+         ('gates', 'uf1', 'dif1'),
+         ('gates', 'uf2', 'dif1'),
+         ('matrix-free', 'uf1', 'dif1'),
+         ('sharded', 'uf1', 'dif1'),
+         ('out-of-core', 'uf1', 'dif1'))
+
+# Seconds per unit of work (see estimate())
+COSTS = {'dense_build': 2e-9,        # per M^3 (products of dense operators)
+         'dense_entry': 2e-7,        # per M^2 (filling a dense operator)
+         'dense_step': 2e-8,         # per M^2 (operator times state)
+         'sparse_factor': 5e-3,      # per sparse factor built
+         'sparse_build': 2e-7,       # per nonzero
+         'sparse_step': 5e-9,        # per nonzero
+         'gate': 5e-5,               # per gate (Python overhead)
+         'gate_amplitude': 8e-9,     # per amplitude touched by a gate
+         'vector_step': 2e-5,        # per vectorised step (NumPy overhead)
+         'vector_amplitude': 3e-9,   # per amplitude per step
+         'process_start': 1e-2,      # per worker process started
+         'barrier': 5e-5,            # per worker per barrier wait
+         'disk_amplitude': 2e-8,     # per amplitude read and written
+         'checkpoint': 2e-3}         # per checkpoint (flush, fsync, reopen)
+
+# Fixed overhead in every estimate (imports, small objects)
+OVERHEAD_BYTES = 2 ** 20
+
+#-----------------------------------------------------------------------------
+# Function: available_memory()
+#-----------------------------------------------------------------------------
+# The memory available to a new allocation, in bytes, or None if it cannot
+# be found out.  On Linux this is MemAvailable from /proc/meminfo (which
+# counts memory the kernel can reclaim from caches).
+#-----------------------------------------------------------------------------
+def available_memory():
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+#-----------------------------------------------------------------------------
+# Function: free_disk(directory)
+#-----------------------------------------------------------------------------
+# The free space, in bytes, on the disk that holds <directory> (or, if it
+# does not exist yet, its nearest parent that does), or None if it cannot be
+# found out.
+#-----------------------------------------------------------------------------
+def free_disk(directory):
+    directory = os.path.abspath(directory)
+    while not os.path.exists(directory):
+        directory = os.path.dirname(directory)
+    try:
+        return shutil.disk_usage(directory).free
+    except OSError:
+        return None
+
+#-----------------------------------------------------------------------------
+# Function: parse_size(text)
+#-----------------------------------------------------------------------------
+# A size in bytes from a string such as '512M', '8G' or '1000000'.
+#-----------------------------------------------------------------------------
+def parse_size(text):
+    units = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+#-----------------------------------------------------------------------------
+# Function: format_size(size)
+#-----------------------------------------------------------------------------
+# A size in bytes as a string such as '1.5 GiB'.
+#-----------------------------------------------------------------------------
+def format_size(size):
+    if size < 1024:
+        return '{} B'.format(int(size))
+    for unit in ('KiB', 'MiB', 'GiB', 'TiB'):
+        size /= 1024
+        if size < 1024 or unit == 'TiB':
+            return '{:.1f} {}'.format(size, unit)
+
+#-----------------------------------------------------------------------------
+# Function: itemsize(dtype)
+#-----------------------------------------------------------------------------
+# Bytes per amplitude of the final state for a dtype name such as 'float32'
+# (complex128 if it is None).
+#-----------------------------------------------------------------------------
+def itemsize(dtype):
+    return {'float32': 4, 'float64': 8, 'complex64': 8,
+            'complex128': 16}[dtype or 'complex128']
+
+#-----------------------------------------------------------------------------
+# Function: real_itemsize(dtype)
+#-----------------------------------------------------------------------------
+# Bytes per real amplitude, as the matrix-free backends store them (float64
+# if dtype is None).
+#-----------------------------------------------------------------------------
+def real_itemsize(dtype):
+    return 4 if dtype in ('float32', 'complex64') else 8
+
+#-----------------------------------------------------------------------------
+# Function: estimate(backend, required_qubits, repeat, oracle, uf, dif,
+#                    dtype, fuse, workers)
+#-----------------------------------------------------------------------------
+# Estimate the peak memory (bytes), disk space (disk_bytes) and run time
+# (seconds) of one run.  With N = 2^n data amplitudes and M amplitudes in the
+# whole state (2N with a control qubit, N without):
+#
+#   dense:        about 80 bytes per operator entry (QuTiP keeps several
+#                 M x M complex operators, and uf1()/uf2() fill M x M arrays
+#                 of zeros); dif1() multiplies dense operators, O(M^3)
+#   sparse:       M rows of about 48 bytes for each of the 2n + 6 sparse
+#                 factors, plus a few states
+#   gates:        the state, and about twice that again in temporaries
+#   matrix-free:  N real amplitudes, and the final state of M
+#   analytic:     just the final state of M
+#   out-of-core:  two chunks of the state and the float64 probabilities of
+#                 a chunk (the final state stays on disk, and is reported a
+#                 chunk at a time), and 2N amplitudes on disk
+#   sharded:      N amplitudes in shared memory, and the final state; each
+#                 iteration does 1/workers of the matrix-free work per
+#                 process, plus a barrier, and each worker takes time to
+#                 start
+#   fuse=True:    adds the dense iterate G and its squares (see
+#                 fuse_iterate() in grover.py) to the cost of building the
+#                 backend's unfused Uf and Dif, which G is made from
+#-----------------------------------------------------------------------------
+# backend: as in grover.circuit()
+# required_qubits: number of data qubits, n
+# repeat: number of Grover iterations
+# oracle: 'control' or 'phase'
+# uf, dif: construction methods, as in grover.circuit()
+# dtype: name of the dtype, or None for the backend's default
+# fuse: True to fuse the Grover iterate
+# workers: processes for the sharded backend (default: all cores)
+#-----------------------------------------------------------------------------
+def estimate(backend, required_qubits, repeat, oracle='control', uf='uf1',
+             dif='dif1', dtype=None, fuse=False, workers=None):
+    n = required_qubits
+    N = 2 ** n
+    M = 2 * N if oracle == 'control' else N
+    state = M * itemsize(dtype)
+    real = N * real_itemsize(dtype)
+    disk = 0
+
+    if backend == 'dense':
+        memory = 80 * M * M
+        seconds = (COSTS['dense_entry'] * M * M * (2 if dif == 'dif2' else 1) +
+                   (COSTS['dense_build'] * M ** 3 if dif == 'dif1' else 0) +
+                   COSTS['dense_step'] * M * M * repeat)
+    elif backend == 'sparse':
+        factors = 2 * n + 6 if oracle == 'control' else n + 3
+        memory = 48 * M * factors + 4 * state
+        nonzeros = 2 * M * factors
+        seconds = (COSTS['sparse_factor'] * factors +
+                   COSTS['sparse_build'] * nonzeros +
+                   COSTS['sparse_step'] * 2 * M * (3 * n + 4) * repeat)
+    elif backend == 'gates':
+        gates = 6 * n + 3
+        memory = 3 * state
+        seconds = (COSTS['gate'] * gates * repeat +
+                   COSTS['gate_amplitude'] * M * gates * repeat)
+    elif backend == 'matrix-free':
+        memory = 2 * real + state
+        seconds = ((COSTS['vector_step'] + COSTS['vector_amplitude'] * N) *
+                   2 * repeat + COSTS['vector_amplitude'] * M)
+    elif backend == 'sharded':
+        workers = min(workers or os.cpu_count() or 1, N)
+        memory = 2 * real + state
+        seconds = (COSTS['process_start'] * workers +
+                   (COSTS['vector_step'] + COSTS['barrier'] * workers +
+                    COSTS['vector_amplitude'] * N / workers) * 2 * repeat +
+                   COSTS['vector_amplitude'] * M)
+    elif backend == 'analytic':
+        memory = state + real
+        seconds = COSTS['vector_amplitude'] * M
+    elif backend == 'out-of-core':
+        chunk = min(N, 2 ** 22)
+        memory = chunk * (2 * real_itemsize(dtype) + 3 * 8)
+        disk = 2 * real
+        seconds = (COSTS['checkpoint'] + COSTS['disk_amplitude'] * 2 * N) * \
+                  (repeat + 1)
+    else:
+        raise ValueError("Unknown backend: {}".format(backend))
+
+    if fuse:
+        # G and one square per bit of repeat, each M x M
+        squares = max(repeat, 1).bit_length()
+        memory += M * M * itemsize(dtype) * (squares + 1)
+        seconds += COSTS['dense_build'] * M ** 3 * (squares + 1) + \
+                   COSTS['dense_step'] * M * M * squares
+
+    return {'backend': backend,
+            'uf': uf,
+            'dif': dif,
+            'fuse': fuse,
+            'bytes': memory + OVERHEAD_BYTES,
+            'disk_bytes': disk,
+            'seconds': seconds}
+
+#-----------------------------------------------------------------------------
+# Function: plan(required_qubits, repeat, budget, oracle, dtype, backend,
+#                uf, dif, fuse, workers, storage)
+#-----------------------------------------------------------------------------
+# Choose a plan: the backend asked for, if it fits in the memory budget, and
+# otherwise (or for backend='auto') the fastest plan in PLANS that fits
+# (never 'analytic', which is only used when it is asked for).
+# Returns the estimate() of the chosen plan, with the budget, the backend it
+# replaced (downgraded_from, or None), and the number of plans rejected for
+# being over budget.  Raises MemoryError if no plan fits, and ValueError if
+# the dense backend is asked for in a dtype other than complex128, or fusing
+# is asked for with a backend other than dense.
+#-----------------------------------------------------------------------------
+# required_qubits: number of data qubits, n
+# repeat: number of Grover iterations
+# budget: memory budget in bytes (default: available_memory(); None there
+#         means no limit)
+# oracle: 'control' or 'phase'
+# dtype: name of the dtype, or None (the dense backend only runs in
+#        complex128, so other dtypes rule it out)
+# backend: the backend asked for, or 'auto'
+# uf, dif: the construction methods asked for, with <backend> (for
+#          backend='auto', and when downgrading, the cheapest are chosen)
+# fuse: True to fuse the Grover iterate, with <backend> (only dense can;
+#       downgraded plans, and plans chosen by 'auto', are not fused)
+# workers: processes for the sharded backend (default: all cores)
+# storage: where the out-of-core backend would keep its files (default: the
+#          temporary directory); out-of-core plans must fit on its disk
+#-----------------------------------------------------------------------------
+def plan(required_qubits, repeat, budget=None, oracle='control', dtype=None,
+         backend='auto', uf=None, dif=None, fuse=False, workers=None,
+         storage=None):
+    if backend == 'dense' and dtype not in (None, 'complex128'):
+        raise ValueError("The dense backend uses QuTiP, which only supports "
+                         "complex128, not {}; choose another backend (or "
+                         "auto)".format(dtype))
+    if fuse and backend not in ('dense', 'auto'):
+        raise ValueError("Only the dense backend can fuse the Grover "
+                         "iterate, not {}".format(backend))
+    if budget is None:
+        budget = available_memory()
+
+    disk = free_disk(storage or tempfile.gettempdir())
+
+    def fits(estimated):
+        return ((budget is None or estimated['bytes'] <= budget) and
+                (disk is None or estimated['disk_bytes'] <= disk))
+
+    def chosen(estimated, downgraded_from=None, rejected=0):
+        return dict(estimated, budget=budget, downgraded_from=downgraded_from,
+                    rejected=rejected)
+
+    if backend != 'auto':
+        asked = estimate(backend, required_qubits, repeat, oracle,
+                         uf or 'uf1', dif or 'dif1', dtype, fuse, workers)
+        if fits(asked):
+            return chosen(asked)
+
+    candidates = [estimate(name, required_qubits, repeat, oracle, plan_uf,
+                           plan_dif, dtype, workers=workers)
+                  for name, plan_uf, plan_dif in PLANS
+                  if not dtype or dtype == 'complex128' or name != 'dense']
+    viable = [estimated for estimated in candidates if fits(estimated)]
+    if not viable:
+        smallest = min(candidates, key=lambda estimated: estimated['bytes'])
+        raise MemoryError("No plan for {} qubits fits in {} (the smallest, "
+                          "{}, needs {})".format(
+                              required_qubits,
+                              'no limit' if budget is None else
+                              format_size(budget),
+                              smallest['backend'],
+                              format_size(smallest['bytes'])))
+    best = min(viable, key=lambda estimated: estimated['seconds'])
+    return chosen(best, None if backend == 'auto' else backend,
+                  len(candidates) - len(viable))
+
+#-----------------------------------------------------------------------------
+# Function: check(backend, required_qubits, repeat, budget, oracle, uf, dif,
+#                 dtype, fuse)
+#-----------------------------------------------------------------------------
+# Refuse, with a MemoryError, to build a circuit whose estimated memory is
+# over <budget> bytes.  grover.circuit() calls this before allocating
+# anything when it is given a memory budget.
+#-----------------------------------------------------------------------------
+def check(backend, required_qubits, repeat, budget, oracle='control',
+          uf='uf1', dif='dif1', dtype=None, fuse=False):
+    estimated = estimate(backend, required_qubits, repeat, oracle, uf, dif,
+                         dtype, fuse)
+    if estimated['bytes'] > budget:
+        raise MemoryError("The {} backend needs about {} for {} qubits, over "
+                          "the budget of {}".format(
+                              backend, format_size(estimated['bytes']),
+                              required_qubits, format_size(budget)))
+    return estimated
+
+#-----------------------------------------------------------------------------
+# Function: print_plan(chosen)
+#-----------------------------------------------------------------------------
+# Print a plan from plan().
+#-----------------------------------------------------------------------------
+def print_plan(chosen):
+    methods = ''
+    if chosen['backend'] in ('dense', 'sparse', 'gates'):
+        methods = ' ({}, {})'.format(chosen['uf'], chosen['dif'])
+    print('Plan                     : {}{}'.format(chosen['backend'], methods))
+    if chosen['downgraded_from']:
+        print('Downgraded from          : {} (over budget)'.format(
+            chosen['downgraded_from']))
+    print('Estimated memory         : {} (budget {})'.format(
+        format_size(chosen['bytes']),
+        'none' if chosen['budget'] is None else format_size(chosen['budget'])))
+    if chosen['disk_bytes']:
+        print('Estimated disk           : {}'.format(
+            format_size(chosen['disk_bytes'])))
+    print('Estimated time           : {:.3g} seconds'.format(
+        chosen['seconds']))
+    print('-' * 60)
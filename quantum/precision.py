@@ -0,0 +1,116 @@
+#############################################################################
+# This module handles the dtype of the amplitudes and operators, and the
+# numerical error that comes with choosing a smaller one.
+#
+# Every amplitude in these circuits is real: H, X, Uf and Dif have real
+# entries, and so do the starting states.  Storing them as complex128 (as
+# QuTiP does) uses twice the memory of float64, and four times that of
+# float32.  The NumPy and SciPy backends can therefore run in any of DTYPES;
+# QuTiP 4 always stores a Qobj as complex128, so the dense backends can only
+# run in complex128.
+#
+# A smaller dtype means more rounding error.  error_bound() gives an a priori
+# bound on the error in the final state, to first order in the unit roundoff
+# u (half the machine epsilon):
+#
+#   |computed state - exact state|  <=  (c0 + c1 * iterations) * u
+#
+# measured in the 2-norm.  c0 covers preparing the state (and, in
+# Deutsch-Jozsa, the final layer of Hadamards), and c1 one Grover iteration.
+# Every operator here preserves the 2-norm, so the error from one step is not
+# magnified by the steps after it; it only adds up.  The constants come from
+# counting roundings:
+#
+# (1) Matrix-free, out-of-core and sharded Grover: the mean is a pairwise sum
+#     of 2^n terms (error at most n*u per term), and x - 2*mean rounds once
+#     more (the sharded backend adds its partial sums exactly, with fsum());
+#     that gives 2n + 3 per iteration.
+# (2) Sparse Grover: each of the 2n one-qubit Hadamard factors in Dif rounds
+#     a sum of two terms and a scaling (at most 2u each); that gives 4n + 4.
+# (3) Deutsch-Jozsa: n stages of the Walsh-Hadamard transform (or n sparse
+#     Hadamard factors), at most 2u each.
+#
+# measured_error() gives the actual error against a reference state
+# computed in complex128.
+##############################################################################
+
+from numpy import *
+
+# The dtypes that may be chosen
+DTYPES = ('float64', 'float32', 'complex64', 'complex128')
+
+#-----------------------------------------------------------------------------
+# Function: check_dtype(kind, backend, qutip, default)
+#-----------------------------------------------------------------------------
+# Check that <kind> is one of DTYPES, and that <backend> can run in it.
+# Returns the numpy dtype, or <default> if kind is None (the backend's
+# default).
+#-----------------------------------------------------------------------------
+# kind: name of a dtype, or None
+# backend: name of the backend, for the error message
+# qutip: True if the backend stores its operators as QuTiP Qobjs
+# default: dtype to return if kind is None
+#-----------------------------------------------------------------------------
+def check_dtype(kind, backend, qutip=False, default=None):
+    if kind is None:
+        return None if default is None else dtype(default)
+    kind = dtype(kind)
+    if kind.name not in DTYPES:
+        raise ValueError("Unknown dtype: {} (choose from {})".format(
+            kind.name, ', '.join(DTYPES)))
+    if qutip and kind != complex128:
+        raise ValueError("The {} backend uses QuTiP, which only supports "
+                         "complex128".format(backend))
+    return kind
+
+#-----------------------------------------------------------------------------
+# Function: real_dtype(kind)
+#-----------------------------------------------------------------------------
+# The real dtype of the same precision: float32 for complex64, and so on.
+#-----------------------------------------------------------------------------
+def real_dtype(kind):
+    return finfo(kind).dtype
+
+#-----------------------------------------------------------------------------
+# Function: unit_roundoff(kind)
+#-----------------------------------------------------------------------------
+def unit_roundoff(kind):
+    return float(finfo(kind).eps) / 2
+
+#-----------------------------------------------------------------------------
+# Function: error_bound(kind, required_qubits, iterations, method)
+#-----------------------------------------------------------------------------
+# A priori bound on the 2-norm error of the final state (see above).
+#-----------------------------------------------------------------------------
+# kind: dtype the circuit ran in
+# required_qubits: number of data qubits, n
+# iterations: number of Grover iterations (0 for Deutsch-Jozsa)
+# method: 'matrix-free' (also out-of-core and sharded), 'sparse' or
+#         'deutsch-jozsa'
+#-----------------------------------------------------------------------------
+def error_bound(kind, required_qubits, iterations=0, method='matrix-free'):
+    n = required_qubits
+    if method == 'matrix-free':
+        start, step = 1, 2*n + 3
+    elif method == 'sparse':
+        start, step = 2*n + 1, 4*n + 4
+    elif method == 'deutsch-jozsa':
+        start, step = 2*n + 2, 0
+    else:
+        raise ValueError("No error bound for method: {}".format(method))
+    return (start + step * iterations) * unit_roundoff(kind)
+
+#-----------------------------------------------------------------------------
+# Function: measured_error(state, reference)
+#-----------------------------------------------------------------------------
+# The actual error of a state against a reference state: the 2-norm of the
+# difference, the largest difference in any amplitude, and the largest
+# difference in any probability.
+#-----------------------------------------------------------------------------
+def measured_error(state, reference):
+    state = asarray(state).ravel().astype(complex128)
+    reference = asarray(reference).ravel().astype(complex128)
+    return {'norm': float(linalg.norm(state - reference)),
+            'max_amplitude': float(abs(state - reference).max()),
+            'max_probability': float(abs(abs(state)**2 -
+                                         abs(reference)**2).max())}
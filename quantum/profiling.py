@@ -0,0 +1,158 @@
+#############################################################################
+# This module implements opt-in profiling for the circuit scripts.  Code that
+# wants to be profiled marks its stages:
+#
+#   with stage('part_two'):
+#       gates = circuit(input, needle)
+#
+# and, when profiling is enabled, each stage records its wall time and (if
+# asked for) the peak memory allocated while it ran, as measured by
+# tracemalloc.  Stages may be nested: in Grover.py each of the four parts is
+# a stage, and each Grover iteration in run_circuit() is a stage inside Part
+# Three.  Extra fields, such as the iteration number, are stored with the
+# stage.
+#
+# Profiling is disabled by default.  stage() then returns a shared do-nothing
+# context manager, so marking a stage costs one function call and one
+# comparison.
+#
+# Memory peaks of nested stages need tracemalloc.reset_peak(), which is new
+# in Python 3.9.  On older versions each peak is the peak since profiling
+# was enabled.
+#
+# Usage:
+#
+#   from quantum import profiling
+#   profiling.enable()
+#   ... run the circuit ...
+#   profiling.write_trace('trace.json')
+##############################################################################
+
+from contextlib import contextmanager, nullcontext
+import json
+import time
+import tracemalloc
+
+_NULL_STAGE = nullcontext()
+
+_profile = {'enabled': False,
+            'memory': False,
+            'started_tracemalloc': False,
+            'started': 0.0,
+            'events': [],
+            'stack': []}
+
+#-----------------------------------------------------------------------------
+# Function: enable(memory)
+#-----------------------------------------------------------------------------
+# Start profiling, discarding any earlier trace.
+#-----------------------------------------------------------------------------
+# memory: if True, also record peak memory per stage (this starts
+#         tracemalloc, if it is not already running, which slows down code
+#         that allocates many small Python objects)
+#-----------------------------------------------------------------------------
+def enable(memory=True):
+    disable()
+    started_tracemalloc = memory and not tracemalloc.is_tracing()
+    _profile.update(enabled=True, memory=memory,
+                    started_tracemalloc=started_tracemalloc,
+                    started=time.perf_counter(), events=[], stack=[])
+    if started_tracemalloc:
+        tracemalloc.start()
+
+#-----------------------------------------------------------------------------
+# Function: disable()
+#-----------------------------------------------------------------------------
+# Stop profiling.  The trace recorded so far is kept until the next enable().
+# tracemalloc is only stopped if enable() started it, so that a session
+# begun by someone else carries on.
+#-----------------------------------------------------------------------------
+def disable():
+    if _profile['started_tracemalloc'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _profile.update(enabled=False, memory=False, started_tracemalloc=False,
+                    stack=[])
+
+#-----------------------------------------------------------------------------
+# Function: enabled()
+#-----------------------------------------------------------------------------
+def enabled():
+    return _profile['enabled']
+
+#-----------------------------------------------------------------------------
+# Function: stage(name, **fields)
+#-----------------------------------------------------------------------------
+# Context manager that records the stage <name> when profiling is enabled,
+# and does nothing otherwise.
+#-----------------------------------------------------------------------------
+# name: name of the stage
+# fields: extra values to store with the stage (for example, iteration=3)
+#-----------------------------------------------------------------------------
+def stage(name, **fields):
+    if not _profile['enabled']:
+        return _NULL_STAGE
+    return _recorded_stage(name, fields)
+
+@contextmanager
+def _recorded_stage(name, fields):
+    stack = _profile['stack']
+    memory = _profile['memory'] and tracemalloc.is_tracing()
+
+    # Each entry on the stack remembers the memory in use when its stage
+    # began, and the highest peak reached by any stage nested inside it
+    # (whose peaks are lost when the peak is reset for the next stage).
+    entry = {'start_bytes': 0, 'child_peak': 0}
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        entry['start_bytes'] = current
+    event = dict(fields, name=name, depth=len(stack),
+                 start=time.perf_counter() - _profile['started'])
+    stack.append(entry)
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        event['seconds'] = time.perf_counter() - start
+        stack.pop()
+        if memory and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], entry['child_peak'])
+            event['peak_bytes'] = peak - entry['start_bytes']
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+        _profile['events'].append(event)
+
+#-----------------------------------------------------------------------------
+# Function: trace()
+#-----------------------------------------------------------------------------
+# Return the trace: every recorded stage in the order it started, and a
+# summary of the count, total time and highest memory peak for each name.
+#-----------------------------------------------------------------------------
+def trace():
+    events = sorted(_profile['events'], key=lambda event: event['start'])
+    summary = {}
+    for event in events:
+        totals = summary.setdefault(event['name'], {'count': 0,
+                                                    'seconds': 0.0})
+        totals['count'] += 1
+        totals['seconds'] += event['seconds']
+        if 'peak_bytes' in event:
+            totals['peak_bytes'] = max(totals.get('peak_bytes', 0),
+                                       event['peak_bytes'])
+    return {'events': events, 'summary': summary}
+
+#-----------------------------------------------------------------------------
+# Function: write_trace(path, **extra)
+#-----------------------------------------------------------------------------
+# Write the trace as JSON.
+#-----------------------------------------------------------------------------
+# path: file to write
+# extra: additional top-level values to include (for example, the qubit
+#        count or the operator cache statistics)
+#-----------------------------------------------------------------------------
+def write_trace(path, **extra):
+    with open(path, 'w') as output:
+        json.dump(dict(extra, **trace()), output, indent=1)
@@ -0,0 +1,268 @@
+#############################################################################
+# This module summarises a final state without printing every amplitude.
+#
+# The results() functions in Grover.py and Deutsch-Jozsa.py used to print
+# the whole combined state, one binary_repr() per amplitude.  At 20 qubits
+# that is millions of lines.  Instead, the functions here work on the whole
+# state at once with NumPy:
+#
+# (1) probabilities(): |amplitude|^2 for every basis state, optionally
+#     summed over the control qubit (the last qubit), so that they are the
+#     probabilities of measuring each data-qubit state.
+# (2) top_k(): the k most likely basis states, found with argpartition()
+#     (O(2^n), rather than sorting the whole state).
+# (3) marginals(): for each qubit, the probability of measuring it as 1.
+#
+# summary() collects these into a dictionary, which print_summary() prints
+# and write_summary() saves as JSON or as a compressed .npz file.  It reads
+# the state a chunk at a time, keeping the k most likely states seen so far,
+# so a state on disk (a memory map, as from the out-of-core backend) is never
+# read into memory all at once.  For when the whole state really is wanted,
+# dump_state() prints it a chunk at a time, with the bit strings built by
+# array operations rather than one at a time.
+##############################################################################
+
+from numpy import *
+import builtins
+import json
+import sys
+
+# Number of amplitudes to format at a time in dump_state()
+DUMP_CHUNK = 2 ** 16
+
+# Number of amplitudes to read at a time in summary() (a power of 2)
+SUMMARY_CHUNK = 2 ** 22
+
+#-----------------------------------------------------------------------------
+# Function: probabilities(state, control_qubits)
+#-----------------------------------------------------------------------------
+# Probability of each basis state.  With control_qubits=1, the two basis
+# states that differ only in the control qubit are added together.
+#-----------------------------------------------------------------------------
+def probabilities(state, control_qubits=0):
+    state = asarray(state).ravel()
+    if iscomplexobj(state):
+        probability = state.real ** 2 + state.imag ** 2
+    else:
+        probability = state.astype(float64) ** 2
+    if control_qubits:
+        probability = probability.reshape(-1, 2 ** control_qubits).sum(axis=1)
+    return probability
+
+#-----------------------------------------------------------------------------
+# Function: bit_strings(indices, width)
+#-----------------------------------------------------------------------------
+# The binary representations of many indices at once, as an array of
+# strings of the given width.
+#-----------------------------------------------------------------------------
+def bit_strings(indices, width):
+    indices = asarray(indices, dtype=int64)
+    if width == 0:
+        return full(indices.size, '', dtype='<U1')
+    shifts = arange(width - 1, -1, -1, dtype=int64)
+    bits = ((indices[:, None] >> shifts) & 1).astype(uint8) + ord('0')
+    return bits.view('S{}'.format(width)).ravel().astype(str)
+
+#-----------------------------------------------------------------------------
+# Function: top_k(state, k, control_qubits)
+#-----------------------------------------------------------------------------
+# The k most likely basis states, most likely first.  Returns (indices,
+# probabilities).  With control_qubits=1, the indices are data-qubit states.
+#-----------------------------------------------------------------------------
+def top_k(state, k=4, control_qubits=0):
+    return largest(probabilities(state, control_qubits), k)
+
+#-----------------------------------------------------------------------------
+# Function: largest(probability, k)
+#-----------------------------------------------------------------------------
+# As top_k(), but given the probabilities rather than the state.
+#-----------------------------------------------------------------------------
+def largest(probability, k):
+    k = builtins.min(k, probability.size)
+    if k == 0:
+        return zeros(0, dtype=int64), zeros(0)
+    indices = argpartition(probability, probability.size - k)[-k:]
+    indices = indices[argsort(probability[indices], kind='stable')[::-1]]
+    return indices, probability[indices]
+
+#-----------------------------------------------------------------------------
+# Function: most_likely(state, control_qubits)
+#-----------------------------------------------------------------------------
+# The index of the most likely basis state (the first, if there is a tie),
+# as argmax(probabilities(state, control_qubits)), but reading the state
+# SUMMARY_CHUNK amplitudes at a time.
+#-----------------------------------------------------------------------------
+def most_likely(state, control_qubits=0):
+    flat = asarray(state).ravel()
+    group = 2 ** control_qubits
+    best, best_probability = 0, -1.0
+    for start in range(0, flat.size, SUMMARY_CHUNK):
+        probability = probabilities(flat[start:start + SUMMARY_CHUNK],
+                                    control_qubits)
+        index = int(argmax(probability))
+        if probability[index] > best_probability:
+            best = start // group + index
+            best_probability = probability[index]
+    return best
+
+#-----------------------------------------------------------------------------
+# Function: marginals(state, qubit_count)
+#-----------------------------------------------------------------------------
+# For each qubit (the first qubit is the most significant bit), the
+# probability of measuring it as 1.
+#-----------------------------------------------------------------------------
+def marginals(state, qubit_count):
+    return marginals_of(probabilities(state), qubit_count)
+
+#-----------------------------------------------------------------------------
+# Function: marginals_of(probability, qubit_count)
+#-----------------------------------------------------------------------------
+# As marginals(), but given the probabilities rather than the state.
+#-----------------------------------------------------------------------------
+def marginals_of(probability, qubit_count):
+    ones = zeros(qubit_count)
+    add_marginals(ones, probability, 0, qubit_count)
+    return ones
+
+#-----------------------------------------------------------------------------
+# Function: add_marginals(ones, probability, start, qubit_count)
+#-----------------------------------------------------------------------------
+# Add the probabilities of one chunk of basis states, starting at index
+# <start>, to the marginals in <ones>.  The chunk's size must be a power of 2
+# that divides <start>, so that each qubit's bit either stays the same for
+# the whole chunk (the high bits) or alternates in blocks within it.
+#-----------------------------------------------------------------------------
+def add_marginals(ones, probability, start, qubit_count):
+    for qubit in range(qubit_count):
+        block = 2 ** (qubit_count - 1 - qubit)
+        if block >= probability.size:
+            if (start // block) & 1:
+                ones[qubit] += probability.sum()
+        else:
+            ones[qubit] += probability.reshape(-1, 2, block)[:, 1, :].sum()
+
+#-----------------------------------------------------------------------------
+# Function: summary(state, qubit_count, k, control_qubits, control_zero)
+#-----------------------------------------------------------------------------
+# A compact description of a state: its size and norm, the k most likely
+# data-qubit states (with their amplitudes, taking the control qubit as 0),
+# and the marginal probability of each qubit.
+#
+# The state is read SUMMARY_CHUNK amplitudes at a time.  The k most likely
+# states of each chunk are merged with the k most likely so far, and the norm
+# and marginals are added up as we go.
+#-----------------------------------------------------------------------------
+# state: the state vector (an array or a memory map)
+# qubit_count: number of qubits, including any control qubit
+# k: how many of the most likely states to keep
+# control_qubits: 1 if the last qubit is a control qubit, 0 otherwise
+# control_zero: True if <state> holds only the amplitudes with the control
+#               qubit 0 (the others being 0), as the out-of-core backend
+#               returns them; control_qubits must then be 1
+#-----------------------------------------------------------------------------
+def summary(state, qubit_count, k=4, control_qubits=0, control_zero=False):
+    flat = asarray(state).ravel()
+    width = qubit_count - control_qubits
+    group = 1 if control_zero else 2 ** control_qubits
+    total = 0.0
+    ones = zeros(qubit_count)
+    indices = probability = None
+    for start in range(0, flat.size, SUMMARY_CHUNK):
+        every = probabilities(flat[start:start + SUMMARY_CHUNK])
+        total += every.sum()
+        data = every.reshape(-1, group).sum(axis=1) if group > 1 else every
+        if control_zero:
+            # The control qubit is never 1, so its marginal stays 0
+            add_marginals(ones[:width], data, start, width)
+        else:
+            add_marginals(ones, every, start, qubit_count)
+
+        found, found_probability = largest(data, k)
+        found += start // group
+        if indices is None:
+            indices, probability = found, found_probability
+        else:
+            merged, probability = largest(
+                concatenate([probability, found_probability]), k)
+            indices = concatenate([indices, found])[merged]
+    if indices is None:
+        indices, probability = largest(zeros(0), k)
+
+    amplitudes = flat[indices * group]
+    return {'size': int(flat.size) * (2 if control_zero else 1),
+            'qubits': qubit_count,
+            'control_qubits': control_qubits,
+            'norm': float(sqrt(total)),
+            'top': [{'index': int(index),
+                     'bits': bits,
+                     'amplitude': [float(real(amplitude)),
+                                   float(imag(amplitude))],
+                     'probability': float(p)}
+                    for index, bits, amplitude, p in
+                    zip(indices, bit_strings(indices, width), amplitudes,
+                        probability)],
+            'marginals': ones.tolist()}
+
+#-----------------------------------------------------------------------------
+# Function: print_summary(state_summary, file)
+#-----------------------------------------------------------------------------
+# Print the most likely states from summary(), one line each.
+#-----------------------------------------------------------------------------
+def print_summary(state_summary, file=None):
+    file = file or sys.stdout
+    print('Most likely states (of {}):'.format(
+        state_summary['size'] >> state_summary['control_qubits']), file=file)
+    for line in state_summary['top']:
+        amplitude = complex(*line['amplitude'])
+        print('{} : {} (probability {:.6f})'.format(
+            line['bits'], amplitude, line['probability']), file=file)
+
+#-----------------------------------------------------------------------------
+# Function: write_summary(state_summary, path)
+#-----------------------------------------------------------------------------
+# Save a summary as JSON or, if path ends in '.npz', as compressed arrays.
+#-----------------------------------------------------------------------------
+def write_summary(state_summary, path, **extra):
+    if path.endswith('.npz'):
+        top = state_summary['top']
+        savez_compressed(path,
+                         size=state_summary['size'],
+                         qubits=state_summary['qubits'],
+                         control_qubits=state_summary['control_qubits'],
+                         norm=state_summary['norm'],
+                         top_index=array([line['index'] for line in top],
+                                         dtype=int64),
+                         top_amplitude=array([complex(*line['amplitude'])
+                                              for line in top]),
+                         top_probability=array([line['probability']
+                                                for line in top]),
+                         marginals=array(state_summary['marginals']),
+                         **{name: asarray(value)
+                            for name, value in extra.items()})
+    else:
+        with open(path, 'w') as output:
+            json.dump(dict(extra, **state_summary), output, indent=1)
+
+#-----------------------------------------------------------------------------
+# Function: dump_state(state, qubit_count, flagged, file, ket)
+#-----------------------------------------------------------------------------
+# Print every amplitude of a state, a chunk at a time.
+#-----------------------------------------------------------------------------
+# state: the state vector
+# qubit_count: number of qubits (the width of the bit strings)
+# flagged: index to mark with '*****', or None
+# file: where to print (default: standard output)
+# ket: True to print '|0101> amplitude' rather than '0101 : amplitude'
+#-----------------------------------------------------------------------------
+def dump_state(state, qubit_count, flagged=None, file=None, ket=False):
+    file = file or sys.stdout
+    flat = asarray(state).ravel()
+    pattern = '|{}> {}' if ket else '{} : {}'
+    for start in range(0, flat.size, DUMP_CHUNK):
+        stop = builtins.min(start + DUMP_CHUNK, flat.size)
+        indices = arange(start, stop)
+        lines = [pattern.format(bits, value) for bits, value in
+                 zip(bit_strings(indices, qubit_count), flat[start:stop].tolist())]
+        if flagged is not None and start <= flagged < stop:
+            lines[flagged - start] += ' *****'
+        file.write('\n'.join(lines) + '\n')
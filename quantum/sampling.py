@@ -0,0 +1,294 @@
+#############################################################################
+# This module simulates measurement (M in the circuit diagrams): instead of
+# reading the exact amplitudes of the final state, it draws shots, as real
+# hardware would, and counts how often each outcome comes up.
+#
+# The probability of each outcome is |amplitude|^2 (see reporting.py; with
+# marginalise=True the control qubit is added up, so that the outcomes are
+# the data-qubit states).  Shots are then drawn in one of three ways, all
+# vectorised, so that no Python code runs per shot:
+#
+# (1) 'multinomial': the histogram is drawn directly from the multinomial
+#     distribution, without drawing individual shots.  Its cost does not
+#     depend on the number of shots, so this is the default for histograms.
+# (2) 'cdf': draw uniform numbers and find each one in the cumulative
+#     probabilities with searchsorted(): O(log 2^n) per shot.  Shots are
+#     drawn in chunks, so memory does not grow with the number of shots.
+#     Each search jumps around a table of 2^n probabilities, so once there
+#     are more shots than outcomes this is several times slower per shot
+#     than 'alias' (about 6x at 2^20 outcomes); with fewer shots it is the
+#     faster of the two, as it needs no table beyond the cumsum().
+# (3) 'alias': Walker's alias method.  Building the table is O(2^n), then
+#     each shot costs O(1): pick a column uniformly, then either keep it or
+#     take its alias.
+#
+# Every function takes a seed (or a numpy Generator), so runs can be
+# repeated exactly.
+#
+# A state bigger than STATE_CHUNK amplitudes (such as a memory map from the
+# out-of-core backend) is read a chunk at a time: the shots are first shared
+# out among the chunks (a multinomial draw over the chunks' total
+# probabilities), and then each chunk's shots are drawn from its own
+# probabilities.  This gives the same distribution as drawing from the whole
+# state at once, and never holds more than one chunk's probabilities.
+# sparse_histogram() keeps only the outcomes that came up, so its memory
+# depends on the number of shots rather than the size of the state.
+#
+# Usage:
+#
+#   from quantum.sampling import histogram
+#   counts = histogram(current_state, 10**8, seed=1, marginalise=True)
+##############################################################################
+
+from numpy import *
+import builtins
+from .reporting import probabilities
+
+# Number of shots to draw at a time with 'cdf' and 'alias'
+SHOT_CHUNK = 2 ** 22
+
+# Number of amplitudes of the state to read at a time (a power of 2)
+STATE_CHUNK = 2 ** 22
+
+METHODS = ('multinomial', 'cdf', 'alias')
+
+#-----------------------------------------------------------------------------
+# Function: outcome_probabilities(state, marginalise)
+#-----------------------------------------------------------------------------
+# Probabilities of the measurement outcomes, normalised to add up to 1
+# (rounding, or a reduced-precision dtype, can leave them slightly off).
+#-----------------------------------------------------------------------------
+# state: final state, as from run_circuit() or Deutsch-Jozsa circuit()
+# marginalise: True to add up the two outcomes of the control qubit (the
+#              last qubit)
+#-----------------------------------------------------------------------------
+def outcome_probabilities(state, marginalise=False):
+    probability = probabilities(state, 1 if marginalise else 0)
+    return probability / probability.sum()
+
+#-----------------------------------------------------------------------------
+# Function: alias_table(probability)
+#-----------------------------------------------------------------------------
+# Build the tables for Walker's alias method: column i is kept with
+# probability keep[i], and otherwise replaced by alias[i].
+#
+# Scaled by the number of outcomes, each probability is either small (< 1),
+# large (> 1) or exactly 1 (kept every time).  Each small column must be
+# topped up to 1 by a large column, which becomes its alias.  Done one
+# column at a time, we would take the small columns in order, topping each
+# up from the current large column until that large column falls below 1;
+# it then becomes small, and is topped up from the next large column.  Lay
+# the deficits of the small columns end to end, and the surpluses of the
+# large columns end to end:
+#
+# (1) a small column's alias is the large column whose stretch of surplus
+#     contains the start of its stretch of deficit;
+# (2) a large column that runs out (its surplus ends before the deficits
+#     do) keeps 1 less however far the deficit it was topping up runs past
+#     its end, and its alias is the next large column.  The deficit it was
+#     topping up is the one that ends at or after its surplus: one that
+#     starts exactly where its surplus ends is topped up by the next large
+#     column, as in (1).
+#
+# Both are found for every column at once with cumsum() and searchsorted().
+#-----------------------------------------------------------------------------
+def alias_table(probability):
+    size = probability.size
+    scaled = probability * size
+    keep = ones(size)
+    alias = arange(size)
+    small = flatnonzero(scaled < 1)
+    large = flatnonzero(scaled > 1)
+    if small.size == 0 or large.size == 0:
+        return keep, alias
+
+    deficit = cumsum(1 - scaled[small])
+    surplus = cumsum(scaled[large] - 1)
+
+    # (1) Small columns
+    starts = concatenate([[0.0], deficit[:-1]])
+    current = minimum(searchsorted(surplus, starts, side='right'),
+                      large.size - 1)
+    keep[small] = scaled[small]
+    alias[small] = large[current]
+
+    # (2) Large columns that run out (the last one never does, except by
+    # rounding)
+    used = flatnonzero(surplus[:-1] < deficit[-1])
+    crossing = searchsorted(deficit, surplus[used], side='left')
+    keep[large[used]] = 1 - (deficit[crossing] - surplus[used])
+    alias[large[used]] = large[used + 1]
+    return keep, alias
+
+#-----------------------------------------------------------------------------
+# Function: sample(state, shots, seed, method, marginalise)
+#-----------------------------------------------------------------------------
+# Draw individual shots.  Returns an array of <shots> outcomes (indices of
+# basis states, or of data-qubit states with marginalise=True).  With
+# 'multinomial', the counts are drawn first and the shots are then put in a
+# random order, which gives the same distribution as drawing them one by one.
+#-----------------------------------------------------------------------------
+# state: final state
+# shots: number of shots
+# seed: seed or numpy Generator
+# method: 'multinomial', 'cdf' or 'alias' (default)
+# marginalise: as in outcome_probabilities()
+#-----------------------------------------------------------------------------
+def sample(state, shots, seed=None, method='alias', marginalise=False):
+    _check_method(method)
+    generator = random.default_rng(seed)
+    totals = chunk_totals(state, marginalise)
+    if totals.size == 1:
+        chunk_of = zeros(shots, dtype=int64)
+    else:
+        cdf = cumsum(totals / totals.sum())
+        cdf[-1] = 1.0
+        chunk_of = searchsorted(cdf, generator.random(shots), side='right')
+    outcomes = empty(shots, dtype=int64)
+    for rank, (start, chunk) in enumerate(_state_chunks(state, marginalise)):
+        shot_indices = flatnonzero(chunk_of == rank)
+        if shot_indices.size == 0:
+            continue
+        probability = outcome_probabilities(chunk, marginalise)
+        tables = _tables(probability, method)
+        for first, size in _chunks(shot_indices.size):
+            outcomes[shot_indices[first:first + size]] = start + _draw(
+                probability, size, generator, method, tables)
+    return outcomes
+
+#-----------------------------------------------------------------------------
+# Function: histogram(state, shots, seed, method, marginalise)
+#-----------------------------------------------------------------------------
+# Count how many of <shots> shots give each outcome.  Returns an array of
+# counts, one per outcome, adding up to <shots>.
+#-----------------------------------------------------------------------------
+# method: 'multinomial' (default), 'cdf' or 'alias'
+#-----------------------------------------------------------------------------
+def histogram(state, shots, seed=None, method='multinomial',
+              marginalise=False):
+    size = asarray(state).size >> (1 if marginalise else 0)
+    counts = zeros(size, dtype=int64)
+    for start, chunk_counts in _chunk_histograms(state, shots, seed, method,
+                                                 marginalise):
+        counts[start:start + chunk_counts.size] = chunk_counts
+    return counts
+
+#-----------------------------------------------------------------------------
+# Function: sparse_histogram(state, shots, seed, method, marginalise)
+#-----------------------------------------------------------------------------
+# As histogram(), but returns only the outcomes that came up: (outcomes,
+# counts), in order of outcome.  For states too big to hold a count for
+# every outcome.
+#-----------------------------------------------------------------------------
+def sparse_histogram(state, shots, seed=None, method='multinomial',
+                     marginalise=False):
+    outcomes, counts = [zeros(0, dtype=int64)], [zeros(0, dtype=int64)]
+    for start, chunk_counts in _chunk_histograms(state, shots, seed, method,
+                                                 marginalise):
+        found = flatnonzero(chunk_counts)
+        outcomes.append(start + found)
+        counts.append(chunk_counts[found])
+    return concatenate(outcomes), concatenate(counts)
+
+#-----------------------------------------------------------------------------
+# Function: chunk_totals(state, marginalise)
+#-----------------------------------------------------------------------------
+# The total probability of each chunk of STATE_CHUNK amplitudes.
+#-----------------------------------------------------------------------------
+def chunk_totals(state, marginalise=False):
+    return array([probabilities(chunk).sum()
+                  for _, chunk in _state_chunks(state, marginalise)])
+
+#-----------------------------------------------------------------------------
+# Function: _state_chunks(state, marginalise)
+#-----------------------------------------------------------------------------
+# (first outcome, amplitudes) of each chunk of STATE_CHUNK amplitudes.  A
+# chunk of a memory map is only read when it is used.
+#-----------------------------------------------------------------------------
+def _state_chunks(state, marginalise):
+    flat = asarray(state).ravel()
+    for start in range(0, flat.size, STATE_CHUNK):
+        yield (start >> (1 if marginalise else 0),
+               flat[start:start + STATE_CHUNK])
+
+#-----------------------------------------------------------------------------
+# Function: _chunk_histograms(state, shots, seed, method, marginalise)
+#-----------------------------------------------------------------------------
+# (first outcome, counts) for each chunk of the state that gets any shots.
+# The shots are shared out among the chunks first (when there is more than
+# one), and then drawn within each chunk.
+#-----------------------------------------------------------------------------
+def _chunk_histograms(state, shots, seed, method, marginalise):
+    _check_method(method)
+    generator = random.default_rng(seed)
+    totals = chunk_totals(state, marginalise)
+    if totals.size == 1:
+        shares = [shots]
+    else:
+        shares = generator.multinomial(shots, totals / totals.sum())
+    for (start, chunk), share in zip(_state_chunks(state, marginalise),
+                                     shares):
+        if share == 0:
+            continue
+        probability = outcome_probabilities(chunk, marginalise)
+        if method == 'multinomial':
+            yield start, generator.multinomial(share,
+                                               probability).astype(int64)
+            continue
+        tables = _tables(probability, method)
+        counts = zeros(probability.size, dtype=int64)
+        for _, size in _chunks(share):
+            counts += bincount(_draw(probability, size, generator, method,
+                                     tables), minlength=probability.size)
+        yield start, counts
+
+#-----------------------------------------------------------------------------
+# Function: _chunks(shots)
+#-----------------------------------------------------------------------------
+# (start, size) of each chunk of at most SHOT_CHUNK shots.
+#-----------------------------------------------------------------------------
+def _chunks(shots):
+    for start in range(0, shots, SHOT_CHUNK):
+        yield start, builtins.min(SHOT_CHUNK, shots - start)
+
+#-----------------------------------------------------------------------------
+# Function: _check_method(method)
+#-----------------------------------------------------------------------------
+# Refuse a sampling method that is not one of METHODS.
+#-----------------------------------------------------------------------------
+def _check_method(method):
+    if method not in METHODS:
+        raise ValueError("Unknown sampling method: {} (choose from {})".format(
+            method, ', '.join(METHODS)))
+
+#-----------------------------------------------------------------------------
+# Function: _tables(probability, method)
+#-----------------------------------------------------------------------------
+# What _draw() needs: the cumulative probabilities for 'cdf' (the last set to
+# exactly 1, so that every uniform number falls inside), the alias table, or
+# nothing for 'multinomial'.
+#-----------------------------------------------------------------------------
+def _tables(probability, method):
+    if method == 'cdf':
+        cdf = cumsum(probability)
+        cdf[-1] = 1.0
+        return cdf
+    elif method == 'alias':
+        return alias_table(probability)
+    return None
+
+#-----------------------------------------------------------------------------
+# Function: _draw(probability, shots, generator, method, tables)
+#-----------------------------------------------------------------------------
+# Draw one chunk of shots.
+#-----------------------------------------------------------------------------
+def _draw(probability, shots, generator, method, tables):
+    if method == 'multinomial':
+        counts = generator.multinomial(shots, probability)
+        return generator.permutation(repeat(arange(probability.size), counts))
+    if method == 'cdf':
+        return searchsorted(tables, generator.random(shots), side='right')
+    keep, alias = tables
+    columns = generator.integers(0, probability.size, shots)
+    return where(generator.random(shots) < keep[columns], columns,
+                 alias[columns])
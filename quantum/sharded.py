@@ -0,0 +1,211 @@
+#############################################################################
+# This module runs the matrix-free Grover iteration on several cores at once.
+#
+# The state is the 2^n amplitudes of the data qubits, as in
+# run_circuit_matrix_free() in grover.py: Uf flips the sign of the needle's
+# amplitude, and Dif takes each amplitude x to x - 2*mean.  A single process
+# does this on one core.  Here the state lives in shared memory
+# (multiprocessing.shared_memory), split into one contiguous shard per
+# worker, and every worker runs the whole loop on its own shard:
+#
+# (1) the worker holding the needle flips it;
+# (2) each worker adds up its shard, and writes the partial sum into a small
+#     shared array of partial sums, one slot per worker;
+# (3) all the workers wait at a barrier until every partial sum is in;
+# (4) each worker adds up the partial sums itself (in the same order, so they
+#     all get the same mean), and subtracts 2*mean from its shard.
+#
+# That is one barrier per iteration.  The partial sums are double-buffered
+# (iteration i uses row i % 2), so a fast worker writing its next partial sum
+# cannot overwrite one that a slow worker has not read yet: to get to
+# iteration i + 2 it must pass the barrier of iteration i + 1, which every
+# worker reaches only after reading row i % 2.
+#
+# The calling process is worker 0, so workers=1 runs in this process alone.
+#
+# A worker that raises an exception breaks the barrier, so the others stop
+# waiting.  A worker killed outright (by a signal, or the out-of-memory
+# killer) cannot, so every barrier wait gives up after <timeout> seconds, and
+# worker 0 then checks each worker's exit code and raises a RuntimeError
+# naming the workers that failed, rather than waiting for ever.
+#
+# Usage:
+#
+#   from quantum.sharded import run
+#   amplitudes = run(2**26, needle_position, repeat, workers=8)
+##############################################################################
+
+from numpy import *
+import builtins
+import math
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+from . import profiling
+from .precision import real_dtype
+
+# Default number of seconds to wait at a barrier, or for a worker to finish,
+# before giving up on the other workers (an iteration takes well under a
+# second per shard, but starting a worker process can take a few seconds)
+BARRIER_TIMEOUT = 60
+
+#-----------------------------------------------------------------------------
+# Function: shard_bounds(string_length, workers)
+#-----------------------------------------------------------------------------
+# Where each worker's shard starts and stops: workers + 1 indices, with the
+# shards as equal as possible.
+#-----------------------------------------------------------------------------
+def shard_bounds(string_length, workers):
+    return [string_length * rank // workers for rank in range(workers + 1)]
+
+#-----------------------------------------------------------------------------
+# Function: grover_shard(state, partials, barrier, start, stop, rank,
+#                        position, repeat, timeout)
+#-----------------------------------------------------------------------------
+# Run <repeat> Grover iterations on the shard state[start:stop], in step with
+# the other workers (see the steps above).
+#-----------------------------------------------------------------------------
+# state: the whole state, in shared memory
+# partials: (2, workers) array of partial sums, in shared memory
+# barrier: a Barrier for every worker
+# start, stop: this worker's shard
+# rank: this worker's slot in partials
+# position: the needle position
+# repeat: the number of Grover iterations
+# timeout: seconds to wait at the barrier before breaking it
+#-----------------------------------------------------------------------------
+def grover_shard(state, partials, barrier, start, stop, rank, position,
+                 repeat, timeout=BARRIER_TIMEOUT):
+    shard = state[start:stop]
+    for i in range(repeat):
+        row = partials[i % 2]
+        if start <= position < stop:
+            shard[position - start] *= -1
+        row[rank] = shard.sum(dtype=float64)
+        barrier.wait(timeout)
+
+        # math.fsum() adds the partial sums with a single rounding, so
+        # splitting the state adds no error to the mean (see precision.py)
+        mean = math.fsum(row) / state.size
+        shard -= 2 * mean
+
+#-----------------------------------------------------------------------------
+# Function: _worker(names, string_length, dtype, workers, bounds, rank,
+#                   position, repeat, barrier, timeout)
+#-----------------------------------------------------------------------------
+# Entry point of each worker process: attach to the shared memory and run
+# grover_shard().  If anything goes wrong, break the barrier so that the
+# other workers stop waiting.
+#-----------------------------------------------------------------------------
+def _worker(names, string_length, dtype, workers, bounds, rank, position,
+            repeat, barrier, timeout):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        grover_shard(ndarray(string_length, dtype, buffer=blocks[0].buf),
+                     ndarray((2, workers), float64, buffer=blocks[1].buf),
+                     barrier, bounds[rank], bounds[rank + 1], rank, position,
+                     repeat, timeout)
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+
+#-----------------------------------------------------------------------------
+# Function: _check(processes, timeout)
+#-----------------------------------------------------------------------------
+# Wait up to <timeout> seconds for each worker process to finish, and raise a
+# RuntimeError naming every worker that failed (a negative exit code is the
+# signal that killed it) or is still running.
+#-----------------------------------------------------------------------------
+def _check(processes, timeout):
+    failed = []
+    for rank, process in enumerate(processes, 1):
+        process.join(timeout)
+        if process.exitcode is None:
+            failed.append('worker {} did not finish within {} seconds'.format(
+                rank, timeout))
+        elif process.exitcode != 0:
+            failed.append('worker {} failed (exit code {})'.format(
+                rank, process.exitcode))
+    if failed:
+        raise RuntimeError("Sharded run stopped: {}".format(
+            '; '.join(failed)))
+
+#-----------------------------------------------------------------------------
+# Function: run(string_length, position, repeat, workers, dtype, timeout)
+#-----------------------------------------------------------------------------
+# Run <repeat> Grover iterations with the state split across <workers>
+# processes.  Returns the final data amplitudes.
+#-----------------------------------------------------------------------------
+# string_length: 2^n, the number of amplitudes
+# position: the needle position
+# repeat: the number of Grover iterations
+# workers: number of processes, including this one (default: all cores;
+#          never more than string_length)
+# dtype: dtype of the amplitudes (they are real)
+# timeout: seconds to wait at a barrier, or for a worker to finish, before
+#          raising a RuntimeError
+#-----------------------------------------------------------------------------
+def run(string_length, position, repeat, workers=None, dtype='float64',
+        timeout=BARRIER_TIMEOUT):
+    workers = builtins.min(workers or os.cpu_count() or 1, string_length)
+    if workers < 1:
+        raise ValueError("Need at least one worker")
+    kind = real_dtype(dtype)
+    bounds = shard_bounds(string_length, workers)
+
+    state_block = shared_memory.SharedMemory(
+        create=True, size=string_length * kind.itemsize)
+    partials_block = shared_memory.SharedMemory(
+        create=True, size=zeros((2, workers)).nbytes)
+    processes = []
+    state = partials = None
+    try:
+        state = ndarray(string_length, kind, buffer=state_block.buf)
+        partials = ndarray((2, workers), float64, buffer=partials_block.buf)
+
+        # Applying H to Q puts the data qubits into an equal superposition
+        state[...] = 1 / sqrt(string_length)
+
+        barrier = multiprocessing.Barrier(workers)
+        names = (state_block.name, partials_block.name)
+        for rank in range(1, workers):
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(names, string_length, kind.str, workers, bounds, rank,
+                      position, repeat, barrier, timeout),
+                daemon=True)
+            process.start()
+            processes.append(process)
+
+        # This process is worker 0
+        with profiling.stage('iterations', workers=workers, repeat=repeat):
+            try:
+                grover_shard(state, partials, barrier, bounds[0], bounds[1], 0,
+                             position, repeat, timeout)
+            except threading.BrokenBarrierError:
+                # Another worker failed, or never reached the barrier: the
+                # exit codes say which
+                barrier.abort()
+                _check(processes, timeout)
+                raise RuntimeError("Sharded run stopped: a worker did not "
+                                   "reach the barrier within {} seconds".format(
+                                       timeout))
+            except BaseException:
+                barrier.abort()
+                raise
+            _check(processes, timeout)
+        return state.copy()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        # The arrays must go before the shared memory behind them is closed
+        state = partials = None
+        state_block.close()
+        state_block.unlink()
+        partials_block.close()
+        partials_block.unlink()
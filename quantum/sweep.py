@@ -0,0 +1,388 @@
+#############################################################################
+# This module runs parameter sweeps of Grover's Algorithm: for every qubit
+# count in a range, every needle position, and every iteration count around
+# repeat(), it finds the probability that measuring the data qubits gives
+# the needle.  Without it, an accuracy study means running Grover.py over
+# and over.
+#
+# The work is split into jobs, one per (qubit count, needle position,
+# method), which are spread over a pool of worker processes.  A job runs the
+# Grover iteration once, up to the largest iteration count wanted, and
+# records the success probability after each of the iteration counts on the
+# way; so a sweep over k = repeat()-2 .. repeat()+2 costs no more than
+# running to repeat()+2.
+#
+# Methods are the backends of grover.circuit():
+#
+# (1) 'dense': Dif is a (2^(n+1) x 2^(n+1)) matrix that depends only on the
+#     qubit count, the same for every job of that size.  Rather than have
+#     each worker build it (or pickle it to every worker), the parent builds
+#     it once, copies it into shared memory (multiprocessing.shared_memory),
+#     and the workers use it in place.  Uf only swaps the two basis states of
+#     the needle, so each job applies it directly.
+# (2) 'sparse': the sparse operators are small, so each worker builds Dif
+#     and the start state once per qubit count with circuit_sparse(), and
+#     keeps them in its operator cache (see sparse_operators()).  As with
+#     'dense', a job builds only its own Uf.
+# (3) 'matrix-free' and 'analytic': no operators at all.
+#
+# The control qubit does not affect the success probability, so the final
+# IxH and IxX are skipped.
+#
+# Usage:
+#
+#   python -m quantum.sweep --max-qubits 6 --spread 2 --method matrix-free
+#
+#   from quantum.sweep import sweep, summarise
+#   rows = sweep(range(1, 7), spread=2, methods=['dense'])
+##############################################################################
+
+from numpy import *
+import argparse
+import builtins
+import csv
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from . import grover
+from .gates import sparse_permutation
+from .operator_cache import cached_operator
+
+METHODS = ('dense', 'sparse', 'matrix-free', 'analytic')
+
+# Shared operators, as attached in each worker by _attach(): qubit count ->
+# {'Dif': array, 'start': array}.  The SharedMemory objects are kept too, so
+# the arrays stay valid.
+_shared = {}
+
+#-----------------------------------------------------------------------------
+# Function: iteration_counts(required_qubits, spread)
+#-----------------------------------------------------------------------------
+# The iteration counts to try for a qubit count: repeat() and <spread> either
+# side of it (never fewer than 0).
+#-----------------------------------------------------------------------------
+def iteration_counts(required_qubits, spread):
+    middle = grover.repeat(required_qubits)
+    return list(range(builtins.max(middle - spread, 0), middle + spread + 1))
+
+#-----------------------------------------------------------------------------
+# Function: make_jobs(qubit_counts, spread, methods, positions)
+#-----------------------------------------------------------------------------
+# One job per (qubit count, needle position, method).  Each job is a tuple
+# (required_qubits, position, method, iteration counts).
+#-----------------------------------------------------------------------------
+# qubit_counts: iterable of data-qubit counts (string length 2^n)
+# spread: how many iteration counts either side of repeat() to try
+# methods: iterable of methods from METHODS
+# positions: None for every needle position, or an int to try at most that
+#            many positions, evenly spaced
+#-----------------------------------------------------------------------------
+def make_jobs(qubit_counts, spread=2, methods=('matrix-free',), positions=None):
+    jobs = []
+    for required_qubits in qubit_counts:
+        length = 2 ** required_qubits
+        if positions is None or positions >= length:
+            needles = range(length)
+        else:
+            needles = unique(linspace(0, length - 1, positions).astype(int))
+        counts = iteration_counts(required_qubits, spread)
+        for method in methods:
+            for position in needles:
+                jobs.append((required_qubits, int(position), method, counts))
+    return jobs
+
+#-----------------------------------------------------------------------------
+# Function: share_operators(qubit_counts)
+#-----------------------------------------------------------------------------
+# Build the dense operators shared by every job of each qubit count, and copy
+# them into shared memory.  Returns (descriptors, blocks): the descriptors
+# (name, shape, dtype for each array) are all that is sent to the workers;
+# the blocks must be released (see release_operators()) by the caller when
+# the sweep ends.  If building any of them fails (a MemoryError for a large
+# qubit count, say), the blocks already made are released before the error
+# is raised, so none is left behind in shared memory.
+#
+# The operators shared are Dif and the state H*Q that every run begins with.
+#-----------------------------------------------------------------------------
+def share_operators(qubit_counts):
+    descriptors = {}
+    blocks = []
+    try:
+        for required_qubits in qubit_counts:
+            input, needle = grover.needle_init(
+                '1' + '0' * (2**required_qubits - 1))
+            gates = grover.circuit(input, needle, 'dense')
+            arrays = {'Dif': gates['Dif'].full(),
+                      'start': (gates['H'] * gates['Q']).full()}
+            descriptors[required_qubits] = {}
+            for name, value in arrays.items():
+                block = shared_memory.SharedMemory(create=True,
+                                                   size=value.nbytes)
+                blocks.append(block)
+                ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+                descriptors[required_qubits][name] = (block.name, value.shape,
+                                                      value.dtype.str)
+    except BaseException:
+        release_operators(blocks)
+        raise
+    return descriptors, blocks
+
+#-----------------------------------------------------------------------------
+# Function: release_operators(blocks)
+#-----------------------------------------------------------------------------
+# Close and unlink the shared memory blocks from share_operators().
+#-----------------------------------------------------------------------------
+def release_operators(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+#-----------------------------------------------------------------------------
+# Function: _attach(descriptors)
+#-----------------------------------------------------------------------------
+# Pool initializer: map the shared operators into this worker.
+#-----------------------------------------------------------------------------
+def _attach(descriptors):
+    for required_qubits, arrays in descriptors.items():
+        _shared[required_qubits] = {}
+        for name, (block_name, shape, dtype) in arrays.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            value = ndarray(shape, dtype, buffer=block.buf)
+            value.flags.writeable = False
+            _shared[required_qubits][name] = value
+            _shared[required_qubits]['_' + name] = block
+
+#-----------------------------------------------------------------------------
+# Function: _detach()
+#-----------------------------------------------------------------------------
+# Undo _attach(): drop the arrays, then close the shared memory behind them.
+#-----------------------------------------------------------------------------
+def _detach():
+    for arrays in _shared.values():
+        blocks = [arrays.pop(name) for name in list(arrays)
+                  if name.startswith('_')]
+        arrays.clear()
+        for block in blocks:
+            block.close()
+    _shared.clear()
+
+#-----------------------------------------------------------------------------
+# Function: needle_probability(state, position, oracle)
+#-----------------------------------------------------------------------------
+# Probability of measuring the needle on the data qubits: with a control
+# qubit, that is the two basis states of the needle (control 0 and 1).
+#-----------------------------------------------------------------------------
+def needle_probability(state, position, oracle='control'):
+    state = state.ravel()
+    if oracle == 'phase':
+        return float(abs(state[position]) ** 2)
+    return float(abs(state[2*position]) ** 2 + abs(state[2*position + 1]) ** 2)
+
+#-----------------------------------------------------------------------------
+# Function: sparse_operators(required_qubits)
+#-----------------------------------------------------------------------------
+# The sparse operators shared by every job of a qubit count: (Dif, start),
+# where Dif is the list of factors from circuit_sparse() and start is the
+# state H*Q.  Built once per worker, and kept in its operator cache.
+#-----------------------------------------------------------------------------
+def sparse_operators(required_qubits):
+    def build():
+        input, needle = grover.needle_init('1' + '0' * (2**required_qubits - 1))
+        gates = grover.circuit(input, needle, 'sparse')
+        return (gates['Dif'], grover.apply_operators(gates['H'], gates['Q']))
+    return cached_operator(required_qubits, 'sweep/sparse', 'complex128', build)
+
+#-----------------------------------------------------------------------------
+# Function: run_job(job)
+#-----------------------------------------------------------------------------
+# Run one job, and return one row per iteration count: a dictionary with
+# required_qubits, position, method, iterations and probability.
+#-----------------------------------------------------------------------------
+def run_job(job):
+    required_qubits, position, method, counts = job
+    probabilities = {}
+    wanted = set(counts)
+    last = builtins.max(counts)
+
+    if method == 'analytic':
+        gates = {'required_qubits': required_qubits, 'position': position}
+        for k in counts:
+            probabilities[k] = float(grover.run_analytic(gates, k)['probability'])
+
+    elif method == 'matrix-free':
+        string_length = 2 ** required_qubits
+        amplitudes = full(string_length, 1 / sqrt(string_length))
+        for k in range(last + 1):
+            if k in wanted:
+                probabilities[k] = float(amplitudes[position] ** 2)
+            if k == last:
+                break
+            amplitudes[position] *= -1
+            amplitudes -= 2 * amplitudes.mean()
+
+    elif method == 'dense':
+        # Uf swaps the needle's two basis states; Dif comes from shared
+        # memory (see share_operators()).
+        Dif = _shared[required_qubits]['Dif']
+        state = _shared[required_qubits]['start'].copy()
+        for k in range(last + 1):
+            if k in wanted:
+                probabilities[k] = needle_probability(state, position)
+            if k == last:
+                break
+            state[[2*position, 2*position + 1]] = state[[2*position + 1,
+                                                         2*position]]
+            state = Dif @ state
+
+    elif method == 'sparse':
+        # Dif and the start state come from the operator cache; Uf is the
+        # permutation that swaps the needle's two basis states.
+        Dif, state = sparse_operators(required_qubits)
+        targets = arange(2 ** (required_qubits + 1))
+        targets[[2*position, 2*position + 1]] = [2*position + 1, 2*position]
+        Uf = sparse_permutation(targets)
+        for k in range(last + 1):
+            if k in wanted:
+                probabilities[k] = needle_probability(state, position)
+            if k == last:
+                break
+            state = grover.apply_operators([Uf] + Dif, state)
+
+    else:
+        raise ValueError("Unknown method: {}".format(method))
+
+    return [{'required_qubits': required_qubits,
+             'position': position,
+             'method': method,
+             'iterations': k,
+             'probability': probabilities[k]} for k in counts]
+
+#-----------------------------------------------------------------------------
+# Function: sweep(qubit_counts, spread, methods, positions, workers,
+#                 chunk_size)
+#-----------------------------------------------------------------------------
+# Run every job over a pool of worker processes, and return all the rows
+# (see run_job()), ordered by qubit count, method, position and iterations.
+#-----------------------------------------------------------------------------
+# workers: number of worker processes (default: all cores); 0 runs every job
+#          in this process
+# chunk_size: jobs sent to a worker at a time (default: spread the jobs
+#             evenly, four chunks per worker)
+#-----------------------------------------------------------------------------
+def sweep(qubit_counts, spread=2, methods=('matrix-free',), positions=None,
+          workers=None, chunk_size=None):
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError("Unknown method: {}".format(method))
+    qubit_counts = list(qubit_counts)
+    jobs = make_jobs(qubit_counts, spread, methods, positions)
+    if workers is None:
+        workers = os.cpu_count()
+
+    descriptors, blocks = {}, []
+    try:
+        if 'dense' in methods:
+            descriptors, blocks = share_operators(qubit_counts)
+        if workers == 0:
+            _attach(descriptors)
+            try:
+                chunks = [run_job(job) for job in jobs]
+            finally:
+                _detach()
+        else:
+            if chunk_size is None:
+                chunk_size = builtins.max(1, len(jobs) // (workers * 4))
+            with multiprocessing.Pool(workers, _attach, (descriptors,)) as pool:
+                chunks = list(pool.imap_unordered(run_job, jobs, chunk_size))
+    finally:
+        release_operators(blocks)
+
+    rows = [row for chunk in chunks for row in chunk]
+    rows.sort(key=lambda row: (row['required_qubits'], row['method'],
+                               row['position'], row['iterations']))
+    return rows
+
+#-----------------------------------------------------------------------------
+# Function: summarise(rows)
+#-----------------------------------------------------------------------------
+# Aggregate the rows over needle positions: one row per (qubit count,
+# method, iterations) with the number of positions and the mean, minimum
+# and maximum success probability.
+#-----------------------------------------------------------------------------
+def summarise(rows):
+    groups = {}
+    for row in rows:
+        key = (row['required_qubits'], row['method'], row['iterations'])
+        groups.setdefault(key, []).append(row['probability'])
+    table = []
+    for (required_qubits, method, iterations), values in sorted(groups.items()):
+        values = array(values)
+        table.append({'required_qubits': required_qubits,
+                      'method': method,
+                      'iterations': iterations,
+                      'optimal': iterations == grover.repeat(required_qubits),
+                      'positions': values.size,
+                      'mean': float(values.mean()),
+                      'min': float(values.min()),
+                      'max': float(values.max())})
+    return table
+
+#-----------------------------------------------------------------------------
+# Function: write_csv(rows, path)
+#-----------------------------------------------------------------------------
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as output:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+#-----------------------------------------------------------------------------
+# Function: main(arguments)
+#-----------------------------------------------------------------------------
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep Grover's Algorithm over sizes, needles and "
+                    "iteration counts")
+    parser.add_argument('--min-qubits', type=int, default=1)
+    parser.add_argument('--max-qubits', type=int, default=6)
+    parser.add_argument('--spread', type=int, default=2,
+                        help='iteration counts either side of repeat() '
+                             '(default: 2)')
+    parser.add_argument('--method', choices=METHODS, action='append',
+                        help='method to sweep (may be repeated; default: '
+                             'matrix-free)')
+    parser.add_argument('--positions', type=int,
+                        help='needle positions per size (default: all)')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--output', metavar='FILE',
+                        help='write every row to FILE as CSV')
+    parser.add_argument('--summary', metavar='FILE',
+                        help='write the summary table to FILE as CSV')
+    arguments = parser.parse_args(arguments)
+
+    start_time = time.perf_counter()
+    rows = sweep(range(arguments.min_qubits, arguments.max_qubits + 1),
+                 arguments.spread, arguments.method or ['matrix-free'],
+                 arguments.positions, arguments.workers)
+    seconds = time.perf_counter() - start_time
+    table = summarise(rows)
+
+    print('{:>6} {:<12} {:>10} {:>9} {:>9} {:>9} {:>9}'.format(
+        'qubits', 'method', 'iterations', 'positions', 'mean', 'min', 'max'))
+    for row in table:
+        print('{:>6} {:<12} {:>9}{} {:>9} {:>9.6f} {:>9.6f} {:>9.6f}'.format(
+            row['required_qubits'], row['method'], row['iterations'],
+            '*' if row['optimal'] else ' ', row['positions'], row['mean'],
+            row['min'], row['max']))
+    print('* = repeat()')
+    print('{} runs in {:.3f} seconds'.format(len(rows), seconds))
+
+    if arguments.output:
+        write_csv(rows, arguments.output)
+    if arguments.summary:
+        write_csv(table, arguments.summary)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#############################################################################
+# Tests that every backend ends in the same state as the dense circuit: for
+# Grover.py, the sparse, matrix-free, analytic and gate-level backends, each
+# with the control-qubit and phase oracles; for Deutsch-Jozsa.py, the sparse,
+# Walsh-Hadamard and gate-level backends; and the shared gate library
+# (gates.py) against QuTiP's tensor().
+#
+# With the phase oracle there is no control qubit.  The control qubit of the
+# dense circuit ends in |1> (Grover) or |-> (Deutsch-Jozsa), so the phase
+# oracle's state is every other amplitude of the dense one (times sqrt(2)
+# for Deutsch-Jozsa, whose |-> spreads each over two).
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import deutsch_jozsa, gates, grover
+
+# (required qubits, needle position): the first, last and a middle position
+NEEDLES = [(1, 0), (1, 1), (2, 3), (3, 5), (4, 0), (5, 17), (5, 31)]
+
+# Construction methods each backend can build
+GROVER_BACKENDS = [
+    ('sparse', 'control', 'uf1', 'dif1'),
+    ('sparse', 'control', 'uf2', 'dif1'),
+    ('sparse', 'phase', 'uf1', 'dif1'),
+    ('sparse', 'phase', 'uf2', 'dif1'),
+    ('matrix-free', 'control', 'uf1', 'dif1'),
+    ('matrix-free', 'phase', 'uf1', 'dif1'),
+    ('analytic', 'control', 'uf1', 'dif1'),
+    ('analytic', 'phase', 'uf1', 'dif1'),
+    ('gates', 'control', 'uf1', 'dif1'),
+    ('gates', 'control', 'uf2', 'dif1'),
+    ('gates', 'phase', 'uf1', 'dif1'),
+    ('dense', 'control', 'uf2', 'dif2'),
+    ('dense', 'phase', 'uf1', 'dif1'),
+    ('dense', 'phase', 'uf1', 'dif2'),
+    ('dense', 'phase', 'uf2', 'dif1'),
+]
+
+#-----------------------------------------------------------------------------
+# Function: needle_string(required_qubits, position)
+#-----------------------------------------------------------------------------
+def needle_string(required_qubits, position):
+    string_length = 2 ** required_qubits
+    return '0' * position + '1' + '0' * (string_length - position - 1)
+
+#-----------------------------------------------------------------------------
+# Function: dense_reference(required_qubits, position, iterations)
+#-----------------------------------------------------------------------------
+def dense_reference(required_qubits, position, iterations):
+    input, needle = grover.needle_init(needle_string(required_qubits,
+                                                     position))
+    return grover.run_circuit(grover.circuit(input, needle, 'dense'),
+                              iterations)
+
+@pytest.mark.parametrize('backend, oracle, uf, dif', GROVER_BACKENDS)
+@pytest.mark.parametrize('required_qubits, position', NEEDLES)
+def test_grover_backend_matches_dense(backend, oracle, uf, dif,
+                                      required_qubits, position):
+    input, needle = grover.needle_init(needle_string(required_qubits,
+                                                     position))
+    for iterations in (0, 1, grover.repeat(required_qubits)):
+        reference = dense_reference(required_qubits, position, iterations)
+        if oracle == 'phase':
+            reference = reference[0::2]
+        if dif == 'dif2':
+            # dif2() builds -I + 2A, which is -1 times dif1()'s circuit (a
+            # global phase, so every probability is the same)
+            reference = reference * (-1) ** iterations
+        current_state = grover.run_circuit(
+            grover.circuit(input, needle, backend, oracle, uf, dif),
+            iterations)
+        assert asarray(current_state).shape == reference.shape
+        assert allclose(current_state, reference, atol=1e-12)
+
+@pytest.mark.parametrize('oracle', ['control', 'phase'])
+def test_grover_sparse_only_builds_dif1(oracle):
+    input, needle = grover.needle_init(needle_string(2, 1))
+    with pytest.raises(ValueError, match='dif1'):
+        grover.circuit(input, needle, 'sparse', oracle, dif='dif2')
+
+@pytest.mark.parametrize('required_qubits, position', NEEDLES)
+def test_grover_fused_matches_dense(required_qubits, position):
+    input, needle = grover.needle_init(needle_string(required_qubits,
+                                                     position))
+    for iterations in (0, 1, grover.repeat(required_qubits), 7):
+        reference = dense_reference(required_qubits, position, iterations)
+        current_state = grover.run_circuit(
+            grover.circuit(input, needle, 'dense', fuse=True), iterations)
+        assert allclose(current_state, reference, atol=1e-12)
+
+#-----------------------------------------------------------------------------
+# Function: deutsch_jozsa_strings()
+#-----------------------------------------------------------------------------
+# Constant and balanced strings of 2 to 32 characters.
+#-----------------------------------------------------------------------------
+def deutsch_jozsa_strings():
+    generator = random.default_rng(5)
+    strings = []
+    for required_qubits in range(1, 6):
+        string_length = 2 ** required_qubits
+        strings += ['0' * string_length, '1' * string_length,
+                    ''.join(generator.permutation(
+                        list('0' * (string_length // 2) +
+                             '1' * (string_length // 2))))]
+    return strings
+
+@pytest.mark.parametrize('backend', ['sparse', 'wht', 'gates'])
+@pytest.mark.parametrize('input_string', deutsch_jozsa_strings())
+def test_deutsch_jozsa_backend_matches_dense(backend, input_string):
+    reference = asarray(deutsch_jozsa.circuit(input_string)['result'])
+    result = asarray(deutsch_jozsa.circuit(input_string, backend)['result'])
+    assert allclose(result, reference, atol=1e-12)
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse', 'wht', 'gates'])
+@pytest.mark.parametrize('input_string', deutsch_jozsa_strings())
+def test_deutsch_jozsa_phase_matches_dense(backend, input_string):
+    reference = asarray(deutsch_jozsa.circuit(input_string)['result'])
+    result = asarray(deutsch_jozsa.circuit(input_string, backend,
+                                           'phase')['result'])
+    assert allclose(result, reference[0::2] * sqrt(2), atol=1e-12)
+
+#-----------------------------------------------------------------------------
+# Function: tensor_of(names)
+#-----------------------------------------------------------------------------
+# The operator built one tensor() at a time, as the scripts used to.
+#-----------------------------------------------------------------------------
+def tensor_of(names):
+    from qutip import tensor
+    return tensor([gates.single_gate(name) for name in names]).full()
+
+@pytest.mark.parametrize('qubit_count', [1, 2, 3, 5])
+def test_gate_library_matches_tensor(qubit_count):
+    for name in ('H', 'X', 'I'):
+        assert allclose(gates.uniform_layer(name, qubit_count).full(),
+                        tensor_of([name] * qubit_count))
+    for name, last in (('H', 'I'), ('I', 'X'), ('X', 'H')):
+        assert allclose(gates.all_but_last(name, last, qubit_count).full(),
+                        tensor_of([name] * (qubit_count - 1) + [last]))
+    for mask in range(2 ** qubit_count):
+        names = ['X' if mask >> (qubit_count - 1 - qubit) & 1 else 'I'
+                 for qubit in range(qubit_count)]
+        assert allclose(gates.flip_layer(mask, qubit_count).full(),
+                        tensor_of(names))
+
+@pytest.mark.parametrize('qubit_count', [1, 2, 4])
+def test_sparse_layer_matches_tensor(qubit_count):
+    for skip_last in (False, True):
+        combined = identity(2 ** qubit_count)
+        for factor in gates.sparse_layer(gates.GATE_H, qubit_count,
+                                         skip_last):
+            combined = factor @ combined
+        names = ['H'] * qubit_count
+        if skip_last:
+            names[-1] = 'I'
+        assert allclose(combined, tensor_of(names))
+    assert allclose(gates.sparse_tensor([gates.GATE_X, gates.GATE_H,
+                                         gates.GATE_I]).toarray(),
+                    tensor_of(['X', 'H', 'I']))
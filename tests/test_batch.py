@@ -0,0 +1,59 @@
+#############################################################################
+# Tests for batched Grover searches (run_batch() and grover_batch() in
+# grover.py): every search in a batch ends in the same state as the same
+# search run on its own, in the same dtype, and finds its needle; and each
+# iteration is a profiling stage.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import grover, profiling
+
+# (One qubit is left out: with two positions, Grover's search cannot tell
+# the needle from the haystack)
+@pytest.mark.parametrize('required_qubits', [2, 3, 5])
+def test_batch_matches_single_runs(required_qubits):
+    string_length = 2 ** required_qubits
+    positions = [0, string_length // 3, string_length - 1]
+    searches = grover.grover_batch(positions, required_qubits)
+    assert len(searches) == len(positions)
+    for position, search in zip(positions, searches):
+        single = grover.run_circuit(grover.circuit(search['input'],
+                                                   search['needle']),
+                                    search['repeat'])
+        assert search['repeat'] == grover.repeat(required_qubits)
+        assert allclose(search['current_state'], single, atol=1e-12)
+        assert search['result'] == position
+
+def test_batch_takes_strings_and_positions():
+    searches = grover.grover_batch(['00100000', 6])
+    assert [search['result'] for search in searches] == [2, 6]
+
+def test_batch_needs_one_length():
+    with pytest.raises(ValueError):
+        grover.grover_batch(['0010', '00000100'])
+
+@pytest.mark.parametrize('dtype', ['float32', 'complex64', 'float64'])
+def test_batch_keeps_the_dtype(dtype):
+    positions = [1, 4, 6]
+    searches = grover.grover_batch(positions, 3, dtype=dtype)
+    for position, search in zip(positions, searches):
+        single = grover.run_circuit(grover.circuit(search['input'],
+                                                   search['needle'],
+                                                   'matrix-free', dtype=dtype),
+                                    search['repeat'])
+        assert search['current_state'].dtype == single.dtype
+        # The column means add up in another order, so round differently
+        assert allclose(search['current_state'], single,
+                        atol=10 * finfo(dtype).eps)
+        assert search['result'] == position
+
+def test_batch_iterations_are_profiled():
+    profiling.enable(memory=False)
+    try:
+        searches = grover.grover_batch([0, 5, 9], 4)
+    finally:
+        profiling.disable()
+    iterations = [event['iteration'] for event in profiling.trace()['events']
+                  if event['name'] == 'iteration']
+    assert iterations == list(range(searches[0]['repeat']))
@@ -0,0 +1,59 @@
+#############################################################################
+# Smoke test for the benchmark suite (benchmarks/bench_circuits.py): a sweep
+# at one and two qubits writes results in the documented JSON layout, a run
+# compared against itself finds no regressions, and a baseline that used
+# less memory is reported as one.
+##############################################################################
+
+from numpy import *
+import json
+from benchmarks import bench_circuits
+
+def test_sweep_and_baseline(tmp_path, capsys):
+    baseline_path = str(tmp_path / 'baseline.json')
+    arguments = ['--min-qubits', '1', '--max-qubits', '2', '--repeats', '1',
+                 '--seed', '3']
+    assert bench_circuits.main(arguments + ['--output', baseline_path]) == 0
+    with open(baseline_path) as input:
+        baseline = json.load(input)
+
+    assert set(baseline) == {'environment', 'seed', 'repeats', 'results'}
+    assert set(baseline['environment']) == {'python', 'numpy', 'machine',
+                                            'platform', 'date'}
+    assert baseline['seed'] == 3
+    assert baseline['repeats'] == 1
+    for record in baseline['results']:
+        assert set(record) == {'script', 'method', 'qubits', 'pattern',
+                               'stage', 'seconds', 'peak_bytes'}
+        assert record['qubits'] in (1, 2)
+        assert record['seconds'] >= 0
+        assert record['peak_bytes'] >= 0
+    methods = {(record['script'], record['method'])
+               for record in baseline['results']}
+    assert len(methods) == (len(bench_circuits.GROVER_METHODS) +
+                            len(bench_circuits.DEUTSCH_JOZSA_METHODS))
+
+    # The same inputs again (the seed fixes them), with room for noise
+    output_path = str(tmp_path / 'new.json')
+    loose = ['--time-tolerance', '1000', '--memory-tolerance', '1000']
+    assert bench_circuits.main(arguments + loose +
+                               ['--output', output_path,
+                                '--baseline', baseline_path]) == 0
+    with open(output_path) as input:
+        keys = [bench_circuits.record_key(record)
+                for record in json.load(input)['results']]
+    assert keys == [bench_circuits.record_key(record)
+                    for record in baseline['results']]
+    assert 'No regressions' in capsys.readouterr().out
+
+    # A baseline that allocated (almost) nothing makes every stage that
+    # allocates a memory regression
+    for record in baseline['results']:
+        record['peak_bytes'] = 1
+    with open(baseline_path, 'w') as output:
+        json.dump(baseline, output)
+    assert bench_circuits.main(arguments + ['--output', output_path,
+                                            '--baseline', baseline_path,
+                                            '--time-tolerance', '1000',
+                                            '--min-bytes', '0']) == 1
+    assert 'Regression (memory)' in capsys.readouterr().out
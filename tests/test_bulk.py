@@ -0,0 +1,67 @@
+#############################################################################
+# Tests for bulk Deutsch-Jozsa classification (classify_bulk() in
+# deutsch_jozsa.py): a known file, as text and as bit-packed records, gives
+# the expected code for every string, and strings the algorithm does not
+# apply to are flagged rather than guessed.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import deutsch_jozsa
+from quantum.deutsch_jozsa import CONSTANT, BALANCED, INVALID
+
+# Strings of 8 characters, and their codes
+STRINGS = ['00000000', '11111111', '01010101', '00001111', '10010110',
+           '00000001', '11111110', '01110111']
+CODES = [CONSTANT, CONSTANT, BALANCED, BALANCED, BALANCED,
+         INVALID, INVALID, INVALID]
+
+def test_text_file(tmp_path):
+    path = tmp_path / 'inputs.txt'
+    # Blank lines are skipped; the other lines are classified in order
+    path.write_text('\n'.join(STRINGS[:4]) + '\n\n' +
+                    '\n'.join(STRINGS[4:] + ['012', '000', '0', '0110']) +
+                    '\n')
+    output = str(tmp_path / 'results.npy')
+    stats = deutsch_jozsa.classify_bulk(str(path), output, workers=1,
+                                        chunk_size=3)
+    codes = load(output)
+    assert codes.tolist() == CODES + [INVALID, INVALID, INVALID, BALANCED]
+    assert stats['strings'] == 12
+    assert stats['constant'] == 2
+    assert stats['balanced'] == 4
+    assert stats['invalid'] == 6
+
+def test_packed_file(tmp_path):
+    path = tmp_path / 'inputs.bin'
+    records = array([[int(bit) for bit in string] for string in STRINGS],
+                    dtype=uint8)
+    packbits(records, axis=1).tofile(str(path))
+    output = str(tmp_path / 'results.npy')
+    stats = deutsch_jozsa.classify_bulk(str(path), output, length=8,
+                                        workers=1, chunk_size=3)
+    assert load(output).tolist() == CODES
+    assert stats['invalid'] == 3
+
+def test_packed_records_padded_to_bytes(tmp_path):
+    # 4-bit records take a byte each
+    path = tmp_path / 'inputs.bin'
+    packbits(array([[0, 0, 0, 0], [0, 1, 1, 0], [1, 0, 0, 0]], dtype=uint8),
+             axis=1).tofile(str(path))
+    output = str(tmp_path / 'results.npy')
+    deutsch_jozsa.classify_bulk(str(path), output, length=4, workers=1)
+    assert load(output).tolist() == [CONSTANT, BALANCED, INVALID]
+
+def test_partial_record_is_refused(tmp_path):
+    path = tmp_path / 'inputs.bin'
+    path.write_bytes(bytes(5))
+    with pytest.raises(ValueError, match='partial record'):
+        deutsch_jozsa.classify_bulk(str(path), str(tmp_path / 'out.npy'),
+                                    length=16, workers=1)
+
+def test_record_length_must_be_a_power_of_two(tmp_path):
+    path = tmp_path / 'inputs.bin'
+    path.write_bytes(bytes(6))
+    with pytest.raises(ValueError, match='power of 2'):
+        deutsch_jozsa.classify_bulk(str(path), str(tmp_path / 'out.npy'),
+                                    length=12, workers=1)
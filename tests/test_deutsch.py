@@ -0,0 +1,46 @@
+#############################################################################
+# Tests for classifying Deutsch's functions in bulk (classify() in
+# deutsch.py): each of the four encodings gets the classification its
+# circuit gives, arrays of any shape are classified at once, and encodings
+# that are not 0 to 3, or not integers, are refused (as circuit() refuses
+# input strings other than the four functions).
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import deutsch
+from quantum.deutsch import CONSTANT, BALANCED
+
+def test_each_encoding():
+    # '00' and '11' are constant, '01' and '10' balanced
+    assert deutsch.classify([0, 1, 2, 3]).tolist() == [CONSTANT, BALANCED,
+                                                       BALANCED, CONSTANT]
+
+def test_matches_the_circuits():
+    for input_string in ('00', '01', '10', '11'):
+        state = deutsch.circuit(input_string)['result'].full()
+        balanced = abs(state[2, 0]) ** 2 + abs(state[3, 0]) ** 2 > 0.5
+        assert deutsch.classify(int(input_string, 2)) == \
+            (BALANCED if balanced else CONSTANT)
+
+def test_array_shapes():
+    encodings = random.default_rng(2).integers(0, 4, (3, 5), dtype=uint8)
+    classifications = deutsch.classify(encodings)
+    assert classifications.shape == (3, 5)
+    assert array_equal(classifications, (encodings == 1) | (encodings == 2))
+    assert deutsch.classify([]).shape == (0,)
+
+@pytest.mark.parametrize('encodings', [[4], [-1], [0, 7]])
+def test_out_of_range(encodings):
+    with pytest.raises(ValueError, match='between 0 and 3'):
+        deutsch.classify(encodings)
+
+@pytest.mark.parametrize('encodings', [[1.5], [True], ['1'], [1.0]])
+def test_not_integers(encodings):
+    with pytest.raises(ValueError, match='integers'):
+        deutsch.classify(encodings)
+
+@pytest.mark.parametrize('input_string', ['', '0', '012', '111', 3])
+def test_circuit_refuses_other_strings(input_string):
+    with pytest.raises(ValueError, match='Input string error'):
+        deutsch.circuit(input_string)
@@ -0,0 +1,74 @@
+#############################################################################
+# Tests for the on-disk cache (quantum/disk_cache.py): several processes
+# storing at once keep the cache within its budget and never leave a
+# partial file behind, and temporary files left by a writer that died are
+# counted and then evicted.
+##############################################################################
+
+from numpy import *
+import multiprocessing
+import os
+import time
+from quantum import disk_cache
+
+WRITERS = 4
+STORES = 12
+SIZE = 1024
+
+#-----------------------------------------------------------------------------
+# Function: write(directory, max_bytes, writer)
+#-----------------------------------------------------------------------------
+# Store STORES arrays from one process.  Each array is filled with its own
+# number, so a file that was only partly written, or mixed up with another,
+# would not match.
+#-----------------------------------------------------------------------------
+def write(directory, max_bytes, writer):
+    disk_cache.configure(directory, max_bytes)
+    for store in range(STORES):
+        number = writer * STORES + store
+        disk_cache.store(str(number), full(SIZE, number, dtype=float64))
+
+def test_concurrent_writers_stay_within_budget(tmp_path):
+    directory = str(tmp_path)
+    max_bytes = 5 * (SIZE * 8 + 128)
+    processes = [multiprocessing.Process(target=write,
+                                         args=(directory, max_bytes, writer))
+                 for writer in range(WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    disk_cache.configure(directory, max_bytes)
+    try:
+        stats = disk_cache.cache_stats()
+        assert 0 < stats['files'] <= 5
+        assert stats['bytes'] <= max_bytes
+        assert stats['temporary_files'] == 0
+        for name in os.listdir(directory):
+            if name.endswith('.npy'):
+                number = int(name[:-len('.npy')])
+                assert array_equal(disk_cache.load(str(number)),
+                                   full(SIZE, number, dtype=float64))
+    finally:
+        disk_cache.configure(None)
+
+def test_stale_temporary_files_are_counted_and_evicted(tmp_path):
+    stale = tmp_path / 'stale.tmp'
+    stale.write_bytes(b'x' * 100)
+    old = time.time() - disk_cache.STALE_SECONDS - 1
+    os.utime(stale, (old, old))
+    fresh = tmp_path / 'fresh.tmp'
+    fresh.write_bytes(b'x' * 10)
+
+    disk_cache.configure(str(tmp_path))
+    try:
+        # configure() evicts, so only the file still being written is left
+        assert not stale.exists()
+        assert fresh.exists()
+        stats = disk_cache.cache_stats()
+        assert stats['temporary_files'] == 1
+        assert stats['temporary_bytes'] == 10
+    finally:
+        disk_cache.configure(None)
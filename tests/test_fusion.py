@@ -0,0 +1,54 @@
+#############################################################################
+# Tests for the fused Grover iterate (fuse_iterate(), iterate_power() and
+# run_circuit_fused() in grover.py): G^k built by repeated squaring is the
+# same as applying G k times, and a fused run ends in the same state as
+# Uf/Dif applied step by step, for large k as well as small.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import grover
+
+#-----------------------------------------------------------------------------
+# Function: fused_circuit(required_qubits, position, backend, oracle)
+#-----------------------------------------------------------------------------
+def fused_circuit(required_qubits, position, backend, oracle='control'):
+    string_length = 2 ** required_qubits
+    input, needle = grover.needle_init('0' * position + '1' +
+                                       '0' * (string_length - position - 1))
+    return input, needle, grover.circuit(input, needle, backend, oracle,
+                                         fuse=True)
+
+def test_squares_are_powers():
+    _, _, gates = fused_circuit(3, 5, 'dense')
+    G = asarray(gates['G'])
+    for bit in range(6):
+        assert allclose(grover.iterate_power(gates, bit),
+                        linalg.matrix_power(G, 2 ** bit), atol=1e-12)
+
+def test_powers_match_repeated_steps():
+    _, _, gates = fused_circuit(3, 2, 'dense')
+    G = asarray(gates['G'])
+    state = random.default_rng(0).standard_normal(G.shape[0])
+    stepped = state.copy()
+    for k in range(40):
+        fused = state.copy()
+        for bit in range(k.bit_length()):
+            if (k >> bit) & 1:
+                fused = grover.iterate_power(gates, bit) @ fused
+        assert allclose(fused, stepped, atol=1e-10), k
+        stepped = G @ stepped
+
+@pytest.mark.parametrize('oracle', ['control', 'phase'])
+def test_fused_run_matches_unfused(oracle):
+    input, needle, gates = fused_circuit(4, 11, 'dense', oracle)
+    unfused = grover.circuit(input, needle, 'dense', oracle)
+    for iterations in (0, 1, 2, 3, 12, 100, 257):
+        assert allclose(grover.run_circuit(gates, iterations),
+                        grover.run_circuit(unfused, iterations), atol=1e-10)
+
+@pytest.mark.parametrize('oracle', ['control', 'phase'])
+def test_sparse_does_not_fuse(oracle):
+    input, needle = grover.needle_init('00010000')
+    with pytest.raises(ValueError, match='dense'):
+        grover.circuit(input, needle, 'sparse', oracle, fuse=True)
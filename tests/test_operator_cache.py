@@ -0,0 +1,172 @@
+#############################################################################
+# Tests for the operator cache (quantum/operator_cache.py): operators are
+# kept under (qubits, method, dtype) within a byte budget, the least
+# recently used go first when it is full, and the counters add up; and a
+# second circuit at the same size builds only its oracle.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import grover, operator_cache
+
+SIZE = 128
+
+#-----------------------------------------------------------------------------
+# Function: fresh_cache()
+#-----------------------------------------------------------------------------
+# Start each test with an empty cache and the default budget, and leave it
+# that way for the rest of the suite.
+#-----------------------------------------------------------------------------
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    operator_cache.configure()
+    operator_cache.cache_clear()
+    yield
+    operator_cache.configure()
+    operator_cache.cache_clear()
+
+#-----------------------------------------------------------------------------
+# Function: builder(number, built)
+#-----------------------------------------------------------------------------
+# A build function for an array of SIZE float64s filled with <number>, that
+# appends <number> to <built> each time it runs.
+#-----------------------------------------------------------------------------
+def builder(number, built):
+    def build():
+        built.append(number)
+        return full(SIZE, number, dtype=float64)
+    return build
+
+def test_key_is_qubits_method_and_dtype():
+    built = []
+    first = operator_cache.cached_operator(3, 'H', 'float64',
+                                           builder(1, built))
+    assert operator_cache.cached_operator(3, 'H', 'float64',
+                                          builder(2, built)) is first
+    operator_cache.cached_operator(4, 'H', 'float64', builder(3, built))
+    operator_cache.cached_operator(3, 'Dif', 'float64', builder(4, built))
+    operator_cache.cached_operator(3, 'H', 'float32', builder(5, built))
+    assert built == [1, 3, 4, 5]
+
+def test_counters():
+    built = []
+    for number in [0, 1, 0, 0, 2, 1]:
+        operator_cache.cached_operator(1, str(number), 'float64',
+                                       builder(number, built))
+    stats = operator_cache.cache_stats()
+    assert stats['hits'] == 3
+    assert stats['misses'] == len(built) == 3
+    assert stats['evictions'] == 0
+    assert stats['entries'] == 3
+    assert stats['bytes'] == 3 * SIZE * 8
+    assert stats['max_bytes'] == operator_cache.DEFAULT_MAX_BYTES
+
+def test_least_recently_used_is_evicted_first():
+    operator_cache.configure(3 * SIZE * 8)
+    built = []
+    for number in [0, 1, 2]:
+        operator_cache.cached_operator(1, str(number), 'float64',
+                                       builder(number, built))
+    # Using 0 again makes 1 the least recently used
+    operator_cache.cached_operator(1, '0', 'float64', builder(0, built))
+    operator_cache.cached_operator(1, '3', 'float64', builder(3, built))
+    stats = operator_cache.cache_stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 3
+    assert stats['bytes'] == 3 * SIZE * 8
+
+    del built[:]
+    for number in [0, 2, 3, 1]:
+        operator_cache.cached_operator(1, str(number), 'float64',
+                                       builder(number, built))
+    assert built == [1]
+
+def test_budget_is_kept():
+    operator_cache.configure(SIZE * 8 - 1)
+    built = []
+    for _ in range(2):
+        operator_cache.cached_operator(1, 'big', 'float64', builder(0, built))
+    # Too big for the budget: built each time and never kept
+    assert built == [0, 0]
+    stats = operator_cache.cache_stats()
+    assert stats['entries'] == 0
+    assert stats['bytes'] == 0
+
+def test_configure_evicts_down_to_the_new_budget():
+    built = []
+    for number in range(4):
+        operator_cache.cached_operator(1, str(number), 'float64',
+                                       builder(number, built))
+    operator_cache.configure(2 * SIZE * 8)
+    stats = operator_cache.cache_stats()
+    assert stats['evictions'] == 2
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= stats['max_bytes'] == 2 * SIZE * 8
+
+    # A budget of 0 turns caching off
+    operator_cache.configure(0)
+    assert operator_cache.cache_stats()['entries'] == 0
+    operator_cache.cached_operator(1, '0', 'float64', builder(0, built))
+    assert operator_cache.cache_stats()['entries'] == 0
+
+def test_cache_clear_keeps_the_budget():
+    operator_cache.configure(5 * SIZE * 8)
+    operator_cache.cached_operator(1, '0', 'float64', builder(0, []))
+    operator_cache.cached_operator(1, '0', 'float64', builder(0, []))
+    operator_cache.cache_clear()
+    assert operator_cache.cache_stats() == {'hits': 0,
+                                            'misses': 0,
+                                            'evictions': 0,
+                                            'bytes': 0,
+                                            'max_bytes': 5 * SIZE * 8,
+                                            'entries': 0}
+
+def test_second_circuit_builds_only_uf():
+    first_input, first_needle = grover.needle_init('00100000')
+    first = grover.circuit(first_input, first_needle, 'sparse')
+    stats = operator_cache.cache_stats()
+    assert stats['hits'] == 0
+    assert stats['misses'] == stats['entries'] == 5
+
+    # Same size, another needle: everything but Uf comes from the cache
+    input, needle = grover.needle_init('00000010')
+    second = grover.circuit(input, needle, 'sparse')
+    stats = operator_cache.cache_stats()
+    assert stats['hits'] == 5
+    assert stats['misses'] == 5
+    for name in ['Q', 'H', 'Dif', 'IxH', 'IxX']:
+        assert second[name] is first[name]
+    assert second['Uf'] is not first['Uf']
+    assert (second['Uf'] != first['Uf']).nnz > 0
+
+def test_small_budget_evicts_the_least_recently_used_operator():
+    input, needle = grover.needle_init('00100000')
+    gates = grover.circuit(input, needle, 'sparse')
+    stats = operator_cache.cache_stats()
+
+    # One byte short: Q, the first operator built, is the one to go
+    operator_cache.configure(stats['bytes'] - 1)
+    stats = operator_cache.cache_stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 4
+    assert stats['bytes'] == sum([operator_cache.operator_bytes(gates[name])
+                                  for name in ['H', 'Dif', 'IxH', 'IxX']])
+
+    built = []
+    assert operator_cache.cached_operator(
+        3, 'sparse/H', 'float64', builder(0, built)) is gates['H']
+    operator_cache.cached_operator(3, 'sparse/Q', 'complex128',
+                                   builder(1, built))
+    assert built == [1]
+
+def test_dense_oracle_is_not_cached():
+    input, needle = grover.needle_init('00100000')
+    grover.circuit(input, needle, 'dense')
+    entries = operator_cache.cache_stats()['entries']
+    for position in range(8):
+        input, needle = grover.needle_init('0' * position + '1' +
+                                           '0' * (7 - position))
+        grover.circuit(input, needle, 'dense')
+    stats = operator_cache.cache_stats()
+    assert stats['entries'] == entries
+    assert stats['evictions'] == 0
@@ -0,0 +1,80 @@
+#############################################################################
+# Tests for the out-of-core backend (quantum/out_of_core.py): a run that is
+# interrupted part way through resumes from its last checkpoint and ends in
+# the same state as a run that was never interrupted, and the final state is
+# returned on disk rather than expanded in memory.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import grover, out_of_core
+
+class Interrupted(Exception):
+    pass
+
+#-----------------------------------------------------------------------------
+# Function: interrupt_after(iterations)
+#-----------------------------------------------------------------------------
+# A log() for out_of_core.run() that stops the run once <iterations>
+# iterations have been checkpointed.
+#-----------------------------------------------------------------------------
+def interrupt_after(iterations):
+    def log(iteration):
+        if iteration == iterations:
+            raise Interrupted()
+    return log
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    string_length, position, repeat = 2 ** 10, 345, 25
+    with pytest.raises(Interrupted):
+        out_of_core.run(str(tmp_path), string_length, position, repeat,
+                        chunk=100, log=interrupt_after(7))
+    assert out_of_core.read_checkpoint(str(tmp_path))['iteration'] == 7
+
+    resumed = []
+    amplitudes = out_of_core.run(str(tmp_path), string_length, position,
+                                 repeat, chunk=100, log=resumed.append)
+    assert resumed == list(range(8, repeat + 1))
+
+    input, needle = grover.needle_init('0' * position + '1' +
+                                       '0' * (string_length - position - 1))
+    reference = grover.run_circuit(grover.circuit(input, needle,
+                                                  'matrix-free'), repeat)
+    assert allclose(amplitudes, reference[0::2, 0].real, atol=1e-12)
+
+def test_other_problem_starts_again(tmp_path):
+    out_of_core.run(str(tmp_path), 2 ** 6, 3, 2)
+    amplitudes = out_of_core.run(str(tmp_path), 2 ** 6, 4, 2)
+    assert argmax(abs(amplitudes)) == 4
+
+def test_final_state_stays_on_disk():
+    input, needle = grover.needle_init('0' * 9 + '1' + '0' * 6)
+    gates = grover.circuit(input, needle, 'out-of-core')
+    current_state = grover.run_circuit(gates, grover.repeat(4))
+    assert isinstance(current_state, memmap)
+    assert current_state.shape == (16,)
+    assert grover.most_likely(current_state) == 9
+
+def test_default_storage_is_unique():
+    input, needle = grover.needle_init('0010')
+    first = grover.circuit(input, needle, 'out-of-core')
+    second = grover.circuit(input, needle, 'out-of-core')
+    assert first['storage'] != second['storage']
+    grover.run_circuit(first, 1)
+    grover.run_circuit(second, 1)
+
+def test_chunked_summary_matches_expanded_state(monkeypatch):
+    input, needle = grover.needle_init('0' * 21 + '1' + '0' * 42)
+    current_state = grover.run_circuit(grover.circuit(input, needle,
+                                                      'out-of-core'), 2)
+    expanded = grover.expand_state(current_state)
+    whole = grover.summary(expanded, 7, 4, 1)
+    monkeypatch.setattr('quantum.reporting.SUMMARY_CHUNK', 8)
+    chunked = grover.summary(current_state, 7, 4, 1, control_zero=True)
+    assert chunked['size'] == whole['size']
+    # The other positions tie, so only the needle's place is certain
+    assert chunked['top'][0]['index'] == whole['top'][0]['index'] == 21
+    assert allclose([line['probability'] for line in chunked['top']],
+                    [line['probability'] for line in whole['top']])
+    assert allclose(chunked['marginals'], whole['marginals'])
+    assert isclose(chunked['norm'], whole['norm'])
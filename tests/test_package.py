@@ -0,0 +1,63 @@
+#############################################################################
+# Tests for the package as a whole: no module that star-imports NumPy calls
+# the min() or max() that NumPy 2 puts in its place, and importing the
+# package or its scripts does not import QuTiP or SciPy.
+##############################################################################
+
+import ast
+import glob
+import os
+import subprocess
+import sys
+import pytest
+
+PACKAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'quantum')
+
+#-----------------------------------------------------------------------------
+# Function: star_numpy_modules()
+#-----------------------------------------------------------------------------
+# The modules in the package that do 'from numpy import *', as (path, parsed
+# module) pairs.
+#-----------------------------------------------------------------------------
+def star_numpy_modules():
+    modules = []
+    for path in sorted(glob.glob(os.path.join(PACKAGE, '*.py'))):
+        with open(path) as source:
+            tree = ast.parse(source.read(), path)
+        if any(isinstance(node, ast.ImportFrom) and node.module == 'numpy' and
+               any(alias.name == '*' for alias in node.names)
+               for node in tree.body):
+            modules.append((path, tree))
+    return modules
+
+def test_modules_are_found():
+    names = [os.path.basename(path) for path, _ in star_numpy_modules()]
+    assert 'grover.py' in names
+    assert 'sampling.py' in names
+
+@pytest.mark.parametrize('path, tree', star_numpy_modules(),
+                         ids=[os.path.basename(path)
+                              for path, _ in star_numpy_modules()])
+def test_no_bare_min_or_max(path, tree):
+    # From NumPy 2, 'from numpy import *' brings in numpy.min and numpy.max,
+    # which take an array and an axis, not several numbers: min(a, b) is
+    # then min(array, axis=b).  Use builtins.min() and builtins.max().
+    calls = ['{}:{}'.format(os.path.basename(path), node.lineno)
+             for node in ast.walk(tree)
+             if isinstance(node, ast.Call) and
+             isinstance(node.func, ast.Name) and
+             node.func.id in ('min', 'max')]
+    assert calls == []
+
+@pytest.mark.parametrize('module', ['quantum', 'quantum.deutsch',
+                                    'quantum.deutsch_jozsa',
+                                    'quantum.grover'])
+def test_import_is_lazy(module):
+    # In a fresh interpreter, since this one has imported both already
+    code = ("import {}, sys; "
+            "assert 'qutip' not in sys.modules, 'qutip'; "
+            "assert 'scipy' not in sys.modules, 'scipy'".format(module))
+    result = subprocess.run([sys.executable, '-c', code],
+                            cwd=os.path.dirname(PACKAGE),
+                            stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stderr
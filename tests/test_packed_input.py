@@ -0,0 +1,33 @@
+#############################################################################
+# Tests for bit-packed input (packed_input.py): a packed file reads back as
+# the string it was packed from, a chunk at a time, and Grover finds the
+# same needle in it as in the string.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import grover, packed_input
+
+# 45 bits, so the last chunk (and the last byte) is only partly filled
+STRING = '0' * 37 + '1' + '0' * 7
+
+@pytest.mark.parametrize('chunk_bits', [8, 16, packed_input.CHUNK_BITS])
+def test_iter_bits_matches_string(tmp_path, chunk_bits):
+    path = str(tmp_path / 'input.bin')
+    packed_input.pack_string(STRING, path)
+    source = packed_input.open_packed(path, len(STRING))
+    for input in (STRING, source):
+        bits = concatenate([chunk for start, chunk in
+                            packed_input.iter_bits(input, chunk_bits)])
+        assert ''.join('1' if bit else '0' for bit in bits) == STRING
+
+def test_grover_finds_the_packed_needle(tmp_path):
+    path = str(tmp_path / 'input.bin')
+    string = '0' * 20 + '1' + '0' * 11
+    packed_input.pack_string(string, path)
+    input, needle = grover.needle_init(packed_input.open_packed(path))
+    assert input['string_length'] == len(string)
+    assert needle['position'] == 20
+    state = grover.run_circuit(grover.circuit(input, needle, 'matrix-free'),
+                               grover.repeat(input['required_qubits']))
+    assert argmax(abs(state)) // 2 == 20
@@ -0,0 +1,100 @@
+#############################################################################
+# Tests for the planner (planner.py): a backend that fits its budget is
+# kept, one that does not is downgraded to the fastest plan that fits, a
+# budget nothing fits is refused before anything is allocated, and options
+# that cannot run together are refused.
+##############################################################################
+
+import pytest
+from quantum import grover, planner
+
+MiB = 2 ** 20
+GiB = 2 ** 30
+
+@pytest.fixture(autouse=True)
+def plenty_of_disk(monkeypatch):
+    # So that out-of-core plans depend only on the budgets given here
+    monkeypatch.setattr(planner, 'free_disk', lambda directory: 1024 * GiB)
+
+def test_backend_that_fits_is_kept():
+    chosen = planner.plan(8, 12, 1 * GiB, backend='dense')
+    assert chosen['backend'] == 'dense'
+    assert chosen['downgraded_from'] is None
+    assert chosen['bytes'] <= 1 * GiB
+
+def test_backend_over_budget_is_downgraded():
+    budget = 256 * MiB
+    assert planner.estimate('dense', 12, 50)['bytes'] > budget
+    chosen = planner.plan(12, 50, budget, backend='dense')
+    assert chosen['downgraded_from'] == 'dense'
+    assert chosen['backend'] != 'dense'
+    assert chosen['bytes'] <= budget
+    assert chosen['rejected'] > 0
+
+def test_auto_picks_the_fastest_plan_that_fits():
+    budget = 64 * MiB
+    chosen = planner.plan(16, 201, budget, backend='auto')
+    fitting = [planner.estimate(backend, 16, 201, uf=uf, dif=dif)
+               for backend, uf, dif in planner.PLANS]
+    fitting = [estimated for estimated in fitting
+               if estimated['bytes'] <= budget]
+    assert chosen['seconds'] == min(estimated['seconds']
+                                    for estimated in fitting)
+    assert chosen['downgraded_from'] is None
+
+def test_auto_never_picks_analytic():
+    for required_qubits in (2, 10, 20, 30):
+        chosen = planner.plan(required_qubits, 10, 64 * GiB, backend='auto')
+        assert chosen['backend'] != 'analytic'
+    assert planner.plan(20, 10, 64 * GiB,
+                        backend='analytic')['backend'] == 'analytic'
+
+def test_state_too_big_for_memory_goes_out_of_core():
+    chosen = planner.plan(30, 25, 1 * GiB, backend='auto')
+    assert chosen['backend'] == 'out-of-core'
+    assert chosen['bytes'] <= 1 * GiB
+    assert chosen['disk_bytes'] > 1 * GiB
+
+def test_nothing_fits():
+    with pytest.raises(MemoryError, match='No plan for 10 qubits fits'):
+        planner.plan(10, 25, 1024, backend='dense')
+
+def test_out_of_core_needs_the_disk(monkeypatch):
+    monkeypatch.setattr(planner, 'free_disk', lambda directory: 1 * GiB)
+    with pytest.raises(MemoryError):
+        planner.plan(30, 25, 1 * GiB, backend='auto')
+
+def test_iterations_change_the_estimate():
+    few = planner.plan(12, 1, 64 * GiB, backend='sparse')
+    many = planner.plan(12, 1000, 64 * GiB, backend='sparse')
+    assert many['seconds'] > few['seconds']
+
+def test_dense_needs_complex128():
+    with pytest.raises(ValueError, match='complex128'):
+        planner.plan(4, 3, 1 * GiB, dtype='float32', backend='dense')
+    chosen = planner.plan(4, 3, 1 * GiB, dtype='float32', backend='auto')
+    assert chosen['backend'] != 'dense'
+
+def test_only_dense_fuses():
+    for backend in ['sparse', 'matrix-free']:
+        with pytest.raises(ValueError, match='fuse'):
+            planner.plan(4, 3, 1 * GiB, backend=backend, fuse=True)
+    assert planner.plan(4, 3, 1 * GiB, backend='dense', fuse=True)['fuse']
+
+def test_fusing_adds_to_the_unfused_cost():
+    # G is built from the unfused Uf and Dif, so those are still paid for
+    unfused = planner.estimate('dense', 6, 1)
+    fused = planner.estimate('dense', 6, 1, fuse=True)
+    assert fused['seconds'] > unfused['seconds']
+    assert fused['bytes'] > unfused['bytes']
+
+def test_budget_check_counts_the_iterations_run():
+    # Fused, each bit of the iteration count adds a square of G
+    input, needle = grover.needle_init('0' * 5 + '1' + '0' * 10)
+    few = planner.estimate('dense', 4, grover.repeat(4), fuse=True)['bytes']
+    many = planner.estimate('dense', 4, 2 ** 40, fuse=True)['bytes']
+    budget = (few + many) // 2
+    grover.circuit(input, needle, 'dense', fuse=True, memory_budget=budget)
+    with pytest.raises(MemoryError):
+        grover.circuit(input, needle, 'dense', fuse=True,
+                       memory_budget=budget, iterations=2 ** 40)
@@ -0,0 +1,59 @@
+#############################################################################
+# Tests for reduced-precision dtypes (precision.py): for every dtype and
+# every backend that can run in it, the measured error of the final state
+# against a complex128 run stays within the a priori bound, error_bound().
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import deutsch_jozsa, grover
+from quantum.precision import error_bound, measured_error
+
+DTYPES = ['float32', 'complex64', 'float64']
+
+# Grover backends, and the bound each is checked against (as in
+# precision_results())
+GROVER_METHODS = [('matrix-free', 'matrix-free'), ('analytic', 'matrix-free'),
+                  ('sparse', 'sparse'), ('gates', 'sparse')]
+
+@pytest.mark.parametrize('dtype', DTYPES)
+@pytest.mark.parametrize('backend, method', GROVER_METHODS)
+@pytest.mark.parametrize('oracle', ['control', 'phase'])
+@pytest.mark.parametrize('required_qubits', [2, 5, 8])
+def test_grover_error_within_bound(dtype, backend, method, oracle,
+                                   required_qubits):
+    string_length = 2 ** required_qubits
+    position = string_length // 3
+    input, needle = grover.needle_init('0' * position + '1' +
+                                       '0' * (string_length - position - 1))
+    iterations = grover.repeat(required_qubits)
+    current_state = grover.run_circuit(
+        grover.circuit(input, needle, backend, oracle, dtype=dtype),
+        iterations)
+    reference = grover.run_circuit(
+        grover.circuit(input, needle, backend, oracle, dtype='complex128'),
+        iterations)
+    error = measured_error(current_state, reference)
+    assert error['norm'] <= error_bound(dtype, required_qubits, iterations,
+                                        method)
+
+@pytest.mark.parametrize('dtype', DTYPES)
+@pytest.mark.parametrize('backend', ['sparse', 'wht', 'gates'])
+@pytest.mark.parametrize('oracle', ['control', 'phase'])
+@pytest.mark.parametrize('required_qubits', [1, 4, 8])
+def test_deutsch_jozsa_error_within_bound(dtype, backend, oracle,
+                                          required_qubits):
+    string_length = 2 ** required_qubits
+    input_string = ''.join(random.default_rng(required_qubits).permutation(
+        list('0' * (string_length // 2) + '1' * (string_length // 2))))
+    result = deutsch_jozsa.circuit(input_string, backend, oracle,
+                                   dtype=dtype)['result']
+    reference = deutsch_jozsa.circuit(input_string, backend, oracle,
+                                      dtype='complex128')['result']
+    error = measured_error(result, reference)
+    assert error['norm'] <= error_bound(dtype, required_qubits, 0,
+                                        'deutsch-jozsa')
+
+def test_bound_grows_with_iterations_and_shrinks_with_precision():
+    assert error_bound('float32', 10, 25) > error_bound('float32', 10, 1)
+    assert error_bound('float64', 10, 25) < error_bound('float32', 10, 25)
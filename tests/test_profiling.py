@@ -0,0 +1,89 @@
+#############################################################################
+# Tests for profiling (quantum/profiling.py): stage() does nothing until
+# profiling is enabled, a traced run of Grover.py records each part and each
+# iteration and writes them as JSON, and a tracemalloc session that was
+# already running is left running.
+##############################################################################
+
+from numpy import *
+import json
+import tracemalloc
+import pytest
+from quantum import grover, profiling
+
+#-----------------------------------------------------------------------------
+# Function: profiling_off()
+#-----------------------------------------------------------------------------
+# Leave profiling (and tracemalloc) off for the rest of the suite.
+#-----------------------------------------------------------------------------
+@pytest.fixture(autouse=True)
+def profiling_off():
+    yield
+    profiling.disable()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def test_stage_does_nothing_when_disabled():
+    profiling.enable()
+    profiling.disable()
+    before = profiling.trace()
+    with profiling.stage('part_one', iteration=0) as event:
+        assert event is None
+    assert profiling.trace() == before
+    assert not profiling.enabled()
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse', 'matrix-free',
+                                     'gates'])
+def test_each_part_and_iteration_is_recorded(backend, tmp_path, capsys):
+    path = str(tmp_path / 'trace.json')
+    grover.main(['--backend', backend, '--trace', path, '--trace-memory'])
+    with open(path) as input:
+        trace = json.load(input)
+
+    parts = ['part_one', 'part_two', 'part_three', 'part_four']
+    assert [event['name'] for event in trace['events']
+            if event['depth'] == 0] == parts
+    iterations = [event for event in trace['events']
+                  if event['name'] == 'iteration']
+    assert [event['iteration'] for event in iterations] == \
+        list(range(trace['repeat']))
+    assert all(event['depth'] == 1 for event in iterations)
+    for name in parts:
+        assert trace['summary'][name]['count'] == 1
+    assert all('peak_bytes' in event for event in trace['events'])
+    assert trace['backend'] == backend
+    assert trace['repeat'] == grover.repeat(trace['required_qubits'])
+
+def test_trace_round_trips(tmp_path):
+    profiling.enable(memory=False)
+    with profiling.stage('outer', size=4):
+        for i in range(3):
+            with profiling.stage('inner', iteration=i):
+                pass
+    profiling.disable()
+
+    path = str(tmp_path / 'trace.json')
+    profiling.write_trace(path, required_qubits=4)
+    with open(path) as input:
+        written = json.load(input)
+    assert written == dict(profiling.trace(), required_qubits=4)
+    assert written['summary']['inner']['count'] == 3
+    assert written['summary']['outer']['count'] == 1
+    assert [event['name'] for event in written['events']] == \
+        ['outer', 'inner', 'inner', 'inner']
+
+def test_running_tracemalloc_session_survives():
+    tracemalloc.start()
+    profiling.enable(memory=True)
+    with profiling.stage('allocate'):
+        block = zeros(2 ** 16)
+    profiling.disable()
+    assert tracemalloc.is_tracing()
+    assert profiling.trace()['events'][0]['peak_bytes'] >= block.nbytes
+
+    # and one that profiling started is stopped again
+    tracemalloc.stop()
+    profiling.enable(memory=True)
+    assert tracemalloc.is_tracing()
+    profiling.disable()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,76 @@
+#############################################################################
+# Tests for streaming result reporting (reporting.py): top_k(), summary()
+# and most_likely() agree with sorting every probability, whether the state
+# is read whole or a chunk at a time.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import reporting
+
+#-----------------------------------------------------------------------------
+# Function: random_state(qubit_count, seed)
+#-----------------------------------------------------------------------------
+# A normalised complex state whose probabilities are all different.
+#-----------------------------------------------------------------------------
+def random_state(qubit_count, seed):
+    generator = random.default_rng(seed)
+    state = (generator.standard_normal(2 ** qubit_count) +
+             1j * generator.standard_normal(2 ** qubit_count))
+    return state / linalg.norm(state)
+
+#-----------------------------------------------------------------------------
+# Function: brute_force(state, control_qubits)
+#-----------------------------------------------------------------------------
+# The probability of each (data-qubit) state, one at a time, and the
+# indices in order of falling probability.
+#-----------------------------------------------------------------------------
+def brute_force(state, control_qubits):
+    group = 2 ** control_qubits
+    probability = [sum([abs(amplitude) ** 2
+                        for amplitude in state[index * group:
+                                               (index + 1) * group]])
+                   for index in range(state.size // group)]
+    order = sorted(range(len(probability)), key=lambda index:
+                   -probability[index])
+    return array(probability), order
+
+@pytest.mark.parametrize('control_qubits', [0, 1])
+@pytest.mark.parametrize('k', [1, 4, 64, 100])
+def test_top_k(control_qubits, k):
+    state = random_state(6, k)
+    probability, order = brute_force(state, control_qubits)
+    indices, top = reporting.top_k(state, k, control_qubits)
+    assert indices.tolist() == order[:k]
+    assert allclose(top, probability[order[:k]])
+
+@pytest.mark.parametrize('control_qubits', [0, 1])
+@pytest.mark.parametrize('chunk', [8, 2 ** 22])
+def test_summary(monkeypatch, control_qubits, chunk):
+    monkeypatch.setattr(reporting, 'SUMMARY_CHUNK', chunk)
+    qubit_count, k = 7, 5
+    state = random_state(qubit_count, 1)
+    probability, order = brute_force(state, control_qubits)
+    state_summary = reporting.summary(state, qubit_count, k, control_qubits)
+
+    assert state_summary['size'] == state.size
+    assert isclose(state_summary['norm'], 1)
+    width = qubit_count - control_qubits
+    group = 2 ** control_qubits
+    for line, index in zip(state_summary['top'], order[:k]):
+        assert line['index'] == index
+        assert line['bits'] == format(index, '0{}b'.format(width))
+        assert isclose(line['probability'], probability[index])
+        assert allclose(line['amplitude'], [state[index * group].real,
+                                            state[index * group].imag])
+    marginals = [sum([abs(state[index]) ** 2 for index in range(state.size)
+                      if index >> (qubit_count - 1 - qubit) & 1])
+                 for qubit in range(qubit_count)]
+    assert allclose(state_summary['marginals'], marginals)
+
+def test_most_likely_takes_the_first_of_a_tie(monkeypatch):
+    monkeypatch.setattr(reporting, 'SUMMARY_CHUNK', 4)
+    state = zeros(16)
+    state[[5, 9, 13]] = sqrt(1 / 3)
+    assert reporting.most_likely(state) == 5
+    assert reporting.most_likely(state, 1) == 2
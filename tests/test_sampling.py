@@ -0,0 +1,85 @@
+#############################################################################
+# Tests for measurement (quantum/sampling.py): the alias table reproduces
+# every probability exactly, every method draws the same distribution, as a
+# histogram or as shots, and the method asked for is the one used.
+##############################################################################
+
+from numpy import *
+import pytest
+from quantum import sampling
+
+#-----------------------------------------------------------------------------
+# Function: alias_probabilities(keep, alias)
+#-----------------------------------------------------------------------------
+# The probability of each outcome under an alias table: column i gives i
+# with probability keep[i], and alias[i] otherwise; each column is picked
+# with probability 1/size.
+#-----------------------------------------------------------------------------
+def alias_probabilities(keep, alias):
+    size = keep.size
+    return (keep + bincount(alias, weights=1 - keep, minlength=size)) / size
+
+@pytest.mark.parametrize('probability', [
+    ones(8) / 8,
+    eye(1, 16, 5).ravel(),
+    array([0.5, 0.25, 0.125, 0.125, 0.0, 0.0, 0.0, 0.0]),
+    array([0.1, 0.0, 0.7, 0.05, 0.05, 0.0, 0.1]),
+    array([0.25, 0.125, 0.0625, 0.0625, 0.25, 0.125, 0.0, 0.125]),
+])
+def test_alias_table_is_exact(probability):
+    keep, alias = sampling.alias_table(probability)
+    assert ((keep >= 0) & (keep <= 1 + 1e-12)).all()
+    assert allclose(alias_probabilities(keep, alias), probability,
+                    rtol=0, atol=1e-12)
+
+def test_alias_table_is_exact_for_random_probabilities():
+    generator = random.default_rng(7)
+    for size in (2, 3, 100, 2 ** 12):
+        for probability in (generator.random(size) ** 4,
+                            # Small whole numbers give probabilities that
+                            # scale to exactly 1, and deficits and
+                            # surpluses that end together
+                            generator.integers(1, 4, size) *
+                            generator.integers(0, 2, size)):
+            if probability.sum() == 0:
+                continue
+            probability = probability / probability.sum()
+            keep, alias = sampling.alias_table(probability)
+            assert allclose(alias_probabilities(keep, alias), probability,
+                            rtol=0, atol=1e-12)
+
+def test_every_method_draws_the_same_distribution():
+    state = sqrt(array([0.5, 0.25, 0.125, 0.125]))
+    shots = 10 ** 5
+    for method in sampling.METHODS:
+        counts = sampling.histogram(state, shots, seed=3, method=method)
+        assert counts.sum() == shots
+        assert allclose(counts / shots, state ** 2, atol=0.01)
+
+@pytest.mark.parametrize('method', sampling.METHODS)
+def test_every_method_samples_shots(method):
+    state = sqrt(array([0.5, 0.25, 0.125, 0.125]))
+    shots = 10 ** 5
+    outcomes = sampling.sample(state, shots, seed=3, method=method)
+    assert outcomes.size == shots
+    assert allclose(bincount(outcomes, minlength=4) / shots, state ** 2,
+                    atol=0.01)
+    # The shots come in a random order, not sorted by outcome
+    assert (diff(outcomes) < 0).any()
+
+def test_unknown_method_lists_the_methods():
+    for draw in (sampling.sample, sampling.histogram):
+        with pytest.raises(ValueError, match='multinomial, cdf, alias'):
+            draw(ones(4) / 2, 10, method='poisson')
+
+def test_cdf_is_used_however_many_shots():
+    # With more shots than outcomes, 'cdf' still searches the cumulative
+    # probabilities rather than drawing from an alias table
+    state = sqrt(full(4, 1 / 4))
+    shots = 10 ** 4
+    generator = random.default_rng(3)
+    expected = bincount(searchsorted(cumsum(full(4, 1 / 4)),
+                                     generator.random(shots), side='right'),
+                        minlength=4)
+    assert array_equal(sampling.histogram(state, shots, seed=3,
+                                          method='cdf'), expected)
@@ -0,0 +1,49 @@
+#############################################################################
+# Tests for the sharded backend (quantum/sharded.py): the state split across
+# several processes ends the same as the dense circuit, and a worker that is
+# killed outright makes the run fail rather than hang.
+##############################################################################
+
+from numpy import *
+import multiprocessing
+import os
+import signal
+import pytest
+from quantum import grover, sharded
+
+def test_sharded_matches_dense():
+    input, needle = grover.needle_init('0' * 37 + '1' + '0' * 26)
+    iterations = grover.repeat(input['required_qubits'])
+    dense = grover.run_circuit(grover.circuit(input, needle, 'dense'),
+                               iterations)
+    # Three workers give shards of unequal size
+    split = grover.run_circuit(grover.circuit(input, needle, 'sharded',
+                                              workers=3), iterations)
+    assert split.shape == dense.shape
+    assert allclose(split, dense, atol=1e-12)
+
+def test_one_worker_matches_several():
+    one = sharded.run(2 ** 8, 200, 5, workers=1)
+    several = sharded.run(2 ** 8, 200, 5, workers=4)
+    assert allclose(one, several, atol=1e-12)
+
+def test_unknown_core_count_runs_on_one_worker(monkeypatch):
+    # os.cpu_count() may not know how many cores there are
+    monkeypatch.setattr(os, 'cpu_count', lambda: None)
+    assert allclose(sharded.run(2 ** 8, 200, 5),
+                    sharded.run(2 ** 8, 200, 5, workers=1), atol=1e-12)
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the workers must inherit the patched module')
+def test_killed_worker_raises(monkeypatch):
+    grover_shard = sharded.grover_shard
+
+    def killed(state, partials, barrier, start, stop, rank, *arguments):
+        if rank == 2:
+            os.kill(os.getpid(), signal.SIGKILL)
+        grover_shard(state, partials, barrier, start, stop, rank, *arguments)
+
+    monkeypatch.setattr(sharded, 'grover_shard', killed)
+    with pytest.raises(RuntimeError,
+                       match=r'worker 2 failed \(exit code -9\)'):
+        sharded.run(2 ** 8, 3, 5, workers=3, timeout=2)
@@ -0,0 +1,47 @@
+#############################################################################
+# Tests for the iteration-count sweep (quantum/sweep.py): every method gives
+# the same success probabilities, and a failure while building the shared
+# operators leaves no shared memory behind.
+##############################################################################
+
+from numpy import allclose, array
+import pytest
+from quantum import grover, sweep
+
+def test_methods_agree():
+    rows = sweep.sweep([1, 2, 3], spread=2, methods=sweep.METHODS, workers=0)
+    by_method = {}
+    for row in rows:
+        by_method.setdefault(row['method'], []).append(
+            (row['required_qubits'], row['position'], row['iterations'],
+             row['probability']))
+    reference = array(by_method.pop('analytic'))
+    for method, values in by_method.items():
+        assert allclose(array(values), reference, atol=1e-12), method
+
+def test_failed_share_releases_blocks(monkeypatch):
+    created = []
+    shared_memory = sweep.shared_memory.SharedMemory
+
+    def recorded(*arguments, **keywords):
+        block = shared_memory(*arguments, **keywords)
+        created.append(block.name)
+        return block
+
+    circuit = grover.circuit
+
+    def fails_at_three_qubits(input, *arguments, **keywords):
+        if input['required_qubits'] == 3:
+            raise MemoryError("too big")
+        return circuit(input, *arguments, **keywords)
+
+    monkeypatch.setattr(sweep.shared_memory, 'SharedMemory', recorded)
+    monkeypatch.setattr(grover, 'circuit', fails_at_three_qubits)
+    with pytest.raises(MemoryError):
+        sweep.sweep([2, 3], methods=('dense',), workers=0)
+
+    # The blocks for two qubits were made, and are gone again
+    assert len(created) == 2
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory(name=name)
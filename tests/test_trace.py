@@ -0,0 +1,120 @@
+#############################################################################
+# Tests for the iteration trace and the best-iteration search
+# (trace_circuit() and best_iterations() in grover.py): each row of the trace
+# is the probability of the needle after that many iterations, and the
+# search returns the argmax of the trace up to its first peak.
+##############################################################################
+
+from numpy import *
+import argparse
+import tracemalloc
+import pytest
+from quantum import grover, out_of_core, planner
+
+#-----------------------------------------------------------------------------
+# Function: needle_circuit(required_qubits, position, backend)
+#-----------------------------------------------------------------------------
+def needle_circuit(required_qubits, position, backend):
+    string_length = 2 ** required_qubits
+    input, needle = grover.needle_init('0' * position + '1' +
+                                       '0' * (string_length - position - 1))
+    return input, needle, grover.circuit(input, needle, backend)
+
+@pytest.mark.parametrize('backend', ['dense', 'sparse', 'matrix-free',
+                                     'analytic', 'gates'])
+def test_trace_matches_final_states(backend):
+    input, needle, gates = needle_circuit(4, 9, backend)
+    trace = grover.trace_circuit(gates, needle, 8)
+    assert trace.size == 9
+    for iterations in range(9):
+        current_state = grover.run_circuit(
+            grover.circuit(input, needle, backend), iterations)
+        probability = abs(asarray(current_state).ravel()[2 * 9]) ** 2 + \
+                      abs(asarray(current_state).ravel()[2 * 9 + 1]) ** 2
+        assert isclose(trace['probability'][iterations], probability,
+                       atol=1e-12)
+    assert allclose(trace['norm_drift'], 0, atol=1e-12)
+
+@pytest.mark.parametrize('required_qubits', [1, 4, 12])
+def test_analytic_drift_is_that_of_its_amplitudes(required_qubits):
+    _, needle, gates = needle_circuit(required_qubits, 0, 'analytic')
+    trace = grover.trace_circuit(gates, needle, 10)
+    for iterations in range(11):
+        state = grover.run_analytic(gates, iterations)
+        drift = (state['marked'] ** 2 +
+                 (2 ** required_qubits - 1) * state['unmarked'] ** 2 - 1)
+        assert isclose(trace['norm_drift'][iterations], drift,
+                       rtol=0, atol=1e-15)
+
+@pytest.mark.parametrize('backend', ['matrix-free', 'analytic', 'sparse'])
+@pytest.mark.parametrize('required_qubits', [2, 3, 5, 8, 10])
+def test_best_iterations_is_the_argmax(backend, required_qubits):
+    if backend == 'sparse' and required_qubits > 8:
+        pytest.skip('too slow to build')
+    search = grover.best_iterations(required_qubits, backend)
+
+    # The whole trace, well past the first peak
+    _, needle, gates = needle_circuit(required_qubits, 0, 'matrix-free')
+    trace = grover.trace_circuit(gates, needle, 2 * search['repeat'] + 1)
+    peak = flatnonzero(diff(trace['probability']) < 0)
+    first_peak = int(peak[0]) + 1 if peak.size else trace.size
+    expected = int(argmax(trace['probability'][:first_peak]))
+
+    assert search['iterations'] == expected
+    assert isclose(search['probability'], trace['probability'][expected],
+                   atol=1e-12)
+    assert search['repeat'] == grover.repeat(required_qubits)
+    assert isclose(search['repeat_probability'],
+                   trace['probability'][search['repeat']], atol=1e-12)
+
+def test_best_is_never_worse_than_repeat():
+    # repeat() rounds pi/4 * sqrt(2^n) down, which is the best count for
+    # these sizes; with one qubit every count gives 1/2
+    for required_qubits in range(1, 13):
+        search = grover.best_iterations(required_qubits)
+        assert search['probability'] >= search['repeat_probability'] - 1e-12
+        if required_qubits > 1:
+            assert search['iterations'] == search['repeat']
+
+def test_out_of_core_trace_stays_on_disk(tmp_path):
+    # A budget that only the out-of-core backend fits in
+    required_qubits = 16
+    string_length = 2 ** required_qubits
+    limit = 2 * grover.repeat(required_qubits) + 1
+    budget = planner.estimate('out-of-core', required_qubits, limit)['bytes']
+    assert planner.plan(required_qubits, limit, budget)['backend'] == \
+        'out-of-core'
+    assert grover.trace_backend('out-of-core') == 'out-of-core'
+
+    tracemalloc.start()
+    try:
+        rows = out_of_core.trace(str(tmp_path), string_length, 5, limit,
+                                 chunk=2 ** 10, until_peak=True)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The state alone would be string_length * 8 bytes
+    assert peak < string_length * 8 // 2
+
+    _, needle, gates = needle_circuit(required_qubits, 5, 'matrix-free')
+    trace = grover.trace_circuit(gates, needle, limit, until_peak=True)
+    assert len(rows) == trace.size
+    assert allclose([row[0] for row in rows], trace['probability'],
+                    atol=1e-12)
+    assert allclose([row[1] for row in rows], 0, atol=1e-12)
+
+def test_best_iterations_out_of_core(tmp_path):
+    search = grover.best_iterations(8, 'out-of-core', storage=str(tmp_path))
+    expected = grover.best_iterations(8, 'matrix-free')
+    assert search['iterations'] == expected['iterations']
+    assert allclose(search['trace']['probability'],
+                    expected['trace']['probability'], atol=1e-12)
+    assert list(tmp_path.iterdir()) == []
+
+def test_sharded_trace_over_budget_is_an_error():
+    parser = argparse.ArgumentParser()
+    arguments = argparse.Namespace(oracle='control', dtype=None)
+    with pytest.raises(SystemExit):
+        grover.plan_trace(parser, arguments, 20, 10, 2 ** 20, 'sharded')
+    assert grover.plan_trace(parser, arguments, 4, 10, 2 ** 30,
+                             'sharded') == 'matrix-free'